@@ -1,28 +1,43 @@
-from fastapi import APIRouter, Form, File, UploadFile, HTTPException
+from fastapi import APIRouter, Form, File, UploadFile, HTTPException, status
 from pathlib import Path
 import shutil
 import tempfile
-from app.rag.ingestion import ingest_documents
+from app.core.registry import get_ingest_jobs
+from app.rag.ingest_jobs import JobsFull
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
-@router.post("/")
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
 async def ingest(
     path: str = Form(None, description="Local dir path inside container"),
     file: UploadFile = File(None, description="Single file upload. Leave unselected and untick 'Send empty value' if using 'path' instead."),
     recreate: bool = Form(False),
 ):
+    """Queue an ingest job; poll GET /ingest/{job_id} for progress and the result."""
     print("path:", path)
     print("file:", file.filename if file else None)
     if file:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            file_path = Path(tmp_dir) / file.filename
-            with file_path.open("wb") as f:
-                shutil.copyfileobj(file.file, f)
-            result = await ingest_documents(str(Path(tmp_dir)), recreate)
+        # Outlives this request: the job process reads it, then deletes it
+        tmp_dir = tempfile.mkdtemp(prefix="ingest_")
+        file_path = Path(tmp_dir) / file.filename
+        with file_path.open("wb") as f:
+            shutil.copyfileobj(file.file, f)
+        input_path, cleanup = tmp_dir, True
     elif path:
-        result = await ingest_documents(path, recreate)
+        input_path, cleanup = path, False
     else:
         raise HTTPException(400, "Provide 'path' or 'file'")
 
-    return result
\ No newline at end of file
+    try:
+        return await get_ingest_jobs().submit(input_path, recreate, cleanup=cleanup)
+    except JobsFull as e:
+        if cleanup:
+            shutil.rmtree(input_path, ignore_errors=True)
+        raise HTTPException(status.HTTP_429_TOO_MANY_REQUESTS, f"Ingest queue full: {e}")
+
+@router.get("/{job_id}")
+async def ingest_status(job_id: str):
+    job = await get_ingest_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown or expired ingest job '{job_id}'")
+    return job
@@ -1,15 +1,27 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Header, HTTPException
 from pydantic import BaseModel
-from app.rag.pipeline import HybridRAG
+from app.config import app_settings
+from app.core.admission import Overloaded, get_admission_controller
+from app.core.registry import get_pipeline
+import time
 import uuid
 
 trace_id = str(uuid.uuid4())
 router = APIRouter(prefix="/query", tags=["query"])
-rag = HybridRAG()
 
 class QueryRequest(BaseModel):
     query: str
+    timeout: float | None = None  # latency budget in seconds; overrides X-Request-Timeout
 
 @router.post("/")
-async def query_endpoint(req: QueryRequest = Body(...)):
-    return await rag.query(req.query, trace_id=trace_id)
\ No newline at end of file
+async def query_endpoint(req: QueryRequest = Body(...), x_request_timeout: float | None = Header(None)):
+    timeout = req.timeout or x_request_timeout or app_settings.REQUEST_BUDGET_SECONDS or None
+    arrived = time.monotonic()
+    try:
+        async with get_admission_controller().admit():
+            if timeout is not None:
+                # Time spent queued for a slot comes out of the request's budget
+                timeout = max(timeout - (time.monotonic() - arrived), 0.001)
+            return await get_pipeline().query(req.query, trace_id=trace_id, timeout=timeout)
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=f"Overloaded: {e.reason}", headers={"Retry-After": str(e.retry_after)})
\ No newline at end of file
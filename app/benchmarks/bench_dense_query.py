@@ -0,0 +1,142 @@
+"""Dense query embeddings under concurrency: one API call per query vs. micro-batched.
+
+Runs a local stub of the OpenAI embeddings endpoint (no key, no network) that
+costs --base-ms per call plus --per-item-ms per input and serves at most
+--server-concurrency calls at once, like a rate-limited provider or a
+saturated connection pool. "direct" is plain OpenAIEmbedding; "batched" wraps
+it in MicroBatchingEmbedding, so concurrent queries share one call.
+
+    python -m app.benchmarks.bench_dense_query --concurrency 1 8 32 64
+"""
+import argparse
+import array
+import asyncio
+import base64
+import random
+import socket
+import statistics
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+from app.config import app_settings
+from app.rag.embedding_providers.dense.batching import MicroBatchingEmbedding
+
+WORDS = (
+    "revenue income segment cloud advertising operating margin cash equivalents "
+    "liabilities assets shares outstanding fiscal year quarter growth expenses "
+    "research development capital expenditures depreciation tax rate 2025"
+).split()
+
+
+def stub_server(args) -> tuple[str, dict]:
+    """Embeddings stub on a free local port; returns its base URL and call counters."""
+    app = FastAPI()
+    stats = {"calls": 0, "inputs": 0}
+    capacity = None
+    vector = array.array("f", [0.1] * args.dim)
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        nonlocal capacity
+        if capacity is None:
+            capacity = asyncio.Semaphore(args.server_concurrency)
+
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        stats["calls"] += 1
+        stats["inputs"] += len(inputs)
+
+        async with capacity:
+            await asyncio.sleep((args.base_ms + args.per_item_ms * len(inputs)) / 1000)
+
+        if body.get("encoding_format") == "base64":
+            embedding = base64.b64encode(vector.tobytes()).decode()
+        else:
+            embedding = vector.tolist()
+
+        return {
+            "object": "list",
+            "model": body["model"],
+            "data": [{"object": "embedding", "index": i, "embedding": embedding} for i in range(len(inputs))],
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        }
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    return f"http://127.0.0.1:{port}/v1", stats
+
+
+async def run(model, concurrency: int, rounds: int, rng: random.Random) -> dict:
+
+    async def one(query: str, arrived: float) -> float:
+        await model.aget_text_embedding(query)
+        return time.perf_counter() - arrived
+
+    latencies = []
+    start = time.perf_counter()
+
+    for _ in range(rounds):
+        queries = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(concurrency)]
+        arrived = time.perf_counter()
+        latencies.extend(await asyncio.gather(*(one(q, arrived) for q in queries)))
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "qps": len(latencies) / elapsed,
+    }
+
+
+async def main(args):
+    url, stats = stub_server(args)
+
+    direct = OpenAIEmbedding(
+        model=app_settings.EMBEDDING_MODEL,
+        api_base=url,
+        api_key="stub",
+        embed_batch_size=app_settings.EMBED_BATCH_SIZE,
+        max_retries=0,
+    )
+    batched = MicroBatchingEmbedding(direct, window=args.window_ms / 1000, max_batch=app_settings.EMBED_BATCH_SIZE)
+    await direct.aget_text_embedding("warm up")
+
+    print()
+    print(f"stub: {args.base_ms}ms + {args.per_item_ms}ms/input, {args.server_concurrency} concurrent calls "
+          f"| window={args.window_ms}ms | max_batch={app_settings.EMBED_BATCH_SIZE}")
+    print(f"{'concurrency':>11} {'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'q/s':>8} {'calls':>7}")
+
+    for concurrency in args.concurrency:
+        for mode, model in (("direct", direct), ("batched", batched)):
+            calls = stats["calls"]
+            r = await run(model, concurrency, args.rounds, random.Random(args.seed))
+            print(f"{concurrency:>11} {mode:>8} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['qps']:>8.1f} "
+                  f"{stats['calls'] - calls:>7}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--window-ms", type=float, default=app_settings.DENSE_QUERY_BATCH_WINDOW_MS)
+    parser.add_argument("--base-ms", type=float, default=40.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.2)
+    parser.add_argument("--server-concurrency", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=app_settings.EMBEDDING_DIM)
+    parser.add_argument("--seed", type=int, default=0)
+
+    asyncio.run(main(parser.parse_args()))
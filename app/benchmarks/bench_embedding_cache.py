@@ -0,0 +1,78 @@
+"""Chunk-embedding cache: cost of a hit, per EMBED_BATCH_SIZE batch.
+
+Fills a scratch cache with --entries random dense vectors and SPLADE-sized
+sparse vectors, then times batched lookups (all hits) and measures the
+Python allocation each batch makes (tracemalloc peak) against the size of
+the lists it returns, which LlamaIndex and Qdrant need anyway.
+
+    python -m app.benchmarks.bench_embedding_cache --entries 20000 --dim 1536
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.rag.embedding_cache import EmbeddingCache
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    texts = [f"chunk {i} " + " ".join(random.Random(i).choices("abcdefgh", k=200)) for i in range(args.entries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(tmp, dense_model="bench", dim=args.dim, sparse_model="bench-sparse")
+
+        start = time.perf_counter()
+        for i in range(0, args.entries, args.batch):
+            chunk = texts[i:i + args.batch]
+            cache.dense.put(chunk, rng.standard_normal((len(chunk), args.dim), dtype=np.float32).tolist())
+            terms = [np.sort(rng.choice(30522, size=args.terms, replace=False)).tolist() for _ in chunk]
+            cache.sparse.put(chunk, terms, [rng.random(args.terms).tolist() for _ in chunk])
+        fill = time.perf_counter() - start
+
+        # Fresh handle: hits come from the files, as in a later ingest
+        cache = EmbeddingCache(tmp, dense_model="bench", dim=args.dim, sparse_model="bench-sparse")
+        dense_ms, sparse_ms, dense_alloc, sparse_alloc = [], [], [], []
+        for _ in range(args.lookups):
+            batch = random.sample(texts, args.batch)
+
+            start = time.perf_counter()
+            vectors = cache.dense.get(batch)
+            dense_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            sparse = cache.sparse.get(batch)
+            sparse_ms.append((time.perf_counter() - start) * 1000)
+            assert all(v is not None for v in vectors) and all(v is not None for v in sparse)
+
+            # Allocation in a separate pass: tracemalloc slows every allocation down
+            for get, allocs in ((cache.dense.get, dense_alloc), (cache.sparse.get, sparse_alloc)):
+                tracemalloc.start()
+                get(batch)
+                allocs.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+    # The float lists returned: 8-byte pointers + 24-byte float objects per value, plus list headers
+    dense_out = args.batch * (args.dim * 32 + 56)
+    sparse_out = args.batch * 2 * (args.terms * 32 + 56)
+    print(f"entries={args.entries} dim={args.dim} sparse_terms={args.terms} batch={args.batch} | fill {fill:.2f}s")
+    print(f"  dense  hit batch: p50 {statistics.median(dense_ms):.2f} ms | peak alloc {statistics.median(dense_alloc) / 2**20:.2f} MB "
+          f"(returned lists ~{dense_out / 2**20:.2f} MB)")
+    print(f"  sparse hit batch: p50 {statistics.median(sparse_ms):.2f} ms | peak alloc {statistics.median(sparse_alloc) / 2**20:.2f} MB "
+          f"(returned lists ~{sparse_out / 2**20:.2f} MB)")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--terms", type=int, default=120, help="Non-zero SPLADE terms per chunk")
+    parser.add_argument("--batch", type=int, default=128)
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
@@ -0,0 +1,240 @@
+"""Ingestion: per-stage throughput and peak RSS, streaming pipeline vs. load-everything-first.
+
+"batch" is the previous flow: load and clean every document, chunk them all,
+then embed and upsert. "streaming" is ingest_documents' staged pipeline with
+bounded queues. "incremental" ingests with a manifest and an embedding cache:
+cold, unchanged, (synthetic input only) one page of one file edited, then
+recreate (collection and manifest dropped, vectors from the cache). Each mode
+runs in a fresh process so peak RSS is its own.
+
+Embeddings are stubbed (--embed-ms per dense batch, hashed sparse terms) and
+Qdrant runs in local mode unless --url is given (the scratch collection is
+deleted afterwards), so the numbers isolate parsing, chunking, queueing and
+memory. Without --input, large synthetic PDFs are generated first.
+
+    python -m app.benchmarks.bench_ingest --pdfs 8 --pages 200
+    python -m app.benchmarks.bench_ingest --input data/
+    python -m app.benchmarks.bench_ingest --modes incremental
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from app.benchmarks.bench_retrieval import WORDS, SyntheticSparse
+from app.config import app_settings
+
+COLLECTION = "bench_ingest"
+
+
+class StubEmbedding(BaseEmbedding):
+    """Constant vectors after a fixed per-call delay, like a remote embeddings API."""
+
+    _dim: int = PrivateAttr()
+    _delay: float = PrivateAttr()
+
+    def __init__(self, dim: int, delay: float):
+        super().__init__(model_name="stub", embed_batch_size=app_settings.EMBED_BATCH_SIZE)
+        self._dim = dim
+        self._delay = delay
+
+    def _vector(self):
+        return [1.0 / self._dim ** 0.5] * self._dim
+
+    def _get_query_embedding(self, query):
+        return self._vector()
+
+    async def _aget_query_embedding(self, query):
+        return self._vector()
+
+    def _get_text_embedding(self, text):
+        return self._vector()
+
+    def _get_text_embeddings(self, texts):
+        time.sleep(self._delay)
+        return [self._vector() for _ in texts]
+
+    async def _aget_text_embeddings(self, texts):
+        await asyncio.sleep(self._delay)
+        return [self._vector() for _ in texts]
+
+
+def write_pdfs(folder: Path, pdfs: int, pages: int, seed: int, edited_page: int | None = None):
+    import pymupdf
+
+    rng = random.Random(seed)
+    for i in range(pdfs):
+        doc = pymupdf.open()
+        for p in range(pages):
+            page = doc.new_page()
+            text = " ".join(rng.choice(WORDS) for _ in range(450))
+            if i == 0 and p == edited_page:
+                text = "Restated. " + text
+            page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+        doc.save(folder / f"report_{i}.pdf")
+        doc.close()
+
+
+def run_mode(mode: str, input_path: str, args, results):
+    # Fresh process per mode: imports, models and peak RSS start from zero
+    from qdrant_client import AsyncQdrantClient
+
+    from app.core import registry
+    from app.rag import ingestion
+    from app.rag.hybrid_indexer import HybridIndexer
+    from app.rag.manifest import IngestManifest
+    from app.rag.parsing import parse_file
+    from app.rag.stages import StageStats
+    from app.rag.vectorstores.qdrant_hybrid import QdrantHybridStore
+
+    app_settings.COLLECTION_NAME = COLLECTION
+    app_settings.RERANKER_SEND_CHUNK_IDS = False  # no reranker service here
+    app_settings.EMBEDDING_CACHE_DIR = ""  # stub vectors must not land in the real cache
+    Settings.embed_model = StubEmbedding(args.dim, args.embed_ms / 1000)
+
+    store = QdrantHybridStore(sparse_provider=SyntheticSparse())
+    store.client = None
+    store.aclient = AsyncQdrantClient(url=args.url) if args.url else AsyncQdrantClient(location=":memory:")
+    registry._vector_store_provider = store
+
+    async def streaming():
+        result = await ingestion.ingest_files(HybridIndexer(), input_path)
+        return result["stages"], {"docs": result["docs_ingested"], "nodes": result["nodes"]}
+
+    async def incremental():
+        # Work on a copy: the modified pass rewrites a file, the removed pass deletes one
+        with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+            shutil.copytree(input_path, workdir, dirs_exist_ok=True)
+            app_settings.EMBEDDING_CACHE_DIR = str(Path(state_dir) / "embedding_cache")
+            manifest = IngestManifest(Path(state_dir) / f"{COLLECTION}.json")
+            indexer = HybridIndexer()
+            passes = {}
+            for name in ("cold", "unchanged", "modified", "removed", "recreate"):
+                if name == "modified":
+                    if args.input is not None:
+                        continue
+                    write_pdfs(Path(workdir), 1, args.pages, args.seed, edited_page=args.pages // 2)  # rewrites report_0.pdf
+                if name == "removed":
+                    if args.input is not None or args.pdfs < 2:
+                        continue
+                    (Path(workdir) / "report_1.pdf").unlink()
+                if name == "recreate":
+                    await store.aclient.delete_collection(COLLECTION)
+                    manifest.clear()
+                started = time.perf_counter()
+                result = await ingestion.ingest_files(indexer, workdir, manifest)
+                passes[name] = {"seconds": time.perf_counter() - started, **result}
+        counts = {"docs": passes["cold"]["docs_ingested"], "nodes": passes["cold"]["nodes"], "passes": passes}
+        return passes["cold"]["stages"], counts
+
+    async def batch():
+        indexer = HybridIndexer()
+        stats = {name: StageStats() for name in ("load+clean", "chunk", "embed", "upsert")}
+
+        def timed(name, n_in, started):
+            stats[name].started, stats[name].finished = started, time.perf_counter()
+            stats[name].busy_seconds += stats[name].finished - started
+            stats[name].items_in += n_in
+
+        started = time.perf_counter()
+        files = ingestion.list_input_files(input_path)
+        documents = [doc for file in files for doc in parse_file(file)]
+        timed("load+clean", len(documents), started)
+
+        started = time.perf_counter()
+        splitter = ingestion.SentenceSplitter(chunk_size=app_settings.CHUNK_SIZE, chunk_overlap=app_settings.CHUNK_OVERLAP)
+        nodes = splitter.get_nodes_from_documents(documents)
+        timed("chunk", len(documents), started)
+
+        size = app_settings.EMBED_BATCH_SIZE
+        batches = [nodes[i:i + size] for i in range(0, len(nodes), size)]
+        started = time.perf_counter()
+        sparse = [await indexer.embed(b) for b in batches]
+        timed("embed", len(nodes), started)
+
+        started = time.perf_counter()
+        for b, s in zip(batches, sparse):
+            await indexer.upsert(b, s)
+        timed("upsert", len(batches), started)
+
+        return stats, {"docs": len(documents), "nodes": len(nodes)}
+
+    async def main():
+        try:
+            baseline = registry.rss_mb()
+            start = time.perf_counter()
+            stats, counts = await {"batch": batch, "streaming": streaming, "incremental": incremental}[mode]()
+            return {
+                "seconds": time.perf_counter() - start,
+                "baseline_rss_mb": baseline,
+                "peak_rss_mb": registry.peak_rss_mb(),
+                "stages": {name: s if isinstance(s, dict) else s.summary() for name, s in stats.items()},
+                **counts,
+            }
+        finally:
+            if await store.aclient.collection_exists(COLLECTION):
+                await store.aclient.delete_collection(COLLECTION)
+            # Pool workers must exit before this process can (multiprocessing joins its children)
+            registry.get_parse_pool().close()
+
+    results[mode] = asyncio.run(main())
+
+
+def report(mode: str, r: dict):
+    print()
+    print(f"{mode}: {r['seconds']:.2f}s | docs={r['docs']} nodes={r['nodes']} | peak RSS {r['peak_rss_mb']:.0f} MB "
+          f"(+{r['peak_rss_mb'] - r['baseline_rss_mb']:.0f} MB over the {r['baseline_rss_mb']:.0f} MB after imports)")
+    print(f"  {'stage':<11} {'items in':>9} {'items/s':>9} {'busy s':>8} {'wall s':>8}")
+    for name, s in r["stages"].items():
+        rate = s["items_per_second"]
+        print(f"  {name:<11} {s['items_in']:>9} {rate if rate is not None else '-':>9} {s['busy_seconds']:>8.2f} {s['wall_seconds']:>8.2f}")
+    for name, p in r.get("passes", {}).items():
+        hits = p["embedding_cache_hits"]["dense"]
+        print(f"  {name + ' pass':<15} {p['seconds']:>7.2f}s | upserted {p['nodes']:>6} ({hits} from the embedding cache) "
+              f"| skipped {p['files_skipped']} files, {p['nodes_skipped']} chunks "
+              f"| deleted {p['nodes_deleted']} ({p['files_removed']} files removed)")
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = args.input
+        if input_path is None:
+            write_pdfs(Path(tmp), args.pdfs, args.pages, args.seed)
+            input_path = tmp
+
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Manager().dict()
+        for mode in args.modes:
+            process = ctx.Process(target=run_mode, args=(mode, input_path, args, results))
+            process.start()
+            process.join()
+
+        print()
+        print(f"input={args.input or f'{args.pdfs} synthetic PDFs x {args.pages} pages'} | embed={args.embed_ms}ms/batch "
+              f"| batch={app_settings.EMBED_BATCH_SIZE} | queue={app_settings.INGEST_QUEUE_SIZE} | qdrant={args.url or 'local'}")
+        for mode in args.modes:
+            if mode in results:
+                report(mode, results[mode])
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=None, help="Folder to ingest (default: generate synthetic PDFs)")
+    parser.add_argument("--pdfs", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["batch", "streaming"], choices=["batch", "streaming", "incremental"])
+    parser.add_argument("--embed-ms", type=float, default=50.0)
+    parser.add_argument("--dim", type=int, default=app_settings.EMBEDDING_DIM)
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: local mode)")
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
@@ -0,0 +1,75 @@
+"""PDF parse + clean throughput (pages/sec) against process-pool size.
+
+Runs ParsePool over a folder of PDFs with as many files in flight as there
+are pool processes, the way the ingest "parse" stage does. Workers 0 is the
+in-process thread path (one core at most, GIL-bound). Timings include pool
+start-up on the first file; --warmup parses one file per process first to exclude it.
+Without --input, synthetic PDFs are generated first.
+
+    python -m app.benchmarks.bench_parse --pdfs 16 --pages 100 --workers 0 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.benchmarks.bench_ingest import write_pdfs
+from app.rag.parsing import ParsePool
+
+
+async def run(files: list[Path], processes: int, warmup: bool) -> dict:
+    pool = ParsePool(processes)
+    try:
+        if warmup:
+            # One file per process, so every worker is spawned and imported before timing
+            await asyncio.gather(*(pool.parse(file) for file in files[:max(1, processes)]))
+
+        pending = iter(files)
+        pages = 0
+
+        async def worker():
+            nonlocal pages
+            for file in pending:
+                docs = await pool.parse(file)
+                pages += len(docs)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, processes))))
+        seconds = time.perf_counter() - start
+    finally:
+        pool.close()
+
+    return {"pages": pages, "seconds": seconds, "pages_per_second": pages / seconds}
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(args.input) if args.input else Path(tmp)
+        if args.input is None:
+            write_pdfs(folder, args.pdfs, args.pages, args.seed)
+        files = sorted(folder.glob("**/*.pdf"))
+
+        print(f"input={args.input or f'{args.pdfs} synthetic PDFs x {args.pages} pages'} | files={len(files)} "
+              f"| cpus={os.cpu_count()} | warmup={args.warmup}")
+        print(f"{'workers':>8} {'pages':>7} {'seconds':>8} {'pages/s':>9} {'speedup':>8}")
+        baseline = None
+        for processes in args.workers:
+            r = asyncio.run(run(files, processes, args.warmup))
+            baseline = baseline or r["pages_per_second"]
+            print(f"{processes:>8} {r['pages']:>7} {r['seconds']:>8.2f} {r['pages_per_second']:>9.1f} "
+                  f"{r['pages_per_second'] / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=None, help="Folder of PDFs (default: generate synthetic PDFs)")
+    parser.add_argument("--pdfs", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    parser.add_argument("--warmup", action="store_true", help="Start every pool process before timing")
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
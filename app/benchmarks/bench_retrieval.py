@@ -0,0 +1,154 @@
+"""Hybrid retrieval latency: LlamaIndex hybrid mode vs. native Qdrant Query API.
+
+Both paths search the same scratch collection, written through
+QdrantVectorStore so payloads match what ingestion stores. Vectors are
+synthetic and the query encodings are precomputed, so the numbers isolate the
+retrieval path itself: index/retriever construction, client-side fusion and
+full-node deserialization vs. one fused query_points call returning lean nodes.
+
+By default Qdrant runs in local mode (in-process); its pure-Python search
+dominates at larger --chunks, so point --url at a server for realistic numbers
+(the scratch collection is deleted afterwards).
+
+    python -m app.benchmarks.bench_retrieval --chunks 2000 --queries 200
+    python -m app.benchmarks.bench_retrieval --url http://localhost:6333
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from llama_index.core import MockEmbedding, VectorStoreIndex
+from llama_index.core.schema import QueryBundle, TextNode
+from qdrant_client import AsyncQdrantClient
+
+from app.config import app_settings
+from app.rag.retriever import lean_node
+from app.rag.vectorstores.qdrant_hybrid import QdrantHybridStore
+
+WORDS = (
+    "revenue income segment cloud advertising operating margin cash equivalents "
+    "liabilities assets shares outstanding fiscal year quarter growth expenses "
+    "research development capital expenditures depreciation tax rate 2025 $402,836"
+).split()
+
+VOCAB = 30522  # SPLADE (BERT) vocabulary size
+
+
+class SyntheticSparse:
+    """Stand-in for SPLADE: one weight per distinct word, hashed into the vocabulary."""
+
+    def _encode(self, text):
+        terms = sorted({hash(word) % VOCAB for word in text.lower().split()})
+        return terms, [1.0] * len(terms)
+
+    def embed_documents(self, texts):
+        encoded = [self._encode(text) for text in texts]
+        return [e[0] for e in encoded], [e[1] for e in encoded]
+
+    def embed_query(self, texts):
+        indices, values = self._encode(texts[0])
+        return [indices], [values]
+
+
+def random_unit(rng: random.Random, dim: int) -> list[float]:
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+
+def make_nodes(rng: random.Random, chunks: int, dim: int) -> list[TextNode]:
+    return [
+        TextNode(
+            text=" ".join(rng.choice(WORDS) for _ in range(380)),  # ~512 tokens
+            metadata={"file_path": f"data/10k_{i % 20}.pdf", "source": str(i % 120), "total_pages": 120},
+            embedding=random_unit(rng, dim),
+        )
+        for i in range(chunks)
+    ]
+
+
+async def legacy_retrieve(store: QdrantHybridStore, query: str, dense: list[float]):
+    # Mirrors Retriever.retrieve in "hybrid" mode
+    index = VectorStoreIndex.from_vector_store(
+        store.get_vector_store(), embed_model=MockEmbedding(embed_dim=len(dense))
+    )
+    retriever = index.as_retriever(
+        similarity_top_k=app_settings.SIMILARITY_TOP_K,
+        vector_store_query_mode="hybrid",
+    )
+    return await retriever.aretrieve(QueryBundle(query_str=query, embedding=dense))
+
+
+async def native_retrieve(store: QdrantHybridStore, query: str, dense: list[float]):
+    # Mirrors Retriever.retrieve_native
+    points = await store.query_hybrid(
+        dense,
+        store.embed_sparse_query([query]),
+        limit=app_settings.SIMILARITY_TOP_K,
+        prefetch_limit=max(app_settings.RETRIEVAL_PREFETCH_LIMIT, app_settings.SIMILARITY_TOP_K),
+        fusion=app_settings.RETRIEVAL_FUSION,
+    )
+    return [lean_node(point) for point in points]
+
+
+async def measure(fn, store, queries) -> dict:
+    # Warm up (collection format detection, first-call imports)
+    await fn(store, *queries[0])
+
+    latencies = []
+    for query, dense in queries:
+        start = time.perf_counter()
+        nodes = await fn(store, query, dense)
+        latencies.append(time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "nodes": len(nodes),
+    }
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+
+    store = QdrantHybridStore(sparse_provider=SyntheticSparse())
+    store.client = None
+    store.aclient = AsyncQdrantClient(url=args.url) if args.url else AsyncQdrantClient(location=":memory:")
+    app_settings.COLLECTION_NAME = "bench_retrieval"
+
+    try:
+        await store.get_vector_store().async_add(make_nodes(rng, args.chunks, args.dim))
+
+        queries = [
+            (" ".join(rng.choice(WORDS) for _ in range(10)), random_unit(rng, args.dim))
+            for _ in range(args.queries)
+        ]
+
+        results = {
+            "llamaindex hybrid": await measure(legacy_retrieve, store, queries),
+            f"native ({app_settings.RETRIEVAL_FUSION})": await measure(native_retrieve, store, queries),
+        }
+    finally:
+        await store.aclient.delete_collection(app_settings.COLLECTION_NAME)
+
+    print()
+    print(f"qdrant={args.url or 'local'} | chunks={args.chunks} | queries={args.queries} "
+          f"| top_k={app_settings.SIMILARITY_TOP_K} | prefetch={app_settings.RETRIEVAL_PREFETCH_LIMIT}")
+    print(f"{'path':<20} {'p50 ms':>8} {'p99 ms':>8} {'nodes':>6}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['nodes']:>6}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: local mode)")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=app_settings.EMBEDDING_DIM)
+    parser.add_argument("--seed", type=int, default=0)
+
+    asyncio.run(main(parser.parse_args()))
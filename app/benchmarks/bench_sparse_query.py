@@ -0,0 +1,77 @@
+"""SPLADE query encoding under concurrency: inline on the event loop vs. micro-batched executor.
+
+"inline" is what LlamaIndex's synchronous sparse_query_fn used to do: every
+query encodes on the event loop, so concurrent queries queue behind each
+other and p99 grows with in-flight requests. "batched" goes through
+aembed_query, which coalesces queries arriving within
+SPARSE_QUERY_BATCH_WINDOW_MS into one embed() call off the loop.
+
+    python -m app.benchmarks.bench_sparse_query --concurrency 1 8 32 64
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.config import app_settings
+from app.rag.embedding_providers.sparse.factory import get_sparse_provider
+
+WORDS = (
+    "revenue income segment cloud advertising operating margin cash equivalents "
+    "liabilities assets shares outstanding fiscal year quarter growth expenses "
+    "research development capital expenditures depreciation tax rate 2025"
+).split()
+
+
+async def run(provider, mode: str, concurrency: int, rounds: int, rng: random.Random) -> dict:
+
+    async def one(query: str, arrived: float) -> float:
+        # Latency from arrival, so time spent queued behind other queries counts
+        if mode == "inline":
+            provider.embed_query([query])
+        else:
+            await provider.aembed_query([query])
+        return time.perf_counter() - arrived
+
+    latencies = []
+    start = time.perf_counter()
+
+    for _ in range(rounds):
+        queries = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(concurrency)]
+        arrived = time.perf_counter()
+        latencies.extend(await asyncio.gather(*(one(q, arrived) for q in queries)))
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(0.99 * (len(latencies) - 1))] * 1000,
+        "qps": len(latencies) / elapsed,
+    }
+
+
+async def main(args):
+    provider = get_sparse_provider(app_settings.SPARSE_PROVIDER)
+    provider.embed_query(["warm up"])
+
+    print()
+    print(f"model={app_settings.SPARSE_MODEL} | window={app_settings.SPARSE_QUERY_BATCH_WINDOW_MS}ms "
+          f"| max_batch={app_settings.SPARSE_QUERY_MAX_BATCH}")
+    print(f"{'concurrency':>11} {'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'q/s':>8}")
+
+    for concurrency in args.concurrency:
+        for mode in ("inline", "batched"):
+            r = await run(provider, mode, concurrency, args.rounds, random.Random(args.seed))
+            print(f"{concurrency:>11} {mode:>8} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['qps']:>8.1f}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+
+    asyncio.run(main(parser.parse_args()))
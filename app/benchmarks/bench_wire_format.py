@@ -0,0 +1,87 @@
+"""Reranker wire format: serialization CPU and bytes on the wire per request.
+
+Covers the full round trip: client encodes the request, service decodes it,
+service encodes the response, client decodes it.
+
+    python -m app.benchmarks.bench_wire_format --docs 50 --tokens 512
+"""
+import argparse
+import json
+import random
+import time
+
+from app.rag.reranker_providers.wire import (
+    compress,
+    decode_request,
+    decode_results,
+    decompress,
+    encode_request,
+    encode_results,
+)
+
+WORDS = (
+    "revenue income segment cloud advertising operating margin cash equivalents "
+    "liabilities assets shares outstanding fiscal year quarter growth expenses "
+    "research development capital expenditures depreciation tax rate 2025 $402,836"
+).split()
+
+
+def make_request(docs: int, tokens: int, seed: int):
+    rng = random.Random(seed)
+    # ~0.75 words per token
+    words = int(tokens * 0.75)
+    documents = [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(docs)]
+    results = [(i, rng.random()) for i in range(min(docs, 25))]
+    return "What was Alphabet's revenue in 2025?", documents, results
+
+
+def json_round_trip(query, documents, top_n, results):
+    request = json.dumps({"query": query, "documents": documents, "top_n": top_n}).encode()
+    json.loads(request)
+    response = json.dumps({"results": results}).encode()
+    json.loads(response)["results"]
+    return len(request), len(response)
+
+
+def binary_round_trip(query, documents, top_n, results, deflate=False):
+    request = encode_request(query, documents, top_n)
+    if deflate:
+        request = compress(request)
+        decode_request(decompress(request))
+    else:
+        decode_request(request)
+    response = encode_results(results)
+    decode_results(response)
+    return len(request), len(response)
+
+
+def main(args):
+    query, documents, results = make_request(args.docs, args.tokens, args.seed)
+
+    formats = {
+        "json": lambda: json_round_trip(query, documents, 25, results),
+        "binary": lambda: binary_round_trip(query, documents, 25, results),
+        "binary+deflate": lambda: binary_round_trip(query, documents, 25, results, deflate=True),
+    }
+
+    print(f"\ndocs={args.docs} | ~tokens/doc={args.tokens} | iterations={args.iterations}")
+    print(f"{'format':>16} {'request B':>10} {'response B':>11} {'CPU µs/req':>11}")
+
+    for name, fn in formats.items():
+        request_bytes, response_bytes = fn()
+
+        start = time.process_time()
+        for _ in range(args.iterations):
+            fn()
+        cpu_us = (time.process_time() - start) / args.iterations * 1e6
+
+        print(f"{name:>16} {request_bytes:>10} {response_bytes:>11} {cpu_us:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=512)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
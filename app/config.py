@@ -9,35 +9,81 @@ class AppSettings(BaseSettings):
     APP_NAME: str = "Hybrid RAG Template"
 
     # RAG Settings
-    RETRIEVAL_MODE: Literal["dense", "hybrid"] = "hybrid"
+    RETRIEVAL_MODE: Literal["dense", "hybrid", "native"] = "hybrid" # native = one Qdrant query_points call, dense + sparse fused server-side
     LLM_PROVIDER: Literal["openai", "anthropic", "ollama"] = "openai"
     LLM_MODEL: str = "gpt-4.1-mini"
     USE_RERANKER: bool = True
     USE_CACHE: bool = True
+    REQUEST_BUDGET_SECONDS: float = 0.0 # default per-request latency budget; clients override with `timeout` / X-Request-Timeout; 0 = unbounded
+    BUDGET_GENERATION_RESERVE: float = 4.0 # seconds held back for generation; rerank gets the rest, context and max tokens shrink below it
+    BUDGET_RERANK_MIN: float = 0.1 # skip rerank (retrieval order) when less than this is left for it
+    BUDGET_GENERATION_TOKENS_PER_SECOND: float = 60.0 # max_tokens cap = remaining seconds x this, once under the reserve
+    BUDGET_MIN_GENERATION_TOKENS: int = 64
+    BUDGET_MIN_GENERATION_SECONDS: float = 1.0 # query encoding, cache check and retrieval time out early enough to leave generation this; generation itself stops at the deadline
+    MAX_CONCURRENT_REQUESTS: int = 32 # per API worker; requests beyond this wait for a slot
+    MAX_QUEUED_REQUESTS: int = 64 # waiting requests per worker; beyond this, 429 with Retry-After
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0 # max wait for a slot before 503 with Retry-After; 0 = wait indefinitely
+    EMBEDDING_CONCURRENCY_LIMIT: int = 16 # per-stage in-flight calls per worker (rerank uses RERANKER_CONCURRENCY_LIMIT); 0 = unbounded
+    RETRIEVAL_CONCURRENCY_LIMIT: int = 16
+    GENERATION_CONCURRENCY_LIMIT: int = 16
+    SPECULATIVE_RETRIEVAL: bool = False # start retrieval alongside the cache lookup; cancelled on a hit, hides the lookup on a miss at the cost of wasted retrievals on hits
 
     # Vector storage provider
     VECTOR_STORE_PROVIDER: str = "qdrant"
 
     # Dense provider
-    DENSE_PROVIDER: str = "openai"
+    DENSE_PROVIDER: str = "openai" # "fastembed" = local ONNX on CPU; set EMBEDDING_MODEL / EMBEDDING_DIM to match (e.g. BAAI/bge-small-en-v1.5, 384)
     EMBEDDING_MODEL: str = "text-embedding-3-small"
     EMBED_BATCH_SIZE: int = 128
+    DENSE_MODEL_DIR: str = "" # fastembed: local model cache directory; when set, models load from it only (air-gapped)
+    DENSE_THREADS: int = 0 # fastembed: ONNX intra-op threads, 0 = onnxruntime default
+    DENSE_QUERY_BATCH_WINDOW_MS: float = 5.0 # concurrent single-text embeddings arriving within this window share one API call (up to EMBED_BATCH_SIZE); 0 disables
+
+    # Streaming ingestion: workers per stage, bounded queues between them (items = files, or embed batches)
+    INGEST_LOAD_WORKERS: int = 2
+    INGEST_PARSE_PROCESSES: int = -1 # PDF parsing + text cleaning in this many spawned processes, started on first ingest; -1 = one per core up to 4 (threads on a single core), 0 = threads in the API process
+    INGEST_CHUNK_WORKERS: int = 2
+    INGEST_EMBED_WORKERS: int = 2
+    INGEST_UPSERT_WORKERS: int = 1
+    INGEST_QUEUE_SIZE: int = 4
+    INGEST_INCREMENTAL: bool = True # skip files whose content hash is in the manifest, embed only new chunks, delete stale ones
+    INGEST_MANIFEST_DIR: str = ".ingest_manifests" # one manifest per collection; recreate=True resets it
+    INGEST_MAX_CONCURRENT_JOBS: int = 1 # ingest jobs running at once per API worker, each in its own process
+    INGEST_MAX_QUEUED_JOBS: int = 8 # jobs waiting for a slot per API worker; beyond this POST /ingest returns 429
+    INGEST_JOB_TTL: int = 7 * 24 * 3600 # seconds a job's status stays readable after its last update
+    INGEST_PROGRESS_INTERVAL: float = 1.0 # seconds between progress snapshots written by a running job
+    INGEST_SHUTDOWN_GRACE: float = 10.0 # seconds shutdown waits for running jobs before marking them interrupted and terminating them
+    EMBEDDING_CACHE_DIR: str = ".embedding_cache" # chunk vectors on disk, per model and text hash: recreate / re-chunking skips the embedding calls for known texts; "" disables
 
     CHUNK_SIZE: int = 512 # 512 for better "granularity" for semantic search.
     CHUNK_OVERLAP: int = 100 # 15-20% of CHUNK_SIZE is the gold standard for context continuity.
     EMBEDDING_DIM: int = 1536 # Dimensionality of dense embedding vector; 1536 for OpenAI text-embedding-3-small.
 
     # Sparse provider
-    SPARSE_PROVIDER: str = "fastembed"
+    SPARSE_PROVIDER: str = "fastembed" # "remote" = services/sparse_service, no SPLADE model in API workers
     SPARSE_MODEL: str = "prithivida/Splade_PP_en_v1"
+    SPARSE_QUERY_BATCH_WINDOW_MS: float = 3.0 # concurrent query encodings arriving within this window share one embed() batch
+    SPARSE_QUERY_MAX_BATCH: int = 32
+    SPARSE_SERVICE_TIMEOUT: float = 30.0
+    SPARSE_SERVICE_CHUNK_SIZE: int = 256 # texts per POST /embed when indexing; keep <= the service's MAX_REQUEST_TEXTS
 
     # Reranker provider
     RERANKER_PROVIDER: str = "remote" # "fastembed"
     RERANKER_MODEL: str = "jinaai/jina-reranker-v1-tiny-en" # "light+fast but English only "jinaai/jina-reranker-v1-turbo-en" vs "BAAI/bge-reranker-base" for balanced production choice Multilingual, but much slower + high size (1.1 GB)
     RERANKER_CONCURRENCY_LIMIT: int = 16  # Adjust based on your machine / reranker capacity
+    RERANKER_WIRE_FORMAT: Literal["json", "binary"] = "binary" # binary = length-prefixed UTF-8 docs, float32 scores; falls back to JSON if the service rejects it
+    RERANKER_COMPRESSION: bool = False # deflate the request body; worth it on slow links, costs CPU on fast ones
+    RERANKER_SEND_CHUNK_IDS: bool = True # send chunk IDs instead of text; chunks are bulk-loaded into the service at ingest
+    RERANKER_TIMEOUT: float = 60.0
+    RERANKER_HEDGE_PERCENTILE: float = 0.95 # send a backup request to another replica once the first is slower than this latency percentile; 0 disables
+    RERANKER_HEDGE_MIN_SAMPLES: int = 20 # latencies to observe before hedging
+    RERANKER_BREAKER_FAILURES: int = 5 # consecutive failures (errors, 5xx) before a replica is taken out of rotation
+    RERANKER_BREAKER_COOLDOWN: float = 30.0 # seconds before a tripped replica gets a trial request; with every replica tripped, results keep retrieval order
 
     # Retrieval config
     SIMILARITY_TOP_K: int = 50 # 50 – 100 This is your "Recall" phase. You need enough candidates from both vector and keyword search so the reranker has the "correct" information available to find.
+    RETRIEVAL_FUSION: Literal["rrf", "dbsf"] = "rrf" # native mode only
+    RETRIEVAL_PREFETCH_LIMIT: int = 100 # native mode: candidates per prefetch (dense, sparse) before fusion
     SIMILARITY_CUTOFF: float = 0.75 # 0.75 is a common industry baseline for "meaningful" similarity in 2026.
     RERANK_TOP_N: int = 20 # 20 – 30 After fusing results, the reranker should evaluate a healthy subset. 15 is slightly narrow; 25 is safer to ensure diverse perspectives are captured before final selection.
     FINAL_CONTEXT_N: int = 7 # 5 – 10 Most modern LLMs perform best with 5–10 highly relevant chunks. Too many chunks can lead to "Lost in the Middle" errors.
@@ -50,6 +96,8 @@ class AppSettings(BaseSettings):
     QDRANT_URL: str = "http://qdrant:6333"
     REDIS_URL: str = "redis://redis:6379/0"
     RERANKER_URL: str = "http://reranker:8001"
+    RERANKER_URLS: str = "" # comma-separated replicas, routed by least outstanding requests; empty = RERANKER_URL
+    SPARSE_SERVICE_URL: str = "http://sparse:8002"
     COLLECTION_NAME: str = "hybrid_rag_docs"
     
     # Keys (from .env)
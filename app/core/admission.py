@@ -0,0 +1,151 @@
+"""Admission control and per-stage concurrency limits for the query pipeline.
+
+AdmissionController bounds how many requests run the pipeline at once and
+how many may wait for a slot; beyond that, requests are turned away at once
+(429) or after waiting too long (503), with a Retry-After estimate. Stage
+limits bound how many calls each downstream (embedding API, Qdrant,
+reranker, LLM) sees from this worker, so a burst queues here instead of
+fanning out until something times out.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+import structlog
+
+from app.config import app_settings
+from app.core.observability.metrics import (
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_REJECTED,
+    IN_FLIGHT,
+    QUEUED,
+    STAGE_IN_FLIGHT,
+    STAGE_QUEUE_WAIT,
+)
+
+logger = structlog.get_logger()
+
+
+class Overloaded(Exception):
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._service_time = 1.0  # EWMA of seconds per admitted request, for Retry-After
+
+    def retry_after(self) -> int:
+        # Time for the queue ahead to drain at the current service rate
+        backlog = self.queued + 1
+        return max(1, math.ceil(backlog * self._service_time / self.max_concurrent))
+
+    def _reject(self, status_code: int, reason: str):
+        retry_after = self.retry_after()
+        ADMISSION_REJECTED.labels(reason=reason).inc()
+        logger.warning(
+            "admission_rejected",
+            reason=reason,
+            in_flight=self.in_flight,
+            queued=self.queued,
+            retry_after_seconds=retry_after,
+        )
+        raise Overloaded(status_code, reason, retry_after)
+
+    @asynccontextmanager
+    async def admit(self):
+        wait_start = time.perf_counter()
+        if not self._slots.locked():
+            await self._slots.acquire()  # free slot: returns without suspending
+        else:
+            if self.queued >= self.max_queue:
+                self._reject(429, "queue_full")
+
+            self.queued += 1
+            QUEUED.inc()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout or None)
+            except asyncio.TimeoutError:
+                self._reject(503, "queue_timeout")
+            finally:
+                self.queued -= 1
+                QUEUED.dec()
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - wait_start)
+
+        self.in_flight += 1
+        IN_FLIGHT.inc()
+        logger.info("pipeline_active_requests", active_requests=self.in_flight, queued=self.queued)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.perf_counter() - start)
+            self.in_flight -= 1
+            IN_FLIGHT.dec()
+            self._slots.release()
+
+
+class StageLimits:
+    """One semaphore per pipeline stage; a limit of 0 leaves that stage unbounded."""
+
+    def __init__(self, limits: dict[str, int]):
+        self._semaphores = {stage: asyncio.Semaphore(limit) for stage, limit in limits.items() if limit > 0}
+
+    @asynccontextmanager
+    async def slot(self, stage: str, metrics: dict | None = None):
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+
+        wait_start = time.perf_counter()
+        async with semaphore:
+            wait = time.perf_counter() - wait_start
+            STAGE_QUEUE_WAIT.labels(stage=stage).observe(wait)
+            if metrics is not None:
+                metrics[f"{stage}_queue_wait"] = round(wait, 4)
+
+            STAGE_IN_FLIGHT.labels(stage=stage).inc()
+            try:
+                yield
+            finally:
+                STAGE_IN_FLIGHT.labels(stage=stage).dec()
+
+
+_admission: AdmissionController | None = None
+_stage_limits: StageLimits | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _admission
+    if _admission is None:
+        _admission = AdmissionController(
+            max_concurrent=app_settings.MAX_CONCURRENT_REQUESTS,
+            max_queue=app_settings.MAX_QUEUED_REQUESTS,
+            queue_timeout=app_settings.ADMISSION_QUEUE_TIMEOUT,
+        )
+    return _admission
+
+
+def get_stage_limits() -> StageLimits:
+    global _stage_limits
+    if _stage_limits is None:
+        _stage_limits = StageLimits({
+            "embedding": app_settings.EMBEDDING_CONCURRENCY_LIMIT,
+            "retrieval": app_settings.RETRIEVAL_CONCURRENCY_LIMIT,
+            "rerank": app_settings.RERANKER_CONCURRENCY_LIMIT,
+            "generation": app_settings.GENERATION_CONCURRENCY_LIMIT,
+        })
+    return _stage_limits
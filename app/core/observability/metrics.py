@@ -0,0 +1,71 @@
+"""Prometheus metrics for the API: admission, per-stage queueing and budget degradations.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so /metrics
+aggregates every worker instead of whichever one answered the scrape.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    "rag_admission_queue_wait_seconds",
+    "Time an admitted request waited for a pipeline slot",
+    buckets=WAIT_BUCKETS,
+)
+
+ADMISSION_REJECTED = Counter(
+    "rag_admission_rejected_total",
+    "Requests turned away by admission control",
+    ["reason"],  # queue_full (429) | queue_timeout (503)
+)
+
+IN_FLIGHT = Gauge(
+    "rag_requests_in_flight",
+    "Requests holding a pipeline slot",
+    multiprocess_mode="livesum",
+)
+
+QUEUED = Gauge(
+    "rag_requests_queued",
+    "Requests waiting for a pipeline slot",
+    multiprocess_mode="livesum",
+)
+
+STAGE_QUEUE_WAIT = Histogram(
+    "rag_stage_queue_wait_seconds",
+    "Time a request waited for a stage's concurrency slot",
+    ["stage"],
+    buckets=WAIT_BUCKETS,
+)
+
+STAGE_IN_FLIGHT = Gauge(
+    "rag_stage_in_flight",
+    "Calls currently running per stage",
+    ["stage"],
+    multiprocess_mode="livesum",
+)
+
+BUDGET_DEGRADATIONS = Counter(
+    "rag_budget_degradations_total",
+    "Stages shed or cut short to stay within the request's latency budget",
+    # rerank_skipped | rerank_timeout | context_truncated | generation_capped | <stage>_timeout
+    ["kind"],
+)
+
+
+def render() -> tuple[bytes, str]:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,164 @@
+"""Process-wide providers and clients, built once per worker and shared by every request.
+
+Everything is created lazily on first use, so scripts (evals, benchmarks,
+ingestion) work without a startup step; the API calls `startup()` from its
+lifespan to load models before taking traffic and `shutdown()` to close clients.
+"""
+import os
+import resource
+import time
+
+import structlog
+
+from app.config import app_settings, configure_llm_settings
+
+logger = structlog.get_logger()
+
+_llm_configured = False
+_vector_store_provider = None
+_reranker = None
+_reranker_resolved = False
+_pipeline = None
+_parse_pool = None
+_embedding_cache = None
+_embedding_cache_resolved = False
+_ingest_jobs = None
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def ensure_llm_settings():
+    """LlamaIndex Settings.llm / Settings.embed_model, configured once per process."""
+    global _llm_configured
+    if not _llm_configured:
+        configure_llm_settings()
+        _llm_configured = True
+
+
+def get_vector_store_provider():
+    """Shared vector store provider: one Qdrant sync/async client pair and one sparse model."""
+    global _vector_store_provider
+    if _vector_store_provider is None:
+        from app.rag.vectorstores.factory import get_vector_store_provider as build_vector_store_provider
+        _vector_store_provider = build_vector_store_provider()
+    return _vector_store_provider
+
+
+def get_reranker():
+    global _reranker, _reranker_resolved
+    if not _reranker_resolved:
+        from app.rag.reranker_providers.factory import get_reranker as build_reranker
+        _reranker = build_reranker()
+        _reranker_resolved = True
+    return _reranker
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        from app.rag.pipeline import HybridRAG
+        _pipeline = HybridRAG()
+    return _pipeline
+
+
+def get_parse_pool():
+    """Ingestion's PDF parse pool; its processes are spawned on the first parse, not here."""
+    global _parse_pool
+    if _parse_pool is None:
+        from app.rag.parsing import ParsePool
+        processes = app_settings.INGEST_PARSE_PROCESSES
+        if processes < 0:
+            cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+            processes = min(4, cores) if cores > 1 else 0
+        _parse_pool = ParsePool(processes)
+    return _parse_pool
+
+
+def get_embedding_cache():
+    """Ingestion's on-disk chunk-embedding cache, or None when EMBEDDING_CACHE_DIR is empty."""
+    global _embedding_cache, _embedding_cache_resolved
+    if not _embedding_cache_resolved:
+        if app_settings.EMBEDDING_CACHE_DIR:
+            from app.rag.embedding_cache import EmbeddingCache
+            _embedding_cache = EmbeddingCache(
+                app_settings.EMBEDDING_CACHE_DIR,
+                dense_model=app_settings.EMBEDDING_MODEL,
+                dim=app_settings.EMBEDDING_DIM,
+                sparse_model=app_settings.SPARSE_MODEL,
+            )
+        _embedding_cache_resolved = True
+    return _embedding_cache
+
+
+def get_ingest_jobs():
+    """Background ingest jobs submitted from this worker; the job process pool starts on first submit."""
+    global _ingest_jobs
+    if _ingest_jobs is None:
+        from app.rag.ingest_jobs import IngestJobs
+        _ingest_jobs = IngestJobs(
+            max_concurrent=app_settings.INGEST_MAX_CONCURRENT_JOBS,
+            max_queued=app_settings.INGEST_MAX_QUEUED_JOBS,
+        )
+    return _ingest_jobs
+
+
+async def startup():
+    rss_before = rss_mb()
+    start = time.perf_counter()
+
+    ensure_llm_settings()
+    get_vector_store_provider()
+    get_reranker()
+    get_pipeline()
+
+    logger.info(
+        "providers_started",
+        startup_seconds=round(time.perf_counter() - start, 3),
+        rss_before_mb=round(rss_before, 1),
+        rss_after_mb=round(rss_mb(), 1),
+        vector_store=app_settings.VECTOR_STORE_PROVIDER,
+        sparse=app_settings.SPARSE_PROVIDER,
+        reranker=app_settings.RERANKER_PROVIDER,
+    )
+
+
+async def shutdown():
+    global _vector_store_provider, _reranker, _reranker_resolved, _pipeline, _parse_pool, _ingest_jobs
+
+    if _ingest_jobs is not None:
+        await _ingest_jobs.close()
+
+    if _reranker is not None and hasattr(_reranker, "aclose"):
+        await _reranker.aclose()
+
+    if _vector_store_provider is not None:
+        await _vector_store_provider.close()
+
+    if _parse_pool is not None:
+        _parse_pool.close()
+
+    from app.utils.cache import redis_client
+    await redis_client.aclose()
+
+    _vector_store_provider = None
+    _reranker = None
+    _reranker_resolved = False
+    _pipeline = None
+    _parse_pool = None
+    _ingest_jobs = None
+    logger.info("providers_stopped", rss_mb=round(rss_mb(), 1))
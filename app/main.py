@@ -1,10 +1,12 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from app.utils.logging import setup_logging, logging_middleware
 from app.api.endpoints import ingest, query
 from app.config import app_settings
 from app.utils.cache import init_cache_index
+from app.core import registry
+from app.core.observability import metrics
 import redis.asyncio as redis
 from app.config import app_settings   # already imported, but for redis_client if needed
 
@@ -14,9 +16,10 @@ redis_client = redis.from_url(app_settings.REDIS_URL, decode_responses=True)  #
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await registry.startup()
     await init_cache_index()
     yield
-    # Optional: await redis_client.aclose()
+    await registry.shutdown()
 
 app = FastAPI(
     title=app_settings.APP_NAME,
@@ -29,4 +32,9 @@ app = FastAPI(
 app.middleware("http")(logging_middleware)
 
 app.include_router(ingest.router)
-app.include_router(query.router)
\ No newline at end of file
+app.include_router(query.router)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
\ No newline at end of file
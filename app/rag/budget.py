@@ -0,0 +1,51 @@
+"""Per-request latency budget: stages check what's left and degrade instead of overrunning."""
+import time
+from dataclasses import dataclass, field
+
+import structlog
+
+from app.core.observability.metrics import BUDGET_DEGRADATIONS
+
+logger = structlog.get_logger()
+
+@dataclass
+class LatencyBudget:
+    seconds: float | None                  # total budget; None = unbounded
+    trace_id: str = ""
+    started: float = field(default_factory=time.monotonic)
+    degradations: list[str] = field(default_factory=list)
+
+    @classmethod
+    def start(cls, seconds: float | None, trace_id: str = "") -> "LatencyBudget":
+        return cls(seconds=seconds if seconds and seconds > 0 else None, trace_id=trace_id)
+
+    @property
+    def bounded(self) -> bool:
+        return self.seconds is not None
+
+    def remaining(self, reserve: float = 0.0) -> float | None:
+        """Seconds left after holding back `reserve` for later stages; None when unbounded."""
+        if self.seconds is None:
+            return None
+        return self.seconds - (time.monotonic() - self.started) - reserve
+
+    def degrade(self, name: str, **details):
+        self.degradations.append(name)
+        BUDGET_DEGRADATIONS.labels(kind=name).inc()
+        remaining = self.remaining()
+        logger.info(
+            "latency_budget_degraded",
+            trace_id=self.trace_id,
+            degradation=name,
+            budget_seconds=self.seconds,
+            remaining_seconds=round(remaining, 4) if remaining is not None else None,
+            **details,
+        )
+
+    def summary(self) -> dict:
+        remaining = self.remaining()
+        return {
+            "seconds": self.seconds,
+            "remaining_seconds": round(remaining, 4) if remaining is not None else None,
+            "degradations": list(self.degradations),
+        }
@@ -0,0 +1,235 @@
+"""On-disk chunk-embedding cache for ingestion, keyed by model and chunk text.
+
+Re-ingesting (recreate=True, a chunking tweak, a new collection) sees mostly
+the same chunk texts again; their vectors come from here instead of the
+embedding API or the SPLADE model. One directory per model, append-only
+files:
+
+    keys        16-byte blake2b digests of the text; row i belongs to key i
+    dense.f32   row-major float32 [rows, dim], memory-mapped
+    offsets     int64 (start, length) per row into the two arrays below
+    indices     uint32 SPLADE term ids, memory-mapped
+    values      float32 SPLADE weights, memory-mapped
+
+Data is written before its key, so a crash leaves unreferenced bytes, never
+a key pointing at garbage. Writers take an flock and every reader picks up
+keys appended by other workers, so API workers can share one directory.
+Within a process, new rows are mapped before their keys become visible, and
+a lock covers refresh, lookup and read, so embed worker threads can share
+one store.
+"""
+import fcntl
+import hashlib
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger()
+
+KEY_BYTES = 16
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=KEY_BYTES).digest()
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class _KeyedStore:
+    """Row index over an append-only `keys` file, shared between processes."""
+
+    def __init__(self, directory: Path):
+        self.dir = directory
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._keys_path = self.dir / "keys"
+        self._keys_path.touch(exist_ok=True)
+        self._rows: dict[bytes, int] = {}
+        self._keys_read = 0  # bytes of the keys file already indexed
+        self._lock = threading.RLock()  # embed workers call get/put from different threads
+
+    def _refresh(self):
+        with self._lock:
+            size = self._keys_path.stat().st_size
+            size -= size % KEY_BYTES
+            if size <= self._keys_read:
+                return
+            with open(self._keys_path, "rb") as f:
+                f.seek(self._keys_read)
+                data = f.read(size - self._keys_read)
+            # Map the new rows before publishing their keys, so a lookup never outruns the arrays
+            self._on_grow(size // KEY_BYTES)
+            row = self._keys_read // KEY_BYTES
+            for i in range(0, len(data), KEY_BYTES):
+                self._rows.setdefault(data[i:i + KEY_BYTES], row)
+                row += 1
+            self._keys_read = size
+
+    @property
+    def rows(self) -> int:
+        return self._keys_read // KEY_BYTES
+
+    def _on_grow(self, rows: int):
+        pass
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock, open(self.dir / "lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _append_keys(self, keys: list[bytes]):
+        # At the last whole key, not the end of file: a crash mid-write can leave a partial one
+        with open(self._keys_path, "r+b") as f:
+            f.seek(self._keys_read)
+            f.write(b"".join(keys))
+        self._refresh()
+
+    def lookup(self, texts: list[str]) -> tuple[list[bytes], list[int | None]]:
+        self._refresh()
+        keys = [text_key(text) for text in texts]
+        return keys, [self._rows.get(key) for key in keys]
+
+    def __len__(self):
+        self._refresh()
+        return len(self._rows)
+
+
+class DenseCache(_KeyedStore):
+
+    def __init__(self, directory: Path, dim: int):
+        self.dim = dim
+        self._vectors_path = directory / "dense.f32"
+        self._mm: np.memmap | None = None
+        super().__init__(directory)
+        self._vectors_path.touch(exist_ok=True)
+
+    def _on_grow(self, rows: int):
+        # Re-map to cover the new rows (keys are written after their vectors)
+        self._mm = None
+        if rows:
+            self._mm = np.memmap(
+                self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)
+            )
+
+    def get(self, texts: list[str]) -> list[list[float] | None]:
+        with self._lock:
+            _, rows = self.lookup(texts)
+            hits = [i for i, row in enumerate(rows) if row is not None]
+            # One gather from the page cache
+            block = self._mm[[rows[i] for i in hits]] if hits else None
+        out: list[list[float] | None] = [None] * len(texts)
+        if hits:
+            for i, vector in zip(hits, block.tolist()):
+                out[i] = vector
+        return out
+
+    def put(self, texts: list[str], vectors: list[list[float]]):
+        with self._write_lock():
+            new = {}
+            for text, vector in zip(texts, vectors):
+                key = text_key(text)
+                if key not in self._rows and key not in new:
+                    new[key] = vector
+            if not new:
+                return
+            block = np.asarray(list(new.values()), dtype=np.float32)
+            if block.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dim {block.shape[1]} does not match cache dim {self.dim}"
+                )
+            with open(self._vectors_path, "r+b") as f:
+                f.seek(self.rows * self.dim * 4)
+                f.write(block.tobytes())
+            self._append_keys(list(new))
+
+
+class SparseCache(_KeyedStore):
+
+    def __init__(self, directory: Path):
+        self._offsets = np.zeros((0, 2), dtype=np.int64)
+        self._indices: np.memmap | None = None
+        self._values: np.memmap | None = None
+        super().__init__(directory)
+        for name in ("offsets", "indices", "values"):
+            (directory / name).touch(exist_ok=True)
+
+    def _on_grow(self, rows: int):
+        offsets = np.fromfile(self.dir / "offsets", dtype=np.int64, count=rows * 2)
+        self._offsets = offsets.reshape(rows, 2)
+        total = int(self._offsets[-1].sum()) if rows else 0
+        self._indices = self._values = None
+        if total:
+            self._indices = np.memmap(self.dir / "indices", np.uint32, mode="r", shape=(total,))
+            self._values = np.memmap(self.dir / "values", np.float32, mode="r", shape=(total,))
+
+    def get(self, texts: list[str]) -> list[tuple[list[int], list[float]] | None]:
+        with self._lock:
+            _, rows = self.lookup(texts)
+            out = []
+            for row in rows:
+                if row is None:
+                    out.append(None)
+                    continue
+                start, length = self._offsets[row]
+                if length == 0:
+                    out.append(([], []))
+                    continue
+                end = start + length
+                out.append((self._indices[start:end].tolist(), self._values[start:end].tolist()))
+        return out
+
+    def put(self, texts: list[str], indices: list[list[int]], values: list[list[float]]):
+        with self._write_lock():
+            new = {}
+            for text, idx, val in zip(texts, indices, values):
+                key = text_key(text)
+                if key not in self._rows and key not in new:
+                    new[key] = (idx, val)
+            if not new:
+                return
+
+            start = int(self._offsets[-1].sum()) if len(self._offsets) else 0
+            offsets, all_idx, all_val = [], [], []
+            for idx, val in new.values():
+                offsets.append((start, len(idx)))
+                start += len(idx)
+                all_idx.extend(idx)
+                all_val.extend(val)
+
+            # Arrays first, then offsets, then keys: readers only follow what the keys reach
+            first = offsets[0][0]
+            self._write_at(self.dir / "indices", np.asarray(all_idx, dtype=np.uint32), first * 4)
+            self._write_at(self.dir / "values", np.asarray(all_val, dtype=np.float32), first * 4)
+            self._write_at(self.dir / "offsets", np.asarray(offsets, np.int64), self.rows * 16)
+            self._append_keys(list(new))
+
+    @staticmethod
+    def _write_at(path: Path, array: np.ndarray, position: int):
+        with open(path, "r+b") as f:
+            f.seek(position)
+            f.write(array.tobytes())
+
+
+class EmbeddingCache:
+    """Dense and (optionally) sparse caches for the configured models."""
+
+    def __init__(self, root: str, dense_model: str, dim: int, sparse_model: str | None):
+        root = Path(root)
+        self.dense = DenseCache(root / "dense" / f"{_slug(dense_model)}-{dim}", dim)
+        self.sparse = SparseCache(root / "sparse" / _slug(sparse_model)) if sparse_model else None
+        logger.info(
+            "embedding_cache_opened",
+            path=str(root),
+            dense_entries=len(self.dense),
+            sparse_entries=len(self.sparse) if self.sparse is not None else 0,
+        )
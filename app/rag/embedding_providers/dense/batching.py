@@ -0,0 +1,143 @@
+"""Cross-request micro-batching for single-text dense embeddings.
+
+Each request embeds its query alone (`aget_text_embedding`), so N concurrent
+requests mean N embeddings API calls. MicroBatchingEmbedding wraps the real
+model and coalesces single-text calls that arrive within a short window into
+one batched call. Query-mode calls are coalesced too: through the same queue
+when the model embeds queries and texts alike, else through a queue of their
+own. Batch calls (ingestion) go straight to the wrapped model.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+
+def query_modes_match(model: BaseEmbedding) -> bool:
+    """Whether `model` embeds a query the same way as a text, so one vector serves both."""
+    declared = getattr(model, "query_modes_match", None)
+    if declared is not None:
+        return declared
+    # OpenAIEmbedding: one engine per mode, the same for every current model
+    engines = getattr(model, "_query_engine", None), getattr(model, "_text_engine", None)
+    return engines[0] is not None and engines[0] == engines[1]
+
+
+class AsyncMicroBatcher:
+    """Collects submit() calls on the event loop; flushes at max_batch or after `window` seconds."""
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[Embedding]]],
+        max_batch: int,
+        window: float,
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, text: str) -> Embedding:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # New event loop (scripts calling asyncio.run more than once): old timers are gone
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            self._timer = self._loop.call_later(self.window, self._flush)
+        if not batch:
+            return
+
+        task = self._loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        # Callers that were cancelled still ride along; their result is dropped
+        try:
+            embeddings = await self.embed_batch([text for text, _ in batch])
+            if len(embeddings) != len(batch):
+                raise RuntimeError(f"Embedding count mismatch: expected {len(batch)}, got {len(embeddings)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
+class MicroBatchingEmbedding(BaseEmbedding):
+    """Wraps an embedding model; concurrent single-text calls share one API request per mode."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _batcher: AsyncMicroBatcher = PrivateAttr()
+    _query_batcher: AsyncMicroBatcher | None = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, window: float, max_batch: int | None = None, **kwargs: Any):
+        max_batch = max_batch or inner.embed_batch_size
+        super().__init__(model_name=inner.model_name, embed_batch_size=max_batch, **kwargs)
+        self._inner = inner
+        self._batcher = AsyncMicroBatcher(inner._aget_text_embeddings, max_batch=max_batch, window=window)
+
+        aget_query_embeddings = getattr(inner, "_aget_query_embeddings", None)
+        if query_modes_match(inner):
+            self._query_batcher = self._batcher
+        elif aget_query_embeddings is not None:
+            self._query_batcher = AsyncMicroBatcher(aget_query_embeddings, max_batch=max_batch, window=window)
+        else:
+            self._query_batcher = None  # no batch query call to coalesce into
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MicroBatchingEmbedding"
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    @property
+    def query_modes_match(self) -> bool:
+        return query_modes_match(self._inner)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._inner._get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        if self._query_batcher is None:
+            return await self._inner._aget_query_embedding(query)
+        return await self._query_batcher.submit(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._inner._get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._batcher.submit(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._inner._get_text_embeddings(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._inner._aget_text_embeddings(texts)
@@ -1,7 +1,11 @@
-from .openai_provider import OpenAIProvider
-
 def get_dense_provider(provider:str = "openai"):
+    # Imported per branch: "openai" keeps fastembed/onnxruntime out of API workers
     if provider == "openai":
+        from .openai_provider import OpenAIProvider
         return OpenAIProvider()
+
+    if provider == "fastembed":
+        from .fastembed_provider import FastEmbedProvider
+        return FastEmbedProvider()
     
     raise ValueError(f"Unsupported dense provider: {provider}")
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, List
+
+from fastembed import TextEmbedding
+from fastembed.text.text_embedding_base import TextEmbeddingBase
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from .base import BaseDenseEmbedProvider
+from .batching import MicroBatchingEmbedding
+
+
+class FastEmbedEmbedding(BaseEmbedding):
+    """Local ONNX dense embeddings (CPU); async calls run off the event loop."""
+
+    _model: TextEmbedding = PrivateAttr()
+
+    def __init__(self, model: TextEmbedding, model_name: str, embed_batch_size: int, **kwargs: Any):
+        super().__init__(model_name=model_name, embed_batch_size=embed_batch_size, **kwargs)
+        self._model = model
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FastEmbedEmbedding"
+
+    @property
+    def query_modes_match(self) -> bool:
+        # The base query_embed is plain embed(); models with a query prefix or task override it
+        return type(self._model).query_embed is TextEmbeddingBase.query_embed
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return next(self._model.query_embed(query)).tolist()
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    def _get_query_embeddings(self, queries: List[str]) -> List[Embedding]:
+        return [e.tolist() for e in self._model.query_embed(queries, batch_size=self.embed_batch_size)]
+
+    async def _aget_query_embeddings(self, queries: List[str]) -> List[Embedding]:
+        return await asyncio.to_thread(self._get_query_embeddings, queries)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await asyncio.to_thread(self._get_text_embedding, text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return [e.tolist() for e in self._model.embed(texts, batch_size=self.embed_batch_size)]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await asyncio.to_thread(self._get_text_embeddings, texts)
+
+
+class FastEmbedProvider(BaseDenseEmbedProvider):
+    def __init__(self):
+        from app.config import app_settings
+        self.model = app_settings.EMBEDDING_MODEL
+        self.batch_size = app_settings.EMBED_BATCH_SIZE
+        self.batch_window = app_settings.DENSE_QUERY_BATCH_WINDOW_MS / 1000
+        self.model_dir = app_settings.DENSE_MODEL_DIR or None
+        self.threads = app_settings.DENSE_THREADS or None
+        self.dim = app_settings.EMBEDDING_DIM
+
+    def get_dense_model(self) -> BaseEmbedding:
+        model = TextEmbedding(
+            model_name=self.model,
+            cache_dir=self.model_dir,
+            threads=self.threads,
+            # A model directory means air-gapped: never try the hub
+            local_files_only=self.model_dir is not None,
+        )
+
+        # Collection and cache index are sized by EMBEDDING_DIM
+        dim = len(next(model.embed(["dimension probe"])))
+        if dim != self.dim:
+            raise ValueError(
+                f"{self.model} produces {dim}-dim embeddings but EMBEDDING_DIM={self.dim}"
+            )
+
+        embed_model = FastEmbedEmbedding(model, model_name=self.model, embed_batch_size=self.batch_size)
+        if self.batch_window <= 0:
+            return embed_model
+        # Concurrent per-request query embeddings share one ONNX batch
+        return MicroBatchingEmbedding(embed_model, window=self.batch_window, max_batch=self.batch_size)
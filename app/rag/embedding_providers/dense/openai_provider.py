@@ -1,14 +1,21 @@
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.embeddings.openai import OpenAIEmbedding
 from .base import BaseDenseEmbedProvider
+from .batching import MicroBatchingEmbedding
 
 class OpenAIProvider(BaseDenseEmbedProvider):
     def __init__(self):
         from app.config import app_settings
         self.model = app_settings.EMBEDDING_MODEL
         self.batch_size = app_settings.EMBED_BATCH_SIZE
+        self.batch_window = app_settings.DENSE_QUERY_BATCH_WINDOW_MS / 1000
 
-    def get_dense_model(self) -> OpenAIEmbedding:
-        return OpenAIEmbedding(
+    def get_dense_model(self) -> BaseEmbedding:
+        model = OpenAIEmbedding(
             model=self.model,
             embed_batch_size=self.batch_size,  # Critical for ingest speed
-        )
\ No newline at end of file
+        )
+        if self.batch_window <= 0:
+            return model
+        # Concurrent per-request query embeddings share one embeddings call
+        return MicroBatchingEmbedding(model, window=self.batch_window, max_batch=self.batch_size)
\ No newline at end of file
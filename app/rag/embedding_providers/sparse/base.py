@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Tuple
 
@@ -14,4 +15,17 @@ class BaseSparseEmbeddingProvider(ABC):
     def embed_query(
         self, texts: List[str]
     ) -> Tuple[List[List[int]], List[List[float]]]:
-        pass
\ No newline at end of file
+        pass
+
+    async def aembed_query(
+        self, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        """Off the event loop; providers may batch concurrent queries."""
+        return await asyncio.to_thread(self.embed_query, texts)
+
+    def close(self):
+        """Release executors / sessions; optional."""
+        pass
+
+    async def aclose(self):
+        self.close()
\ No newline at end of file
@@ -1,7 +1,11 @@
-from .splade_provider import SparseEmbeddingProvider
-
 def get_sparse_provider(provider:str = "fastembed"):
+    # Imported per branch: "remote" keeps fastembed/onnxruntime out of API workers
     if provider == "fastembed":
+        from .splade_provider import SparseEmbeddingProvider
         return SparseEmbeddingProvider()
+
+    if provider == "remote":
+        from .remote_provider import RemoteSparseEmbeddingProvider
+        return RemoteSparseEmbeddingProvider()
     
     raise ValueError(f"Unsupported sparse provider: {provider}")
\ No newline at end of file
@@ -0,0 +1,78 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+SparseBatch = Tuple[List[List[int]], List[List[float]]]
+
+
+class SparseQueryBatcher:
+    """Coalesces concurrent sparse query encodings into one `embed()` batch, run off the event loop.
+
+    A batch is flushed when `max_batch` queries are waiting, `window` seconds
+    after the first one arrived, or, if the encoder is busy, as soon as it
+    frees up. Under load, concurrent queries therefore share batches instead
+    of queueing one model call each.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], SparseBatch], max_batch: int, window: float):
+        self.embed_batch = embed_batch
+        self.max_batch = max_batch
+        self.window = window
+        # One encoder thread: ONNX already parallelizes within a batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sparse-query")
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._busy = False
+
+    async def embed(self, text: str) -> SparseBatch:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch and not self._busy:
+            self._flush()
+        elif self._timer is None and not self._busy:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Still waiting on the previous batch: this one goes out when it returns
+        if self._busy or not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        self._busy = True
+
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self._executor, self.embed_batch, [text for text, _ in batch])
+        job.add_done_callback(lambda done: self._resolve(batch, done))
+
+    def _resolve(self, batch, job: asyncio.Future):
+        self._busy = False
+
+        try:
+            indices, values = job.result()
+        except Exception as e:
+            logger.error("sparse_query_batch_failed", batch_size=len(batch), error=str(e))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(([indices[i]], [values[i]]))
+
+        if self._pending:
+            self._flush()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,61 @@
+import httpx
+from .base import BaseSparseEmbeddingProvider
+from typing import List, Tuple
+
+class RemoteSparseEmbeddingProvider(BaseSparseEmbeddingProvider):
+    """SPLADE via services/sparse_service: no model in the API process, the service batches across workers."""
+
+    def __init__(self):
+        from app.config import app_settings
+        self.url = app_settings.SPARSE_SERVICE_URL.rstrip("/")
+        self.timeout = app_settings.SPARSE_SERVICE_TIMEOUT
+        self.chunk_size = app_settings.SPARSE_SERVICE_CHUNK_SIZE
+        # Lets the service drop our texts once we've given up on them
+        headers = {"X-Request-Timeout": str(self.timeout)}
+        # Ingestion calls embed_documents from threads; queries go through aembed_query on the loop
+        self.client = httpx.Client(base_url=self.url, timeout=self.timeout, headers=headers)
+        self.async_client = httpx.AsyncClient(base_url=self.url, timeout=self.timeout, headers=headers)
+
+    @staticmethod
+    def _unpack(response: httpx.Response) -> Tuple[List[List[int]], List[List[float]]]:
+        response.raise_for_status()
+        embeddings = response.json()["embeddings"]
+        return [e["indices"] for e in embeddings], [e["values"] for e in embeddings]
+
+    def embed_documents(
+        self, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        indices_list = []
+        values_list = []
+
+        for i in range(0, len(texts), self.chunk_size):
+            indices, values = self._unpack(
+                self.client.post(
+                    "/embed", json={"texts": texts[i:i + self.chunk_size], "kind": "document"}
+                )
+            )
+            indices_list.extend(indices)
+            values_list.extend(values)
+
+        return indices_list, values_list
+
+    def embed_query(
+        self, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        response = self.client.post("/embed", json={"texts": texts[:1], "kind": "query"})
+        return self._unpack(response)
+
+    async def aembed_query(
+        self, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        response = await self.async_client.post(
+            "/embed", json={"texts": texts[:1], "kind": "query"}
+        )
+        return self._unpack(response)
+
+    def close(self):
+        self.client.close()
+
+    async def aclose(self):
+        self.client.close()
+        await self.async_client.aclose()
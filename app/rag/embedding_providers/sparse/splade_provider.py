@@ -1,11 +1,17 @@
 from fastembed import SparseTextEmbedding
 from .base import BaseSparseEmbeddingProvider
+from .query_batcher import SparseQueryBatcher
 from typing import List, Tuple
 
 class SparseEmbeddingProvider(BaseSparseEmbeddingProvider):
     def __init__(self):
         from app.config import app_settings
         self.sparse_model = SparseTextEmbedding(model_name=app_settings.SPARSE_MODEL)
+        self.query_batcher = SparseQueryBatcher(
+            self.embed_documents,
+            max_batch=app_settings.SPARSE_QUERY_MAX_BATCH,
+            window=app_settings.SPARSE_QUERY_BATCH_WINDOW_MS / 1000,
+        )
 
     def embed_documents(
         self, texts: List[str]
@@ -24,4 +30,12 @@ class SparseEmbeddingProvider(BaseSparseEmbeddingProvider):
         self, texts: List[str]
     ) -> Tuple[List[List[int]], List[List[float]]]:
         emb = next(self.sparse_model.embed(texts))
-        return [emb.indices.tolist()], [emb.values.tolist()]
\ No newline at end of file
+        return [emb.indices.tolist()], [emb.values.tolist()]
+
+    async def aembed_query(
+        self, texts: List[str]
+    ) -> Tuple[List[List[int]], List[List[float]]]:
+        return await self.query_batcher.embed(texts[0])
+
+    def close(self):
+        self.query_batcher.shutdown()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from app.config import configure_llm_settings
+from app.core.registry import ensure_llm_settings
 from llama_index.core import PromptTemplate
 import yaml
 import structlog
@@ -12,12 +12,12 @@ qa_prompt = PromptTemplate(prompts["v2"]["qa"])
 
 class LLMGenerator:
     def __init__(self):
-        configure_llm_settings()
+        ensure_llm_settings()
         # Grab the model from the global settings once
         from llama_index.core import Settings 
         self.llm = Settings.llm
     
-    async def generate(self, query: str, final_nodes: list):
+    async def generate(self, query: str, final_nodes: list, max_tokens: int | None = None):
         try:
             if not final_nodes:
                 # logger.warning("No relevant nodes retrieved for query", query=query)
@@ -28,7 +28,8 @@ class LLMGenerator:
                 # Build simple context from retrieved nodes
                 context_str = "\n\n".join([n.node.text for n in final_nodes])
                 prompt = qa_prompt.format(context_str=context_str, query_str=query)
-                response = await self.llm.acomplete(prompt)
+                # max_tokens: capped by the request's latency budget
+                response = await self.llm.acomplete(prompt, **({"max_tokens": max_tokens} if max_tokens else {}))
                 answer = response.text
                 sources = [n.node.metadata for n in final_nodes]
 
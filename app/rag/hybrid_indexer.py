@@ -1,20 +1,76 @@
+import asyncio
+from contextlib import nullcontext
 
-from llama_index.core import VectorStoreIndex, StorageContext
-from app.rag.vectorstores.factory import get_vector_store_provider
+from llama_index.core import Settings
+from llama_index.core.schema import MetadataMode
+from app.core.registry import get_embedding_cache, get_vector_store_provider
 
 class HybridIndexer:
     def __init__(self):
         self.store_provider = get_vector_store_provider()
         self.vector_store = self.store_provider.get_vector_store()
+        self.hybrid = self.store_provider.supports_sparse()
+        self.cache = get_embedding_cache()
+        self.cache_hits = {"dense": 0, "sparse": 0}
 
-    def build_index(self, nodes):
-        storage_context = StorageContext.from_defaults(
-            vector_store=self.vector_store
-        )
-
-        return VectorStoreIndex(
-            nodes,
-            storage_context=storage_context,
-            show_progress=True,
-            use_async=True
-        )
\ No newline at end of file
+    # ------------------------
+    # Streaming ingestion: embed and upsert one batch at a time
+    # ------------------------
+    @staticmethod
+    def embed_texts(nodes) -> list[str]:
+        # Same text LlamaIndex embeds (and feeds the sparse encoder) when it indexes a node
+        return [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+
+    async def embed(self, nodes):
+        """Dense + sparse for a batch, concurrently. Sets node embeddings; returns the sparse vectors (or None).
+
+        Texts already in the embedding cache skip the provider calls; new vectors are added to it.
+        """
+        texts = self.embed_texts(nodes)
+        if self.hybrid:
+            dense, sparse = await asyncio.gather(self._embed_dense(texts), self._embed_sparse(texts))
+        else:
+            dense, sparse = await self._embed_dense(texts), None
+
+        for node, embedding in zip(nodes, dense):
+            node.embedding = embedding
+        return sparse
+
+    async def _embed_dense(self, texts):
+        if self.cache is None:
+            return await Settings.embed_model.aget_text_embedding_batch(texts)
+
+        vectors = await asyncio.to_thread(self.cache.dense.get, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        self.cache_hits["dense"] += len(texts) - len(missing)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            fresh = await Settings.embed_model.aget_text_embedding_batch(missing_texts)
+            await asyncio.to_thread(self.cache.dense.put, missing_texts, fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return vectors
+
+    async def _embed_sparse(self, texts):
+        if self.cache is None or self.cache.sparse is None:
+            return await self.store_provider.aembed_sparse_documents(texts)
+
+        vectors = await asyncio.to_thread(self.cache.sparse.get, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        self.cache_hits["sparse"] += len(texts) - len(missing)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            indices, values = await self.store_provider.aembed_sparse_documents(missing_texts)
+            await asyncio.to_thread(self.cache.sparse.put, missing_texts, indices, values)
+            for i, vector in zip(missing, zip(indices, values)):
+                vectors[i] = vector
+        return [v[0] for v in vectors], [v[1] for v in vectors]
+
+    async def upsert(self, nodes, sparse=None):
+        precomputed = self.store_provider.precomputed_sparse(self.embed_texts(nodes), sparse) if sparse else nullcontext()
+        with precomputed:
+            return await self.vector_store.async_add(nodes)
+
+    async def delete(self, point_ids: list[str], batch_size: int = 1000):
+        for i in range(0, len(point_ids), batch_size):
+            await self.vector_store.adelete_nodes(node_ids=point_ids[i:i + batch_size])
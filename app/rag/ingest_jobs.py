@@ -0,0 +1,224 @@
+"""Background ingestion jobs: submitted by the API, run in worker processes, tracked in Redis.
+
+POST /ingest only records a job and hands it to a process pool, so a large
+ingest never runs on an API worker's event loop. The job process reports
+status and per-stage progress to Redis, where GET /ingest/{job_id} reads it
+from any API worker. The pool size bounds concurrently running jobs per API
+worker; beyond INGEST_MAX_QUEUED_JOBS waiting ones, submissions are refused.
+On shutdown, jobs that don't finish within INGEST_SHUTDOWN_GRACE are terminated
+and marked `interrupted`.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import redis.asyncio as redis
+import structlog
+
+from app.config import app_settings
+
+logger = structlog.get_logger()
+
+JOB_KEY = "ingest_job:{}"
+
+
+class JobsFull(Exception):
+    pass
+
+
+class JobStore:
+    """One Redis hash per job, each field JSON-encoded, expiring INGEST_JOB_TTL after its last update."""
+
+    def __init__(self, url: str):
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def update(self, job_id: str, /, **fields):
+        key = JOB_KEY.format(job_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={name: json.dumps(value) for name, value in fields.items()})
+            pipe.expire(key, app_settings.INGEST_JOB_TTL)
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> dict | None:
+        fields = await self._redis.hgetall(JOB_KEY.format(job_id))
+        return {name: json.loads(value) for name, value in fields.items()} or None
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+
+# ------------------------
+# Job process side
+# ------------------------
+
+_job_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _init_job_process():
+    from app.utils.logging import setup_logging
+    setup_logging()
+    signal.signal(signal.SIGTERM, _terminate_job_process)
+
+
+def _terminate_job_process(signum, frame):
+    # Shutdown gave up on the job: its parse workers don't notice this process exiting, so kill them
+    for child in multiprocessing.active_children():
+        child.kill()
+    os._exit(128 + signum)
+
+
+def run_job(job_id: str, input_path: str, recreate: bool, cleanup: bool):
+    # One loop for the life of the job process: the registry's async clients stay bound to it across jobs
+    global _job_loop
+    if _job_loop is None:
+        _job_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_job_loop)
+    _job_loop.run_until_complete(_run_job(job_id, input_path, recreate, cleanup))
+
+
+async def _run_job(job_id: str, input_path: str, recreate: bool, cleanup: bool):
+    from app.core.registry import get_parse_pool
+    from app.rag.ingestion import ingest_documents
+
+    store = JobStore(app_settings.REDIS_URL)
+
+    async def progress(snapshot: dict):
+        try:
+            await store.update(job_id, progress=snapshot)
+        except Exception as e:
+            # Progress is best-effort; the ingest carries on
+            logger.warning("ingest_job_progress_failed", job_id=job_id, error=str(e))
+
+    try:
+        await store.update(job_id, status="running", started_at=time.time())
+        logger.info("ingest_job_started", job_id=job_id, input_path=input_path, recreate=recreate)
+        result = await ingest_documents(input_path, recreate, on_progress=progress)
+        await store.update(job_id, status="succeeded", finished_at=time.time(), result=result)
+        logger.info("ingest_job_finished", job_id=job_id, nodes=result["nodes"])
+    except Exception as e:
+        await store.update(job_id, status="failed", finished_at=time.time(), error=str(e))
+        logger.error("ingest_job_failed", job_id=job_id, error=str(e))
+    finally:
+        if cleanup:
+            shutil.rmtree(input_path, ignore_errors=True)
+        # The parse pool's processes must exit before this one can (multiprocessing joins its children)
+        get_parse_pool().close()
+        await store.aclose()
+
+
+# ------------------------
+# API side
+# ------------------------
+
+class IngestJobs:
+
+    def __init__(self, max_concurrent: int, max_queued: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.store = JobStore(app_settings.REDIS_URL)
+        self._executor: ProcessPoolExecutor | None = None
+        self._futures: dict[str, Future] = {}  # submitted from this API worker, not finished
+        self._watchers: set[asyncio.Task] = set()
+        self._closing = False
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Spawned lazily: API workers that never ingest never start one
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_concurrent,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_job_process,
+            )
+        return self._executor
+
+    async def submit(self, input_path: str, recreate: bool = False, cleanup: bool = False) -> dict:
+        """Queue an ingest of `input_path`; `cleanup` deletes it when the job ends (uploads)."""
+        if len(self._futures) >= self.max_concurrent + self.max_queued:
+            raise JobsFull(f"{len(self._futures)} ingest jobs already running or queued")
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "input_path": input_path,
+            "recreate": recreate,
+            "submitted_at": time.time(),
+        }
+        await self.store.update(job_id, **job)
+
+        future = self._pool().submit(run_job, job_id, input_path, recreate, cleanup)
+        self._futures[job_id] = future
+        watcher = asyncio.create_task(self._watch(job_id, future, input_path, cleanup))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+
+        logger.info("ingest_job_submitted", job_id=job_id, input_path=input_path, in_flight=len(self._futures))
+        return job
+
+    async def _watch(self, job_id: str, future: Future, input_path: str, cleanup: bool):
+        # The job process records its own outcome; this only covers it dying before it could,
+        # or shutdown cancelling or terminating it (the watcher is cancelled for running jobs)
+        try:
+            await asyncio.wrap_future(future)
+        except BaseException as e:
+            if not self._closing:
+                if not future.done():
+                    raise  # this watcher was cancelled, not the job
+                if isinstance(e, BrokenProcessPool):
+                    # Every job in the pool fails with it; the next submit starts a fresh one
+                    self._executor = None
+                status = "failed"
+                reason = "cancelled" if future.cancelled() else f"job process died: {e!r}"
+            elif future.done() and not future.cancelled() and future.exception() is None:
+                raise  # finished just as shutdown gave up on it; the job recorded its result
+            else:
+                status, reason = "interrupted", "API worker shut down before the job finished"
+            logger.error("ingest_job_lost", job_id=job_id, status=status, error=reason)
+            await self.store.update(job_id, status=status, finished_at=time.time(), error=reason)
+            if cleanup:
+                shutil.rmtree(input_path, ignore_errors=True)
+        finally:
+            self._futures.pop(job_id, None)
+
+    async def get(self, job_id: str) -> dict | None:
+        return await self.store.get(job_id)
+
+    async def close(self, grace: float | None = None):
+        """Cancel queued jobs and give running ones `grace` seconds (INGEST_SHUTDOWN_GRACE) to
+        finish; the rest are terminated and marked `interrupted`, so shutdown never waits on a
+        long ingest."""
+        grace = app_settings.INGEST_SHUTDOWN_GRACE if grace is None else grace
+        self._closing = True
+        for future in list(self._futures.values()):
+            future.cancel()
+
+        if self._watchers:
+            await asyncio.wait(set(self._watchers), timeout=grace)
+
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            if self._futures:
+                logger.warning("ingest_jobs_interrupted", job_ids=list(self._futures))
+                # ProcessPoolExecutor has no public way to stop a running call (3.12)
+                for process in list((executor._processes or {}).values()):
+                    process.terminate()
+            try:
+                await asyncio.wait_for(
+                    asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True), timeout=5
+                )
+            except asyncio.TimeoutError:
+                logger.warning("ingest_pool_shutdown_timeout")
+
+        # Still-waiting watchers record their jobs as interrupted
+        for watcher in self._watchers:
+            watcher.cancel()
+        if self._watchers:
+            await asyncio.gather(*self._watchers, return_exceptions=True)
+        await self.store.aclose()
@@ -1,94 +1,225 @@
+from dataclasses import dataclass
 from pathlib import Path
-import re
+from typing import Awaitable, Callable
+import asyncio
 import time
 from app.rag.hybrid_indexer import HybridIndexer
+from app.rag.manifest import IngestManifest, prepare_documents, assign_point_ids, file_sha256, manifest_path
+from app.rag.stages import Stage, run_stages
+from app.core.registry import ensure_llm_settings, get_parse_pool, get_reranker, peak_rss_mb
 import structlog
-from app.config import app_settings, configure_llm_settings
+from app.config import app_settings
 from llama_index.core.node_parser import SentenceSplitter
-from llama_index.readers.file import PDFReader, PyMuPDFReader
-from llama_index.core import SimpleDirectoryReader
 from llama_index.core import Document
 
-from rag.vectorstores.factory import get_vector_store_provider
 
 logger = structlog.get_logger()
 
-configure_llm_settings()
+ensure_llm_settings()
 
 # ------------------------
-# Text Cleaning
+# Input Files
 # ------------------------
 
-def clean_text(text: str) -> str:
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"endobj.*?obj", "", text, flags=re.DOTALL)
-    text = re.sub(r"/Type\s*/\w+", "", text)
-    return text.strip()
+SUPPORTED_SUFFIXES = [".pdf", ".md", ".txt"]
 
-# ------------------------
-# Dynamic file Loader (Production Robust)
-# ------------------------
-
-def load_documents(input_path: str):
+def list_input_files(input_path: str) -> list[Path]:
     input_path = Path(input_path)
-    documents = []
-
-    pdf_files = list(input_path.glob("**/*.pdf"))
-    other_files = list(input_path.glob("**/*.*"))
-
-    # ---- PDFs
-    for file in pdf_files:
-        try:
-            reader = PyMuPDFReader()
-            docs = reader.load_data(file_path=str(file))
-            logger.info("Loaded PDF with PyMuPDF", file=str(file))
-        except Exception:
-            reader = PDFReader()
-            docs = reader.load_data(file=str(file))
-            logger.warning("Fallback to PDFReader", file=str(file))
-
-        cleaned_docs = [
-            Document(
-                text=clean_text(d.text),
-                metadata=d.metadata,
-            )
-            for d in docs
-        ]
-
-        documents.extend(cleaned_docs)
-
-    # ---- MD / TXT
-    non_pdf_files = [
-        f for f in other_files
-        if f.suffix.lower() in [".md", ".txt"]
-    ]
-
-    if non_pdf_files:
-        reader = SimpleDirectoryReader(
-            input_files=[str(f) for f in non_pdf_files]
-        )
-        docs = reader.load_data()
+    files = sorted(f for f in input_path.glob("**/*.*") if f.suffix.lower() in SUPPORTED_SUFFIXES)
 
-        cleaned_docs = [
-            Document(
-                text=clean_text(d.text),
-                metadata=d.metadata,
-            )
-            for d in docs
-        ]
+    if not files:
+        raise ValueError(f"No supported documents found in '{input_path}'. Supported: {SUPPORTED_SUFFIXES}")
 
-        documents.extend(cleaned_docs)
+    return files
 
-    if not documents:
-        supported = [".pdf", ".txt", ".md", ".docx", ".doc", ".html"]  # adjust to your loader
-        raise ValueError(f"No supported documents found in '{input_path}'. Supported: {supported}")
+# ------------------------
+# Reranker Chunk Store
+# ------------------------
 
-    return documents
+async def publish_chunks(nodes):
+    reranker = get_reranker()
+    try:
+        stored = await reranker.load_chunks(nodes)
+        logger.info("Chunks published to reranker", count=stored)
+    except Exception as e:
+        # Not fatal: the reranker falls back to inline text for unknown IDs
+        logger.warning("Chunk publish to reranker failed", error=str(e))
 
 # ------------------------
 # Ingest Pipeline
+# hash → parse (load + clean, in a process pool) → chunk → embed (dense + sparse) → upsert, streamed through bounded queues:
+# embedding starts with the first file, and memory holds a few files / batches, not the corpus.
+# With a manifest, unchanged files stop at the hash stage and unchanged chunks at the chunk stage
 # ------------------------
-async def ingest_documents(input_path: str, recreate: bool = False):
+@dataclass
+class SourceFile:
+    key: str        # path relative to the ingest root: the manifest key
+    path: Path
+    sha256: str
+    documents: list[Document] | None = None
+
+def build_ingest_stages(
+    indexer: HybridIndexer,
+    root: Path,
+    counts: dict,
+    manifest: IngestManifest | None = None,
+    changed: dict | None = None,
+) -> list[Stage]:
+    splitter = SentenceSplitter(
+        chunk_size=app_settings.CHUNK_SIZE,
+        chunk_overlap=app_settings.CHUNK_OVERLAP,
+        include_prev_next_rel=False,  # see assign_point_ids
+    )
+    publish = app_settings.RERANKER_PROVIDER == "remote" and app_settings.RERANKER_SEND_CHUNK_IDS
+    changed = {} if changed is None else changed
+
+    async def hash_file(path: Path):
+        key = path.relative_to(root).as_posix()
+        sha256 = await asyncio.to_thread(file_sha256, path)
+        if manifest is not None and manifest.unchanged(key, sha256):
+            counts["files_skipped"] += 1
+            return None
+        return [SourceFile(key, path, sha256)]
+
+    parse_pool = get_parse_pool()
+
+    async def parse(source: SourceFile):
+        source.documents = await parse_pool.parse(source.path)
+        counts["docs"] += len(source.documents)
+        return [source]
+
+    def split(source: SourceFile):
+        prepare_documents(source.key, source.documents)
+        return assign_point_ids(source.key, splitter.get_nodes_from_documents(source.documents))
+
+    async def chunk(source: SourceFile):
+        nodes = await asyncio.to_thread(split, source)
+        changed[source.key] = (source.sha256, [node.node_id for node in nodes])
+
+        # Chunks already stored under the same ID (same file, same content) keep their vectors
+        indexed = manifest.indexed_chunks(source.key) if manifest is not None else set()
+        new = [node for node in nodes if node.node_id not in indexed]
+        counts["nodes_skipped"] += len(nodes) - len(new)
+
+        # One list per file; the embed stage regroups them into EMBED_BATCH_SIZE batches
+        return [new]
+
+    async def embed(nodes: list):
+        return [(nodes, await indexer.embed(nodes))]
+
+    async def upsert(batch):
+        nodes, sparse = batch
+        await indexer.upsert(nodes, sparse)
+        counts["nodes"] += len(nodes)
+        # Publish chunk texts so rerank requests can carry IDs only
+        if publish:
+            await publish_chunks(nodes)
+        return None
+
+    return [
+        Stage("hash", hash_file, workers=app_settings.INGEST_LOAD_WORKERS),
+        # Enough concurrent files to keep every pool process busy
+        Stage("parse", parse, workers=max(app_settings.INGEST_LOAD_WORKERS, parse_pool.processes)),
+        Stage("chunk", chunk, workers=app_settings.INGEST_CHUNK_WORKERS),
+        Stage("embed", embed, workers=app_settings.INGEST_EMBED_WORKERS, batch_size=app_settings.EMBED_BATCH_SIZE),
+        Stage("upsert", upsert, workers=app_settings.INGEST_UPSERT_WORKERS),
+    ]
+
+async def ingest_files(
+    indexer: HybridIndexer,
+    input_path: str,
+    manifest: IngestManifest | None = None,
+    on_progress: Callable[[dict], Awaitable[None]] | None = None,
+):
+    """Run the staged pipeline over `input_path`; with a manifest, only what changed since it was saved.
+    `on_progress` gets a snapshot of per-stage counters every INGEST_PROGRESS_INTERVAL seconds."""
+    files = list_input_files(input_path)
+    counts = {
+        "docs": 0, "nodes": 0, "files_skipped": 0, "files_removed": 0, "nodes_skipped": 0, "nodes_deleted": 0,
+    }
+    changed = {}
+    indexer.cache_hits = {"dense": 0, "sparse": 0}
+    stats = {}
+
+    def snapshot():
+        return {
+            "files": len(files),
+            "files_chunked": len(changed),
+            **counts,
+            "stages": {name: stage.summary() for name, stage in stats.items()},
+        }
+
+    start = time.time()
+    stages = build_ingest_stages(indexer, Path(input_path), counts, manifest, changed)
+    run = asyncio.create_task(run_stages(files, stages, queue_size=app_settings.INGEST_QUEUE_SIZE, stats=stats))
+    try:
+        if on_progress is not None:
+            while not run.done():
+                await asyncio.wait({run}, timeout=app_settings.INGEST_PROGRESS_INTERVAL)
+                await on_progress(snapshot())
+        await run
+    finally:
+        run.cancel()  # no-op once finished; stops the pipeline if this ingest is cancelled
+    stages = {name: stage.summary() for name, stage in stats.items()}
+
+    if not counts["docs"] and not counts["files_skipped"]:
+        raise ValueError(f"No supported documents found in '{input_path}'. Supported: {SUPPORTED_SUFFIXES}")
+
+    if manifest is not None:
+        root = str(Path(input_path).resolve())
+        seen = {file.relative_to(input_path).as_posix() for file in files}
+
+        # Other ingests may have committed since this one started: reload under the lock, then
+        # drop the points modified files no longer produce (the new ones are already in) and
+        # every point of files that were under this root last time and aren't now
+        async with manifest.committing():
+            removed = manifest.removed(root, seen)
+            stale = [
+                point_id
+                for key, (_, chunks) in changed.items()
+                for point_id in manifest.previous_chunks(key) - set(chunks)
+            ]
+            stale += [point_id for key in removed for point_id in manifest.previous_chunks(key)]
+            if stale:
+                await indexer.delete(stale)
+            counts["nodes_deleted"] = len(stale)
+            counts["files_removed"] = len(removed)
+
+            for key in removed:
+                manifest.forget(key)
+            for key, (sha256, chunks) in changed.items():
+                manifest.record(key, sha256, chunks, root)
+            manifest.claim(root, seen)
+
+    logger.info(
+        "Index built",
+        files=len(files),
+        files_changed=len(changed),
+        seconds=time.time() - start,
+        peak_rss_mb=round(peak_rss_mb(), 1),
+        stages=stages,
+        embedding_cache_hits=indexer.cache_hits,
+        **counts,
+    )
+
+    return {
+        "status": "success",
+        "docs_ingested": counts["docs"],
+        "nodes": counts["nodes"],
+        "files_skipped": counts["files_skipped"],
+        "files_removed": counts["files_removed"],
+        "nodes_skipped": counts["nodes_skipped"],
+        "nodes_deleted": counts["nodes_deleted"],
+        "embedding_cache_hits": indexer.cache_hits,
+        "stages": stages,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+async def ingest_documents(
+    input_path: str,
+    recreate: bool = False,
+    on_progress: Callable[[dict], Awaitable[None]] | None = None,
+):
     try:
         logger.info("Ingesting file.", file_path=input_path)
         indexer = HybridIndexer()
@@ -97,33 +228,17 @@ async def ingest_documents(input_path: str, recreate: bool = False):
             deleted = await indexer.store_provider.delete_collection()
             logger.info(f"{deleted["collection_name"]} successfully deleted.") if deleted["deleted"] else logger.info(f"Failed to delete {deleted["collection_name"]}.")
 
+        existed = await indexer.store_provider.collection_exists()
         await indexer.store_provider.init_collection_if_needed()
-        
-        # ---- Load Documents
-        start = time.time()
-        documents = load_documents(input_path)
-        logger.info("Documents loaded", count=len(documents), seconds=time.time() - start)
-
-        # ---- Chunking
-        splitter = SentenceSplitter(
-            chunk_size=app_settings.CHUNK_SIZE,
-            chunk_overlap=app_settings.CHUNK_OVERLAP,
-        )
-
-        start = time.time()
-        nodes = splitter.get_nodes_from_documents(documents)
-        logger.info("Nodes created", count=len(nodes), seconds=time.time() - start)
-
-        # ---- Indexing (Dense + Sparse + Insert)
-        start = time.time()
-        index = indexer.build_index(nodes)
-        logger.info("Index built", seconds=time.time() - start)
 
-        return {
-            "status": "success",
-            "docs_ingested": len(documents),
-            "nodes": len(nodes),
-        }
+        manifest = None
+        if app_settings.INGEST_INCREMENTAL:
+            manifest = IngestManifest.load(manifest_path())
+            if recreate or not existed:
+                # Nothing the manifest lists is in the collection any more
+                manifest.clear()
+
+        return await ingest_files(indexer, input_path, manifest, on_progress)
 
     except Exception as e:
         logger.error("Ingest failed", error=str(e), exc_info=True)
@@ -0,0 +1,176 @@
+"""Ingest manifest: which files are indexed, at which content hash, under which point IDs.
+
+Point IDs are derived from content (the file's key plus a hash of the chunk),
+so ingestion is idempotent: an unchanged chunk gets the same ID on every run
+and needs no embedding, and a modified file's stale points are exactly the
+IDs its previous manifest entry has and its new chunks don't. Each entry also
+records the ingest root it was last seen under, so a file gone from that root
+on the next ingest of it has all its points deleted. One JSON file per
+collection, written atomically after a successful run.
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from llama_index.core.schema import BaseNode, Document
+
+from app.config import app_settings
+
+MANIFEST_VERSION = 1
+
+# Fixed namespace: the same (file, content) maps to the same point ID on every host
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2a4e-6d3b-5b8e-9a57-3f0d2c1b7e41")
+
+# Loader metadata that changes without the content changing (upload temp dirs, mtimes)
+VOLATILE_METADATA = {"file_path", "file_size", "creation_date", "last_modified_date", "last_accessed_date"}
+
+
+def file_sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def ingest_fingerprint() -> str:
+    """Settings that change chunk boundaries or vectors; a different fingerprint re-embeds everything."""
+    settings = {
+        "version": MANIFEST_VERSION,
+        "chunk_size": app_settings.CHUNK_SIZE,
+        "chunk_overlap": app_settings.CHUNK_OVERLAP,
+        "embedding_model": app_settings.EMBEDDING_MODEL,
+        "embedding_dim": app_settings.EMBEDDING_DIM,
+        "sparse_model": app_settings.SPARSE_MODEL,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _content_hash(node: BaseNode) -> str:
+    metadata = {k: v for k, v in node.metadata.items() if k not in VOLATILE_METADATA}
+    payload = json.dumps([node.get_content(), metadata], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def prepare_documents(key: str, documents: list[Document]):
+    """Stable document IDs (the nodes' ref_doc_id), one per file key and position (e.g. PDF page).
+
+    Volatile metadata stays in the payload but out of the embedded text: the splitter budgets
+    chunk size around it, so a new temp dir or mtime would otherwise shift every chunk boundary.
+    """
+    for i, doc in enumerate(documents):
+        doc.id_ = str(uuid.uuid5(POINT_ID_NAMESPACE, f"{key}#doc{i}"))
+        volatile = [k for k in doc.metadata if k in VOLATILE_METADATA]
+        doc.excluded_embed_metadata_keys = sorted(set(doc.excluded_embed_metadata_keys) | set(volatile))
+        doc.excluded_llm_metadata_keys = sorted(set(doc.excluded_llm_metadata_keys) | set(volatile))
+
+
+def assign_point_ids(key: str, nodes: list[BaseNode]) -> list[BaseNode]:
+    """Replace the splitter's random node IDs with content-derived ones. Returns the nodes with
+    duplicate chunks (same text and metadata) dropped.
+
+    Nodes carry no prev/next links (the splitter is built without them): an unchanged chunk keeps
+    its stored point across re-ingests, so its links would go stale once a neighbour changed.
+    """
+    unique, seen = [], set()
+    for node in nodes:
+        node.id_ = str(uuid.uuid5(POINT_ID_NAMESPACE, f"{key}#{_content_hash(node)}"))
+        if node.id_ not in seen:
+            seen.add(node.id_)
+            unique.append(node)
+    return unique
+
+
+class IngestManifest:
+
+    def __init__(self, path: Path, files: dict | None = None):
+        self.path = path
+        self.fingerprint = ingest_fingerprint()
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "IngestManifest":
+        manifest = cls(path)
+        manifest.reload()
+        return manifest
+
+    def reload(self):
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            # Missing or unreadable: start over. Deterministic IDs make the re-ingest overwrite, not duplicate
+            data = {}
+        self.files = data.get("files") or {}
+
+    def _current(self, key: str) -> dict | None:
+        # Entries written under other chunking / embedding settings: their points still exist
+        # (and may go stale), but none of their chunks can be reused
+        entry = self.files.get(key)
+        return entry if entry is not None and entry.get("fingerprint") == self.fingerprint else None
+
+    def unchanged(self, key: str, sha256: str) -> bool:
+        entry = self._current(key)
+        return entry is not None and entry["sha256"] == sha256
+
+    def indexed_chunks(self, key: str) -> set[str]:
+        """Point IDs already in the collection with current vectors: no need to embed them again."""
+        entry = self._current(key)
+        return set(entry["chunks"]) if entry else set()
+
+    def previous_chunks(self, key: str) -> set[str]:
+        entry = self.files.get(key)
+        return set(entry["chunks"]) if entry else set()
+
+    def record(self, key: str, sha256: str, chunks: list[str], root: str):
+        self.files[key] = {
+            "sha256": sha256,
+            "chunks": chunks,
+            "fingerprint": self.fingerprint,
+            "root": root,
+            "ingested_at": time.time(),
+        }
+
+    def claim(self, root: str, keys: set[str]):
+        """Mark `keys` as last seen under `root`, including unchanged files this run skipped."""
+        for key in keys & self.files.keys():
+            self.files[key]["root"] = root
+
+    def removed(self, root: str, seen: set[str]) -> list[str]:
+        """Keys last seen under `root` that the latest scan of it didn't find."""
+        return [
+            key for key, entry in self.files.items() if entry.get("root") == root and key not in seen
+        ]
+
+    def forget(self, key: str):
+        self.files.pop(key, None)
+
+    def clear(self):
+        self.files = {}
+        self.path.unlink(missing_ok=True)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "files": self.files}))
+        os.replace(tmp, self.path)
+
+    @asynccontextmanager
+    async def committing(self):
+        """Exclusive across processes: reload what other ingests saved since this one loaded,
+        let the caller apply its changes, then save. Runs only the commit, not the whole ingest."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_EX)
+            try:
+                self.reload()
+                yield self
+                self.save()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def manifest_path() -> Path:
+    return Path(app_settings.INGEST_MANIFEST_DIR) / f"{app_settings.COLLECTION_NAME}.json"
@@ -0,0 +1,105 @@
+"""File parsing and text cleaning for ingestion, in-process or in a process pool.
+
+PyMuPDF parsing and the regex cleanup are CPU-bound and hold the GIL, so
+threads don't add cores. ParsePool runs `parse_file` in spawned worker
+processes instead. This module imports no app config, registry or models,
+so workers start light. Each file's pages come back as soon as that file
+is done.
+"""
+import asyncio
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import structlog
+from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.readers.file import PDFReader, PyMuPDFReader
+
+logger = structlog.get_logger()
+
+# ------------------------
+# Text Cleaning
+# ------------------------
+
+def clean_text(text: str) -> str:
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"endobj.*?obj", "", text, flags=re.DOTALL)
+    text = re.sub(r"/Type\s*/\w+", "", text)
+    return text.strip()
+
+def clean_documents(docs: list[Document]) -> list[Document]:
+    return [
+        Document(
+            text=clean_text(d.text),
+            metadata=d.metadata,
+        )
+        for d in docs
+    ]
+
+# ------------------------
+# Dynamic file Loader (Production Robust)
+# ------------------------
+
+def load_file(file: Path, pymupdf: bool = True) -> list[Document]:
+    # ---- PDFs
+    if file.suffix.lower() == ".pdf":
+        if pymupdf:
+            try:
+                reader = PyMuPDFReader()
+                docs = reader.load_data(file_path=str(file))
+                logger.info("Loaded PDF with PyMuPDF", file=str(file))
+                return docs
+            except Exception:
+                pass
+        reader = PDFReader()
+        docs = reader.load_data(file=str(file))
+        logger.warning("Fallback to PDFReader", file=str(file))
+        return docs
+
+    # ---- MD / TXT
+    return SimpleDirectoryReader(input_files=[str(file)]).load_data()
+
+def parse_file(file: Path, pymupdf: bool = True) -> list[Document]:
+    """Load and clean one file: the unit of work a pool process runs."""
+    return clean_documents(load_file(Path(file), pymupdf))
+
+# ------------------------
+# Parse Pool
+# ------------------------
+
+class ParsePool:
+    """`processes` spawned workers parsing one file each; 0 parses in a thread of this process."""
+
+    def __init__(self, processes: int):
+        self.processes = max(0, processes)
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Spawned lazily: API workers that never ingest never start one
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def parse(self, file: Path) -> list[Document]:
+        if self.processes == 0:
+            return await asyncio.to_thread(parse_file, file)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool(), parse_file, file)
+        except BrokenProcessPool:
+            # A worker died mid-parse (e.g. a native crash on a malformed PDF): replace the pool and
+            # parse this file in-process with the pure-Python reader rather than retry PyMuPDF here
+            logger.warning("parse_pool_broken", file=str(file), processes=self.processes)
+            self.close()
+            return await asyncio.to_thread(parse_file, file, False)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
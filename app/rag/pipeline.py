@@ -1,18 +1,26 @@
 import asyncio
+import math
 
+from app.core.admission import get_stage_limits
 from app.core.observability.timing import stage_timer
+from app.core.registry import get_reranker, get_vector_store_provider
+from app.rag.budget import LatencyBudget
 from app.rag.generator import LLMGenerator
-from app.rag.reranker_providers.factory import get_reranker
+from app.rag.query_encoding import (
+    QueryEncoding,
+    cache_key_embedding,
+    reset_query_encoding,
+    set_query_encoding,
+)
 from app.rag.retriever import Retriever
-from app.rag.vectorstores.factory import get_vector_store_provider
 from app.utils.cache import get_semantic, set_semantic 
 from app.config import app_settings
 import structlog
 import time
 
 logger = structlog.get_logger()
-active_requests = 0
-active_requests_lock = asyncio.Lock()
+
+GENERATION_TIMEOUT_ANSWER = "No answer could be generated within the request's time budget."
 
 class HybridRAG:
     def __init__(self):
@@ -21,30 +29,141 @@ class HybridRAG:
         self.reranker = get_reranker()
         self.generator = LLMGenerator()
         self.vector_store_provider = get_vector_store_provider()
+        self.stage_limits = get_stage_limits()
     
-    async def query(self, query: str, trace_id: str, cache: bool = True, return_metadata: bool = False):
-        global active_requests
+    def _stage_timeout(self, budget: LatencyBudget) -> float | None:
+        """Time left for the cache check and retrieval: all but generation's minimum."""
+        if not budget.bounded:
+            return None
+        # Budgets under twice the minimum: generation keeps half rather than everything timing out
+        reserve = min(self.config.BUDGET_MIN_GENERATION_SECONDS, budget.seconds / 2)
+        return budget.remaining(reserve=reserve)
 
-        async with active_requests_lock:
-            active_requests += 1
-            logger.info("pipeline_active_requests", active_requests=active_requests)
+    async def _bounded(
+        self, stage: str, awaitable, timeout: float | None, budget: LatencyBudget, fallback
+    ):
+        """Await `awaitable` for at most `timeout`; past it, degrade `<stage>_timeout`, use `fallback`."""
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError:
+            budget.degrade(f"{stage}_timeout", stage_budget_seconds=round(timeout, 4))
+            return fallback
 
+    async def _check_cached(
+        self, query: str, encoding: QueryEncoding, trace_id: str, metrics: dict
+    ) -> tuple[dict | None, float, list | None]:
+        """(cached answer, score, cache key). No key if the query couldn't be embedded."""
+        try:
+            with stage_timer("query_encoding", logger, trace_id, metrics):
+                async with self.stage_limits.slot("embedding", metrics):
+                    cache_key = await cache_key_embedding(encoding)
+        except Exception as e:
+            logger.error("query_encoding_failed", trace_id=trace_id, error=str(e), exc_info=True)
+            return None, 0.0, None
+
+        cached, score = await get_semantic(query, threshold=0.92, embedding=cache_key)
+        return cached, score, cache_key
+
+    async def _retrieve_call(self, query: str, metrics: dict):
+        async with self.stage_limits.slot("retrieval", metrics):
+            supports_sparse = self.vector_store_provider.supports_sparse()
+            return await self.retriever.retrieve(query, supports_sparse)
+
+    async def _retrieve(self, query: str, budget: LatencyBudget, trace_id: str, metrics: dict):
+        # Budget covers waiting for a retrieval slot too; out of time means no context
+        with stage_timer("retrieval", logger, trace_id, metrics):
+            call = self._retrieve_call(query, metrics)
+            return await self._bounded("retrieval", call, self._stage_timeout(budget), budget, [])
+
+    async def _generate_call(
+        self, query: str, final_nodes: list, max_tokens: int | None, metrics: dict
+    ):
+        async with self.stage_limits.slot("generation", metrics):
+            return await self.generator.generate(query, final_nodes, max_tokens=max_tokens)
+
+    async def _rerank_call(self, query: str, retrieved_nodes: list, timeout: float | None, metrics: dict):
+        async with self.stage_limits.slot("rerank", metrics):
+            return await self.reranker.rerank(query, retrieved_nodes, top_n=self.config.RERANK_TOP_N, timeout=timeout)
+
+    async def _rerank(self, query: str, retrieved_nodes: list, budget: LatencyBudget, trace_id: str, metrics: dict):
+        # Whatever generation doesn't need; skipped when too little is left to be worth a call
+        rerank_budget = budget.remaining(reserve=self.config.BUDGET_GENERATION_RESERVE)
+        if rerank_budget is not None and rerank_budget < self.config.BUDGET_RERANK_MIN:
+            budget.degrade("rerank_skipped", rerank_budget_seconds=round(rerank_budget, 4))
+            return []
+
+        try:
+            with stage_timer("rerank", logger, trace_id, metrics):
+                # Budget covers waiting for a rerank slot too
+                return await asyncio.wait_for(
+                    self._rerank_call(query, retrieved_nodes, rerank_budget, metrics),
+                    timeout=rerank_budget,
+                )
+        except asyncio.TimeoutError:
+            budget.degrade("rerank_timeout", rerank_budget_seconds=round(rerank_budget, 4))
+            return []
+
+    def _generation_limits(self, budget: LatencyBudget) -> tuple[int, int | None]:
+        """(context size, max tokens) that fit what's left of the budget."""
+        context_n = self.config.FINAL_CONTEXT_N
+        remaining = budget.remaining()
+        reserve = self.config.BUDGET_GENERATION_RESERVE
+        # Slack: a rerank that used its whole share lands a few ms past the reserve
+        if remaining is None or remaining >= reserve - 0.05:
+            return context_n, None
+
+        # Less than a full generation's worth left: fewer input chunks, shorter answer
+        share = max(remaining, 0.0) / reserve
+        shrunk = max(1, math.ceil(context_n * share))
+        if shrunk < context_n:
+            budget.degrade("context_truncated", from_n=context_n, to_n=shrunk)
+
+        max_tokens = max(self.config.BUDGET_MIN_GENERATION_TOKENS, int(self.config.BUDGET_GENERATION_TOKENS_PER_SECOND * max(remaining, 0.0)))
+        budget.degrade("generation_capped", max_tokens=max_tokens)
+        return shrunk, max_tokens
+
+    async def query(self, query: str, trace_id: str, cache: bool = True, return_metadata: bool = False, timeout: float | None = None):
+        encoding_token = None
+        retrieval_task = None
         try:
             total_start = time.perf_counter()
             metrics = {}
+            # Client deadline wins; REQUEST_BUDGET_SECONDS=0 and no client deadline = unbounded
+            budget = LatencyBudget.start(timeout if timeout is not None else self.config.REQUEST_BUDGET_SECONDS, trace_id)
             
-            if self.vector_store_provider.supports_sparse() and app_settings.RETRIEVAL_MODE == "hybrid":
+            if self.vector_store_provider.supports_sparse() and app_settings.RETRIEVAL_MODE in ("hybrid", "native"):
                 logger.info("Using hybrid mode.")
             else:
                 logger.warning("Using dense mode: Hybrid mode is not supported; Sparse requested but not supported by backend.")
 
             use_cache = False if not cache else self.config.USE_CACHE # override use_cache if cache==false else default self.config.USE_CACHE
 
+            # Embeddings are computed on first use and shared: the cache key, and retrieval's
+            # query-mode vector (one and the same when the model and normalized query allow)
+            encoding = QueryEncoding(query=query)
+            encoding_token = set_query_encoding(encoding)
+            cache_key = None
+
             if use_cache:
+                if self.config.SPECULATIVE_RETRIEVAL:
+                    # Retrieve while the key is embedded and looked up: a hit cancels it, a miss
+                    # gets a head start. Both start here, so their timings are comparable
+                    retrieval = self._retrieve(query, budget, trace_id, metrics)
+                    retrieval_task = asyncio.create_task(retrieval)
+
                 # 1️⃣ Check cached
-                with stage_timer("check_cached", logger, trace_id):
-                    cached, score = await get_semantic(query, threshold=0.92)
+                with stage_timer("check_cached", logger, trace_id, metrics):
+                    cached, score, cache_key = await self._bounded(
+                        "check_cached",
+                        self._check_cached(query, encoding, trace_id, metrics),
+                        self._stage_timeout(budget),
+                        budget,
+                        (None, 0.0, None),
+                    )
                 if cached:
+                    if retrieval_task is not None:
+                        retrieval_task.cancel()
+                        await asyncio.gather(retrieval_task, return_exceptions=True)
                     total_duration = time.perf_counter() - total_start
                     logger.info(
                         "cache_pipeline_total_latency",
@@ -54,21 +173,40 @@ class HybridRAG:
                     return {**cached, "cached": True, "score": score}
             
             # 2️⃣ Retrieval
-            with stage_timer("retrieval", logger, trace_id, metrics):
-                retrieved_nodes = await self.retriever.retrieve(query, self.vector_store_provider.supports_sparse())
+            if retrieval_task is not None:
+                with stage_timer("retrieval_wait", logger, trace_id, metrics):
+                    retrieved_nodes = await retrieval_task
+                # Both started together: the shorter of the two ran fully in the other's shadow
+                metrics["cache_check_hidden"] = round(min(metrics["check_cached"], metrics["retrieval"]), 4)
+                logger.info(
+                    "speculative_retrieval",
+                    trace_id=trace_id,
+                    check_cached_seconds=metrics["check_cached"],
+                    retrieval_seconds=metrics["retrieval"],
+                    retrieval_wait_seconds=metrics["retrieval_wait"],
+                    cache_check_hidden_seconds=metrics["cache_check_hidden"],
+                )
+            else:
+                retrieved_nodes = await self._retrieve(query, budget, trace_id, metrics)
             logger.info("retrieved_nodes_count", trace_id=trace_id, count=len(retrieved_nodes))
 
             # 3️⃣ Rerank
             reranked_nodes = []
             if retrieved_nodes and self.config.USE_RERANKER and self.reranker:
-                with stage_timer("rerank", logger, trace_id, metrics):
-                    reranked_nodes = await self.reranker.rerank(query, retrieved_nodes, top_n=self.config.RERANK_TOP_N)
+                reranked_nodes = await self._rerank(query, retrieved_nodes, budget, trace_id, metrics)
                 logger.info("reranked_nodes_count", trace_id=trace_id, count=len(reranked_nodes), RERANK_TOP_N=self.config.RERANK_TOP_N)
 
-            # 4️⃣ Generation
+            # 4️⃣ Generation (skipped/timed-out rerank falls back to retrieval order)
+            context_n, max_tokens = self._generation_limits(budget)
+            final_nodes = reranked_nodes[:context_n] if self.config.USE_RERANKER and reranked_nodes else retrieved_nodes[:context_n]
             with stage_timer("generation", logger, trace_id, metrics):
-                final_nodes = reranked_nodes[:self.config.FINAL_CONTEXT_N] if self.config.USE_RERANKER and reranked_nodes else retrieved_nodes[:self.config.FINAL_CONTEXT_N]
-                response = await self.generator.generate(query, final_nodes)
+                response = await self._bounded(
+                    "generation",
+                    self._generate_call(query, final_nodes, max_tokens, metrics),
+                    budget.remaining(),
+                    budget,
+                    {"answer": GENERATION_TIMEOUT_ANSWER, "sources": []},
+                )
             
             # 4️⃣ Generation Mock
             # await asyncio.sleep(2)
@@ -90,6 +228,11 @@ class HybridRAG:
                 "cached": False
             }
 
+            if budget.bounded:
+                result["budget"] = budget.summary()
+                metrics["budget_remaining"] = result["budget"]["remaining_seconds"]
+                metrics["degradations"] = len(budget.degradations)
+
             # Conditionally add eval data if testing
             if return_metadata:
                 result.update({
@@ -98,15 +241,15 @@ class HybridRAG:
                     "latency": metrics, 
                 })
         
-            if use_cache:
-                # 5️⃣ Caching
+            if cache_key is not None and not budget.degradations:
+                # 5️⃣ Caching (degraded answers aren't cached)
                 with stage_timer("cache_response", logger, trace_id):
                     # logger.info("Caching query and answer with Redis...")
                     await set_semantic(query, {
                         "answer": result["answer"],
                         "sources": result["sources"],
                         "mode": result["mode"],
-                    })
+                    }, embedding=cache_key)
 
             total_duration = time.perf_counter() - total_start
 
@@ -118,5 +261,8 @@ class HybridRAG:
 
             return result
         finally:
-            async with active_requests_lock:
-                active_requests -= 1
\ No newline at end of file
+            if retrieval_task is not None and not retrieval_task.done():
+                retrieval_task.cancel()  # request cancelled or cache lookup raised
+            if encoding_token is not None:
+                encoding.cancel()
+                reset_query_encoding(encoding_token)
\ No newline at end of file
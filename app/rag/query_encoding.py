@@ -0,0 +1,66 @@
+"""Per-request query encoding: each embedding of the query is computed once and shared.
+
+The semantic cache keys on a text embedding of the normalized query; retrieval
+uses a query-mode embedding of the raw query, the same one LlamaIndex would
+compute, so reusing it doesn't change results. When the model embeds both
+modes alike and normalizing leaves the query as is, the two are one vector.
+Embeddings run as tasks on the encoding, so the cache check and a speculative
+retrieval started alongside it wait on the same call rather than racing two.
+"""
+import asyncio
+import re
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from llama_index.core import Settings
+
+from app.rag.embedding_providers.dense.batching import query_modes_match
+
+# Normalize query: lowercase, strip punctuation/spaces (cheap boost to hit rate)
+def normalize_query(query: str) -> str:
+    query = query.lower().strip()
+    query = re.sub(r'[?.!,;:"]+', '', query)  # Remove common punctuation
+    query = re.sub(r'\s+', ' ', query)  # Collapse spaces
+    return query
+
+@dataclass
+class QueryEncoding:
+    query: str                    # raw query, as passed to the retriever
+    sparse: tuple | None = None   # ([indices], [values]) from the sparse provider, filled on first use
+    _embeddings: dict = field(default_factory=dict, repr=False)  # (mode, text) -> embedding task
+
+    async def _embed(self, mode: str, text: str) -> list[float]:
+        embed_model = Settings.embed_model
+        if mode == "query" and query_modes_match(embed_model):
+            mode = "text"
+        task = self._embeddings.get((mode, text))
+        if task is None:
+            embed = embed_model.aget_query_embedding if mode == "query" else embed_model.aget_text_embedding
+            task = self._embeddings[(mode, text)] = asyncio.ensure_future(embed(text))
+        # A caller timing out or cancelled doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def cancel(self):
+        """Cancel embeddings still in flight once the request no longer needs them."""
+        for task in self._embeddings.values():
+            task.cancel()
+
+_current_encoding: ContextVar[QueryEncoding | None] = ContextVar("query_encoding", default=None)
+
+async def cache_key_embedding(encoding: QueryEncoding) -> list[float]:
+    """Semantic cache key: text embedding of normalize_query(query)."""
+    return await encoding._embed("text", normalize_query(encoding.query))
+
+async def dense_query_embedding(encoding: QueryEncoding) -> list[float]:
+    """Retrieval embedding of the raw query, computed on first use and kept on `encoding`."""
+    return await encoding._embed("query", encoding.query)
+
+def set_query_encoding(encoding: QueryEncoding | None):
+    """Make `encoding` visible to code running in this request's context; returns a reset token."""
+    return _current_encoding.set(encoding)
+
+def reset_query_encoding(token):
+    _current_encoding.reset(token)
+
+def current_query_encoding() -> QueryEncoding | None:
+    return _current_encoding.get()
@@ -0,0 +1,77 @@
+import time
+from collections import deque
+
+import httpx
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; after `cooldown`
+    seconds lets a single trial request through (half-open)."""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def allow(self) -> bool:
+        """Like `available`, but claims the half-open trial slot."""
+        if not self.available():
+            return False
+        if self.state == "half_open":
+            self._trial_in_flight = True
+        return True
+
+    def release(self):
+        # Request abandoned (hedge lost, caller cancelled): no verdict either way
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            # Trial failed or threshold reached: (re)open for another cooldown
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies."""
+
+    def __init__(self, window: int = 512):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Replica:
+
+    def __init__(self, url: str, timeout: float, limits: httpx.Limits, breaker: CircuitBreaker):
+        self.url = url
+        self.client = httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+        self.breaker = breaker
+        self.outstanding = 0
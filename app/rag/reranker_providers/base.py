@@ -4,5 +4,5 @@ from typing import List
 class BaseReranker(ABC):
 
     @abstractmethod
-    def rerank(self, query: str, nodes, top_n: int = 25) -> List:
+    def rerank(self, query: str, nodes, top_n: int = 25, timeout: float | None = None) -> List:
         pass
\ No newline at end of file
@@ -24,7 +24,7 @@ class FastEmbedReranker(BaseReranker):
         # Warmup
         self.model.rerank(query="warmup", documents=["warmup"])
 
-    def rerank(self, query: str, nodes, top_n: int = 25) -> List:
+    def rerank(self, query: str, nodes, top_n: int = 25, timeout: float | None = None) -> List:
         documents = [node.text for node in nodes]
 
         scores = list(
@@ -1,32 +1,308 @@
+import asyncio
+import random
+import time
 import httpx
+import structlog
 from .base import BaseReranker
+from .balancer import CircuitBreaker, LatencyTracker, Replica
+from .wire import BINARY_MEDIA_TYPE, DEFLATE, compress, decode_results, encode_request
 from app.config import app_settings
 
+logger = structlog.get_logger()
+
+
+class RerankerUnavailable(Exception):
+    pass
+
+
+def _unavailable(error: Exception) -> bool:
+    """The reranker can't answer right now (degrade to retrieval order), as opposed to a bug."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, RerankerUnavailable, asyncio.TimeoutError))
+
+
 class RemoteReranker(BaseReranker):
 
     def __init__(self):
-        self.client = httpx.AsyncClient(
-            base_url=app_settings.RERANKER_URL,
-            timeout=60.0,
+        self.timeout = app_settings.RERANKER_TIMEOUT
+        self.wire_format = app_settings.RERANKER_WIRE_FORMAT
+        self.compress = app_settings.RERANKER_COMPRESSION
+        self.send_chunk_ids = app_settings.RERANKER_SEND_CHUNK_IDS
+        self.hedge_percentile = app_settings.RERANKER_HEDGE_PERCENTILE
+        self.latency = LatencyTracker()
+
+        # One pool per replica, sized to how many reranks the API runs at once
+        limits = httpx.Limits(
+            max_connections=app_settings.RERANKER_CONCURRENCY_LIMIT,
+            max_keepalive_connections=app_settings.RERANKER_CONCURRENCY_LIMIT,
         )
+        urls = [url.strip() for url in app_settings.RERANKER_URLS.split(",") if url.strip()]
+        urls = urls or [app_settings.RERANKER_URL]
+        self.replicas = [
+            Replica(
+                url,
+                timeout=self.timeout,
+                limits=limits,
+                breaker=CircuitBreaker(
+                    failure_threshold=app_settings.RERANKER_BREAKER_FAILURES,
+                    cooldown=app_settings.RERANKER_BREAKER_COOLDOWN,
+                ),
+            )
+            for url in urls
+        ]
 
-    async def rerank(self, query, nodes, top_n=25):
-        try: 
-            documents = [node.text for node in nodes]
-            response = await self.client.post(
-                "/rerank",
-                json={
+    # ------------------------
+    # Routing
+    # ------------------------
+    def _pick(self, exclude=()) -> Replica | None:
+        # Least outstanding requests; ties broken at random so idle replicas share load
+        candidates = [r for r in self.replicas if r not in exclude and r.breaker.available()]
+        if not candidates:
+            return None
+        fewest = min(r.outstanding for r in candidates)
+        replica = random.choice([r for r in candidates if r.outstanding == fewest])
+        return replica if replica.breaker.allow() else None
+
+    def _hedge_delay(self) -> float | None:
+        min_samples = app_settings.RERANKER_HEDGE_MIN_SAMPLES
+        if not self.hedge_percentile or len(self.latency.samples) < min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    async def _send(self, replica: Replica, path: str, request: dict) -> httpx.Response:
+        replica.outstanding += 1
+        start = time.perf_counter()
+        try:
+            response = await replica.client.post(path, **request)
+        except asyncio.CancelledError:
+            replica.breaker.release()
+            raise
+        except httpx.HTTPError:
+            replica.breaker.record_failure()
+            raise
+        finally:
+            replica.outstanding -= 1
+
+        # 5xx (incl. 503 queue full, 504 deadline) = unhealthy or overloaded
+        if response.status_code >= 500:
+            replica.breaker.record_failure()
+        else:
+            replica.breaker.record_success()
+            self.latency.record(time.perf_counter() - start)
+
+        return response
+
+    async def _post(self, path: str, request: dict) -> httpx.Response:
+        primary = self._pick()
+        if primary is None:
+            raise RerankerUnavailable("All reranker replicas are unavailable")
+
+        attempts = [asyncio.create_task(self._send(primary, path, request))]
+        try:
+            delay = self._hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                backup = None if done else self._pick(exclude=(primary,))
+                if backup is not None:
+                    # Slower than the hedge percentile: race a second replica
+                    logger.info(
+                        "reranker_hedged_request",
+                        path=path,
+                        primary=primary.url,
+                        backup=backup.url,
+                        delay_seconds=round(delay, 4),
+                    )
+                    attempts.append(asyncio.create_task(self._send(backup, path, request)))
+
+            # First good answer wins; if none, the primary's outcome
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        return task.result()
+            return attempts[0].result()
+        finally:
+            # Also when the caller is cancelled mid-wait: no attempt outlives it
+            for task in attempts:
+                task.cancel()
+
+    # ------------------------
+    # Rerank
+    # ------------------------
+    def _build_request(
+        self,
+        query: str,
+        documents: list[str] | None,
+        top_n: int,
+        document_ids: list[str] | None = None,
+        timeout: float | None = None,
+    ) -> dict:
+        # Lets the service drop our pairs once we've given up on them
+        headers = {"X-Request-Timeout": str(timeout or self.timeout)}
+
+        if self.wire_format == "json":
+            return {
+                "json": {
                     "query": query,
-                    "documents": documents,
+                    "documents": documents or [],
+                    "document_ids": document_ids,
                     "top_n": top_n,
                 },
-            )
+                "headers": headers,
+            }
+
+        content = encode_request(query, documents, top_n, document_ids=document_ids)
+        headers["Content-Type"] = BINARY_MEDIA_TYPE
+        headers["Accept"] = f"{BINARY_MEDIA_TYPE}, application/json"
+
+        if self.compress:
+            content = compress(content)
+            headers["Content-Encoding"] = DEFLATE
+
+        return {"content": content, "headers": headers}
+
+    async def _post_rerank(self, *args, **kwargs) -> httpx.Response:
+        response = await self._post("/rerank", self._build_request(*args, **kwargs))
+
+        # Services without the binary format reject the body: fall back to JSON for good
+        if self.wire_format == "binary" and response.status_code in (415, 422):
+            logger.warning("reranker_binary_format_rejected", status_code=response.status_code)
+            self.wire_format = "json"
+            response = await self._post("/rerank", self._build_request(*args, **kwargs))
+
+        return response
+
+    @staticmethod
+    def _parse_results(response: httpx.Response) -> list:
+        if response.headers.get("content-type", "").startswith(BINARY_MEDIA_TYPE):
+            return decode_results(response.content)
+        return response.json()["results"]
+
+    async def rerank(self, query, nodes, top_n=25, timeout=None):
+        # timeout: the caller's remaining budget, forwarded so the service drops expired pairs
+        try:
+            # Chunk IDs only; the service resolves them from its chunk store
+            document_ids = [node.node_id for node in nodes] if self.send_chunk_ids else None
+            documents = None if document_ids else [node.text for node in nodes]
 
-            results = response.json()["results"]
+            response = await self._post_rerank(query, documents, top_n, document_ids, timeout)
+
+            # Some IDs unknown to the service (restart, eviction, not ingested): resend with text
+            if response.status_code == 409 and document_ids is not None:
+                documents = [node.text for node in nodes]
+                response = await self._post_rerank(query, documents, top_n, document_ids, timeout)
+
+            response.raise_for_status()
+            results = self._parse_results(response)
 
             # print("> remote reranker results:", results)
 
             return [nodes[r[0]] for r in results]
-        
+
         except Exception as error:
-            raise error
\ No newline at end of file
+            if not _unavailable(error):
+                raise
+            # Reranker unhealthy: answer from retrieval order instead of failing the query
+            logger.warning(
+                "reranker_degraded_to_retrieval_order", error=str(error) or type(error).__name__
+            )
+            return nodes[:top_n]
+
+    async def rerank_many(self, items, top_n=25):
+        """Rerank several (query, nodes) items in one /rerank/batch call.
+
+        `items` is a list of (query, nodes) or (query, nodes, top_n) tuples;
+        returns one reranked node list per item, in order.
+        """
+        items = [item if len(item) == 3 else (*item, top_n) for item in items]
+
+        # Texts go inline (the service writes them through to its chunk store)
+        payload = {
+            "items": [
+                {
+                    "query": query,
+                    "documents": [node.text for node in nodes],
+                    "document_ids": (
+                        [node.node_id for node in nodes] if self.send_chunk_ids else None
+                    ),
+                    "top_n": item_top_n,
+                }
+                for query, nodes, item_top_n in items
+            ],
+        }
+
+        try:
+            response = await self._post(
+                "/rerank/batch",
+                {"json": payload, "headers": {"X-Request-Timeout": str(self.timeout)}},
+            )
+            response.raise_for_status()
+            results = response.json()["items"]
+        except Exception as error:
+            if not _unavailable(error):
+                raise
+            logger.warning(
+                "reranker_degraded_to_retrieval_order",
+                error=str(error) or type(error).__name__,
+                items=len(items),
+            )
+            return [nodes[:item_top_n] for _, nodes, item_top_n in items]
+
+        reranked = []
+        for (query, nodes, item_top_n), result in zip(items, results):
+            if result.get("error"):
+                logger.warning("reranker_batch_item_degraded", query=query, error=result["error"])
+                reranked.append(nodes[:item_top_n])
+            else:
+                reranked.append([nodes[r[0]] for r in result["results"]])
+
+        return reranked
+
+    # ------------------------
+    # Chunk store
+    # ------------------------
+    async def _load_chunks_into(self, replica: Replica, nodes, batch_size: int) -> int:
+        stored = 0
+        for start in range(0, len(nodes), batch_size):
+            response = await replica.client.post(
+                "/chunks",
+                json={
+                    "chunks": [
+                        {"id": node.node_id, "text": node.text}
+                        for node in nodes[start:start + batch_size]
+                    ],
+                },
+            )
+            response.raise_for_status()
+            stored += response.json()["stored"]
+
+        return stored
+
+    async def load_chunks(self, nodes, batch_size: int = 512) -> int:
+        """Bulk-load chunk texts into every replica's chunk store, keyed by node (Qdrant point) ID.
+
+        Returns the count stored on the replica that took the fewest.
+        """
+        outcomes = await asyncio.gather(
+            *(self._load_chunks_into(replica, nodes, batch_size) for replica in self.replicas),
+            return_exceptions=True,
+        )
+
+        stored = []
+        for replica, outcome in zip(self.replicas, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(
+                    "reranker_chunk_load_failed", replica=replica.url, error=str(outcome)
+                )
+            else:
+                stored.append(outcome)
+
+        if not stored:
+            raise outcomes[0]
+
+        return min(stored)
+
+    async def aclose(self):
+        await asyncio.gather(*(replica.client.aclose() for replica in self.replicas))
@@ -0,0 +1,106 @@
+import struct
+import zlib
+from typing import List, Optional, Sequence, Tuple
+
+
+# ---------------------------------------------------
+# Compact Rerank Wire Format
+# ---------------------------------------------------
+#
+# Mirrors services/reranker_service/app/wire.py; keep them in sync.
+#
+# request:  [magic 4s][top_n u32][n_docs u32][flags u32][lengths u32 x (1 + n_ids + n_texts)]
+#           [query utf-8][ids utf-8...][docs utf-8...]
+# response: [n u32][indices u32 x n][scores f32 x n]
+#
+# flags: HAS_IDS = chunk IDs follow the query, HAS_TEXTS = document texts follow.
+# Optional `Content-Encoding: deflate` on the request body.
+
+BINARY_MEDIA_TYPE = "application/x-rerank"
+DEFLATE = "deflate"
+
+MAGIC = b"RRK2"
+REQUEST_HEADER = struct.Struct("<4sIII")
+COUNT = struct.Struct("<I")
+
+HAS_IDS = 1
+HAS_TEXTS = 2
+
+
+def encode_request(
+    query: str,
+    documents: Optional[Sequence[str]],
+    top_n: int,
+    document_ids: Optional[Sequence[str]] = None,
+) -> bytes:
+
+    ids = list(document_ids or [])
+    docs = list(documents or [])
+
+    if ids and docs and len(ids) != len(docs):
+        raise ValueError("document_ids and documents must be the same length")
+
+    # An empty ID list means "no IDs": flagging it would make n_docs cover IDs that aren't there
+    flags = (HAS_IDS if ids else 0) | (HAS_TEXTS if docs else 0)
+    texts = [text.encode("utf-8") for text in [query, *ids, *docs]]
+
+    return b"".join([
+        REQUEST_HEADER.pack(MAGIC, top_n, max(len(ids), len(docs)), flags),
+        struct.pack(f"<{len(texts)}I", *map(len, texts)),
+        *texts,
+    ])
+
+
+def decode_request(payload: bytes) -> Tuple[str, List[str], int, Optional[List[str]]]:
+    """Returns (query, documents, top_n, document_ids)."""
+
+    magic, top_n, n_docs, flags = REQUEST_HEADER.unpack_from(payload)
+
+    if magic != MAGIC:
+        raise ValueError("Not a rerank payload")
+
+    n_ids = n_docs if flags & HAS_IDS else 0
+    n_texts = n_docs if flags & HAS_TEXTS else 0
+
+    lengths = struct.unpack_from(f"<{1 + n_ids + n_texts}I", payload, REQUEST_HEADER.size)
+    pos = REQUEST_HEADER.size + 4 * len(lengths)
+
+    if pos + sum(lengths) != len(payload):
+        raise ValueError("Truncated rerank payload")
+
+    view = memoryview(payload)
+    texts = []
+
+    for length in lengths:
+        texts.append(str(view[pos: pos + length], "utf-8"))
+        pos += length
+
+    ids = texts[1: 1 + n_ids] if flags & HAS_IDS else None
+
+    return texts[0], texts[1 + n_ids:], top_n, ids
+
+
+def encode_results(results: Sequence[Tuple[int, float]]) -> bytes:
+
+    n = len(results)
+    indices = [idx for idx, _ in results]
+    scores = [score for _, score in results]
+
+    return COUNT.pack(n) + struct.pack(f"<{n}I{n}f", *indices, *scores)
+
+
+def decode_results(payload: bytes) -> List[Tuple[int, float]]:
+
+    (n,) = COUNT.unpack_from(payload)
+    values = struct.unpack_from(f"<{n}I{n}f", payload, COUNT.size)
+
+    return list(zip(values[:n], values[n:]))
+
+
+def compress(payload: bytes) -> bytes:
+    # Level 1: most of the size win for a fraction of the CPU
+    return zlib.compress(payload, 1)
+
+
+def decompress(payload: bytes) -> bytes:
+    return zlib.decompress(payload)
@@ -1,10 +1,19 @@
 """Hybrid RAG query engine: retrieval + generation + flags + fallback."""
-from app.config import app_settings, configure_llm_settings
-from app.rag.vectorstores.factory import get_vector_store_provider
+from app.config import app_settings
+from app.core.registry import ensure_llm_settings, get_vector_store_provider
+from app.rag.query_encoding import (
+    QueryEncoding,
+    current_query_encoding,
+    dense_query_embedding,
+    reset_query_encoding,
+    set_query_encoding,
+)
 from llama_index.core import VectorStoreIndex
 from llama_index.core import PromptTemplate
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
 from llama_index.core.postprocessor import SimilarityPostprocessor
 
+import json
 import yaml
 import structlog
 
@@ -15,16 +24,53 @@ with open("app/rag/prompts.yaml") as f:
     prompts = yaml.safe_load(f)
 qa_prompt = PromptTemplate(prompts["v2"]["qa"])
 
+def lean_node(point) -> NodeWithScore:
+    """Text + metadata only; skips rebuilding relationships and the rest of the stored node."""
+    content = json.loads(point.payload["_node_content"])
+    node = TextNode(id_=str(point.id), text=content.get("text", ""), metadata=content.get("metadata", {}))
+    return NodeWithScore(node=node, score=point.score)
+
 class Retriever:
     def __init__(self):
-        configure_llm_settings()
+        ensure_llm_settings()
         self.vector_store_provider = get_vector_store_provider()
         self.config = app_settings
 
+    async def retrieve_native(self, query: str, encoding: QueryEncoding):
+        """Server-side hybrid: one query_points call with dense + sparse prefetch and RRF/DBSF fusion.
+
+        Fused scores are rank-based, so SIMILARITY_CUTOFF does not apply here.
+        """
+        dense = await dense_query_embedding(encoding)
+
+        points = await self.vector_store_provider.query_hybrid(
+            dense,
+            encoding.sparse,
+            limit=self.config.SIMILARITY_TOP_K,
+            prefetch_limit=max(self.config.RETRIEVAL_PREFETCH_LIMIT, self.config.SIMILARITY_TOP_K),
+            fusion=self.config.RETRIEVAL_FUSION,
+        )
+        return [lean_node(point) for point in points]
+
     async def retrieve(self, query: str, support_hybrid: bool = True):
+        # Encodings for this query live on one QueryEncoding (the request's, if the pipeline made one)
+        encoding = current_query_encoding()
+        encoding_token = None
+        if encoding is None or encoding.query != query:
+            encoding = QueryEncoding(query=query)
+            encoding_token = set_query_encoding(encoding)
+
         try:
+            hybrid = self.config.RETRIEVAL_MODE in ("hybrid", "native") and support_hybrid
+            if hybrid:
+                # SPLADE off the event loop, before LlamaIndex's synchronous sparse_query_fn asks for it
+                await self.vector_store_provider.aembed_sparse_query(query)
+
+            if self.config.RETRIEVAL_MODE == "native" and hybrid:
+                return await self.retrieve_native(query, encoding)
+
             index = VectorStoreIndex.from_vector_store(self.vector_store_provider.get_vector_store())
-            mode = "hybrid" if self.config.RETRIEVAL_MODE == "hybrid" and support_hybrid else "default"
+            mode = "hybrid" if hybrid else "default"
             node_postprocessors = [SimilarityPostprocessor(similarity_cutoff=self.config.SIMILARITY_CUTOFF)]
 
             retriever = index.as_retriever(
@@ -33,6 +79,9 @@ class Retriever:
                 vector_store_query_mode=mode
             )
             
+            # The query-mode embedding LlamaIndex would compute, shared with native retrieval
+            query = QueryBundle(query_str=query, embedding=await dense_query_embedding(encoding))
+
             retrieved_nodes = await retriever.aretrieve(query)
             if retrieved_nodes:
                 return retrieved_nodes
@@ -40,4 +89,9 @@ class Retriever:
         except Exception as e:
             logger.error("retrieval_failed", error=str(e), exc_info=True)
 
+        finally:
+            if encoding_token is not None:
+                encoding.cancel()
+                reset_query_encoding(encoding_token)
+
         return []
\ No newline at end of file
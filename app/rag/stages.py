@@ -0,0 +1,126 @@
+"""Streaming stage runner: async workers connected by bounded queues.
+
+Each stage takes one item at a time from its input queue and emits zero or
+more items downstream. Bounded queues give backpressure: a slow stage
+stalls the ones upstream instead of letting work pile up in memory, and
+every stage runs concurrently with the others.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+_END = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Awaitable[Iterable[Any] | None]]  # item -> items to emit downstream
+    workers: int = 1
+    batch_size: int = 0  # > 0: inputs are iterables, flattened and regrouped into lists of this size
+
+
+@dataclass
+class StageStats:
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0  # summed over workers
+    started: float | None = None
+    finished: float | None = None
+
+    def summary(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - self.started if self.started is not None else 0.0
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wall_seconds": round(wall, 3),
+            "items_per_second": round(self.items_in / wall, 2) if wall > 0 else None,
+        }
+
+
+@dataclass
+class _Link:
+    queue: asyncio.Queue
+    consumers: int      # workers of the stage reading this queue
+    workers_left: int   # of those, still running
+
+
+async def run_stages(
+    source: Iterable[Any],
+    stages: list[Stage],
+    queue_size: int,
+    stats: dict[str, StageStats] | None = None,
+) -> dict[str, StageStats]:
+    """Push `source` through `stages`; returns per-stage stats (filled into `stats` as the run goes,
+    when given, so a caller can report progress). The first worker error cancels the rest."""
+    links = [
+        _Link(asyncio.Queue(maxsize=queue_size), consumers=max(1, stage.workers), workers_left=max(1, stage.workers))
+        for stage in stages
+    ]
+    stats = {} if stats is None else stats
+    stats.update({stage.name: StageStats() for stage in stages})
+
+    async def feed():
+        for item in source:
+            await links[0].queue.put(item)
+        for _ in range(links[0].consumers):
+            await links[0].queue.put(_END)
+
+    async def emit(index: int, items):
+        if index + 1 < len(links) and items:
+            for out in items:
+                await links[index + 1].queue.put(out)
+
+    async def call(index: int, stage: Stage, item):
+        start = time.perf_counter()
+        items = await stage.fn(item)
+        stats[stage.name].busy_seconds += time.perf_counter() - start
+        items = list(items or [])
+        stats[stage.name].items_out += len(items)
+        await emit(index, items)
+
+    async def worker(index: int, stage: Stage):
+        inbox = links[index].queue
+        buffer = []
+        while True:
+            item = await inbox.get()
+            if item is _END:
+                break
+            if stats[stage.name].started is None:
+                stats[stage.name].started = time.perf_counter()
+
+            if stage.batch_size <= 0:
+                stats[stage.name].items_in += 1
+                await call(index, stage, item)
+                continue
+
+            item = list(item)
+            stats[stage.name].items_in += len(item)
+            buffer.extend(item)
+            while len(buffer) >= stage.batch_size:
+                batch, buffer = buffer[:stage.batch_size], buffer[stage.batch_size:]
+                await call(index, stage, batch)
+
+        if buffer:
+            await call(index, stage, buffer)
+
+        # Last worker out tells every downstream worker the stream has ended
+        links[index].workers_left -= 1
+        if links[index].workers_left == 0:
+            stats[stage.name].finished = time.perf_counter()
+            if index + 1 < len(links):
+                for _ in range(links[index + 1].consumers):
+                    await links[index + 1].queue.put(_END)
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(feed())
+            for index, stage in enumerate(stages):
+                for _ in range(links[index].consumers):
+                    group.create_task(worker(index, stage))
+    except ExceptionGroup as errors:
+        raise errors.exceptions[0]
+
+    return stats
@@ -13,10 +13,18 @@ class BaseVectorStoreProvider(ABC):
     def supports_sparse(self) -> bool:
         pass
 
+    async def collection_exists(self) -> bool:
+        """Optional lifecycle hook"""
+        return True
+
     async def init_collection_if_needed(self):
         """Optional lifecycle hook"""
         pass
 
     async def delete_collection(self):
+        """Optional lifecycle hook"""
+        pass
+
+    async def close(self):
         """Optional lifecycle hook"""
         pass
\ No newline at end of file
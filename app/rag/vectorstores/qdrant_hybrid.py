@@ -1,21 +1,34 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from qdrant_client import QdrantClient, AsyncQdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
 from app.config import app_settings
+from app.rag.query_encoding import current_query_encoding
 from .base import BaseVectorStoreProvider
 
 import structlog
 logger = structlog.get_logger()
 
+# Sparse vectors the ingestion pipeline already computed, keyed by node text, for the upsert in progress
+_precomputed_sparse: ContextVar[dict | None] = ContextVar("precomputed_sparse", default=None)
+
 class QdrantHybridStore(BaseVectorStoreProvider):
 
     def __init__(self, sparse_provider=None):
         self.client = QdrantClient(url=app_settings.QDRANT_URL)
         self.aclient = AsyncQdrantClient(url=app_settings.QDRANT_URL)
         self.sparse = sparse_provider
+        self._vector_names = None
+
+    async def collection_exists(self) -> bool:
+        return await self.aclient.collection_exists(app_settings.COLLECTION_NAME)
 
     async def init_collection_if_needed(self):
-        if not self.client.collection_exists(app_settings.COLLECTION_NAME):
-            await self.client.create_collection(
+        if not await self.aclient.collection_exists(app_settings.COLLECTION_NAME):
+            await self.aclient.create_collection(
                 collection_name=app_settings.COLLECTION_NAME,
                 vectors_config=models.VectorParams(
                     size=app_settings.EMBEDDING_DIM,
@@ -25,6 +38,7 @@ class QdrantHybridStore(BaseVectorStoreProvider):
                     "text-sparse": models.SparseVectorParams()
                 },
             )
+            self._vector_names = None
             logger.info("created_qdrant_collection", name=app_settings.COLLECTION_NAME)
 
     def get_vector_store(self):
@@ -33,15 +47,132 @@ class QdrantHybridStore(BaseVectorStoreProvider):
             aclient=self.aclient,   # Used for async calls
             collection_name=app_settings.COLLECTION_NAME,
             enable_hybrid=True,
-            sparse_doc_fn=self.sparse.embed_documents,
-            sparse_query_fn=self.sparse.embed_query,
+            sparse_doc_fn=self.embed_sparse_documents,
+            sparse_query_fn=self.embed_sparse_query,
             text_sparse_name="text-sparse",
             use_default_sparse_query_encoder=False,
         )
 
+    def embed_sparse_documents(self, texts):
+        precomputed = _precomputed_sparse.get()
+        if precomputed is None or any(text not in precomputed for text in texts):
+            return self.sparse.embed_documents(texts)
+        vectors = [precomputed[text] for text in texts]
+        return [v[0] for v in vectors], [v[1] for v in vectors]
+
+    async def aembed_sparse_documents(self, texts):
+        """Document sparse vectors off the event loop: ([indices], [values])."""
+        return await asyncio.to_thread(self.sparse.embed_documents, texts)
+
+    @contextmanager
+    def precomputed_sparse(self, texts, sparse):
+        """Upserts inside this block reuse `sparse` for `texts` instead of re-encoding them."""
+        indices, values = sparse
+        token = _precomputed_sparse.set(dict(zip(texts, zip(indices, values))))
+        try:
+            yield
+        finally:
+            _precomputed_sparse.reset(token)
+
+    def embed_sparse_query(self, texts):
+        # Once per request: memoized on the request's query encoding
+        encoding = current_query_encoding()
+        if encoding is None or texts != [encoding.query]:
+            return self.sparse.embed_query(texts)
+        if encoding.sparse is None:
+            encoding.sparse = self.sparse.embed_query(texts)
+        return encoding.sparse
+
+    async def aembed_sparse_query(self, query: str):
+        """Encode off the event loop (micro-batched across requests) and memoize on the request's
+        query encoding, so LlamaIndex's synchronous sparse_query_fn call finds it ready."""
+        encoding = current_query_encoding()
+        if encoding is None or encoding.query != query:
+            return await self.sparse.aembed_query([query])
+        if encoding.sparse is None:
+            encoding.sparse = await self.sparse.aembed_query([query])
+        return encoding.sparse
+
+    async def _resolve_vector_names(self):
+        # Named vectors as written by LlamaIndex ("text-dense" / "text-sparse-new"),
+        # or the legacy unnamed dense vector + "text-sparse" of older collections.
+        # Cached until a query fails on the collection or its vectors (e.g. it was recreated)
+        if self._vector_names is None:
+            collection = app_settings.COLLECTION_NAME
+            info = await self.aclient.get_collection(collection)
+            vectors = info.config.params.vectors
+            sparse = list(info.config.params.sparse_vectors or {})
+
+            if isinstance(vectors, dict):
+                if "text-dense" not in vectors:
+                    raise RuntimeError(
+                        f"Collection '{collection}' has no 'text-dense' vector "
+                        f"(has {sorted(vectors)})"
+                    )
+                dense_name = "text-dense"
+            else:
+                dense_name = None  # the collection's single unnamed vector
+
+            sparse_name = next((n for n in ("text-sparse-new", "text-sparse") if n in sparse), None)
+            if sparse_name is None:
+                raise RuntimeError(
+                    f"Collection '{collection}' has no 'text-sparse-new' or 'text-sparse' "
+                    f"vector (has {sorted(sparse)})"
+                )
+
+            self._vector_names = (dense_name, sparse_name)
+        return self._vector_names
+
+    async def query_hybrid(
+        self,
+        dense: list[float],
+        sparse: tuple,
+        limit: int,
+        prefetch_limit: int,
+        fusion: str = "rrf",
+    ):
+        """One Query API call: dense + sparse prefetch, fused server-side (RRF or DBSF).
+
+        Returns scored points carrying only `_node_content` (no vectors, no flattened metadata copies).
+        """
+        try:
+            return await self._query_hybrid(dense, sparse, limit, prefetch_limit, fusion)
+        except UnexpectedResponse as e:
+            # 404: collection gone; 400: e.g. a vector name the (recreated) collection doesn't have
+            if e.status_code not in (400, 404) or self._vector_names is None:
+                raise
+            stale, self._vector_names = self._vector_names, None
+            logger.warning("qdrant_vector_names_stale", error=str(e), vector_names=stale)
+            return await self._query_hybrid(dense, sparse, limit, prefetch_limit, fusion)
+
+    async def _query_hybrid(self, dense, sparse, limit, prefetch_limit, fusion):
+        dense_name, sparse_name = await self._resolve_vector_names()
+        sparse_indices, sparse_values = sparse
+
+        prefetch = [
+            models.Prefetch(query=dense, using=dense_name, limit=prefetch_limit),
+            models.Prefetch(
+                query=models.SparseVector(indices=sparse_indices[0], values=sparse_values[0]),
+                using=sparse_name,
+                limit=prefetch_limit,
+            ),
+        ]
+
+        fusion = models.Fusion.DBSF if fusion == "dbsf" else models.Fusion.RRF
+        response = await self.aclient.query_points(
+            collection_name=app_settings.COLLECTION_NAME,
+            prefetch=prefetch,
+            query=models.FusionQuery(fusion=fusion),
+            limit=limit,
+            with_payload=models.PayloadSelectorInclude(include=["_node_content"]),
+            with_vectors=False,
+        )
+        return response.points
+
     async def delete_collection(self):
         try:
-            await self.client.delete_collection(app_settings.COLLECTION_NAME)
+            await self.aclient.delete_collection(app_settings.COLLECTION_NAME)
+            self._vector_names = None
             return {
                 "deleted": True,
                 "collection_name": app_settings.COLLECTION_NAME
@@ -58,5 +189,11 @@ class QdrantHybridStore(BaseVectorStoreProvider):
             "collection_name": app_settings.COLLECTION_NAME
         }
     
+    async def close(self):
+        self.client.close()
+        await self.aclient.close()
+        if self.sparse is not None:
+            await self.sparse.aclose()
+
     def supports_sparse(self) -> bool:
         return True
\ No newline at end of file
@@ -1,7 +1,8 @@
 """Real Redis semantic cache with vector similarity."""
 import numpy as np  # Add this import at top of cache.py
 from llama_index.core import Settings
-from app.config import app_settings, configure_llm_settings
+from app.config import app_settings
+from app.core.registry import ensure_llm_settings
 import redis.asyncio as redis
 import structlog
 import json
@@ -11,19 +12,12 @@ from redisvl.schema import IndexSchema
 from redisvl.query import VectorQuery
 # from redisvl.query.filter import Tag  # if you ever add metadata filters
 import uuid
-import re
+from app.rag.query_encoding import normalize_query
 
 logger = structlog.get_logger()
 
 redis_client = redis.from_url(app_settings.REDIS_URL, decode_responses=True)
-configure_llm_settings()
-
-# Normalize query: lowercase, strip punctuation/spaces (cheap boost to hit rate)
-def normalize_query(query: str) -> str:
-    query = query.lower().strip()
-    query = re.sub(r'[?.!,;:"]+', '', query)  # Remove common punctuation
-    query = re.sub(r'\s+', ' ', query)  # Collapse spaces
-    return query
+ensure_llm_settings()
 
 # Define schema (dims match your embedding model, e.g., 1536 for OpenAI text-embedding-3-small)
 SCHEMA = IndexSchema.from_dict({
@@ -56,11 +50,15 @@ async def init_cache_index():
         logger.error("Failed to initialize semantic cache index", error=str(e))
         raise
 
-async def get_semantic(query: str, threshold: float = 0.92) -> Optional[Tuple[dict, float]]:
-    """Semantic cache lookup with vector similarity."""
+async def get_semantic(query: str, threshold: float = 0.92, embedding: Optional[list] = None) -> Optional[Tuple[dict, float]]:
+    """Semantic cache lookup with vector similarity.
+
+    `embedding`: precomputed embedding of normalize_query(query) (see app.rag.query_encoding).
+    """
     try:
-        norm_query = normalize_query(query)
-        q_emb = await Settings.embed_model.aget_text_embedding(norm_query)
+        q_emb = embedding
+        if q_emb is None:
+            q_emb = await Settings.embed_model.aget_text_embedding(normalize_query(query))
         
         # Create VectorQuery
         vector_query = VectorQuery(
@@ -110,11 +108,13 @@ async def get_semantic(query: str, threshold: float = 0.92) -> Optional[Tuple[di
         logger.error("Semantic cache get failed", error=str(e), exc_info=True)
         return None, 0.0
 
-async def set_semantic(query: str, answer: str, ttl: int = 3600):
+async def set_semantic(query: str, answer: str, ttl: int = 3600, embedding: Optional[list] = None):
     """Store with vector embedding for similarity search."""
     try:
         norm_query = normalize_query(query)
-        emb_list = await Settings.embed_model.aget_text_embedding(norm_query)
+        emb_list = embedding
+        if emb_list is None:
+            emb_list = await Settings.embed_model.aget_text_embedding(norm_query)
         
         # Convert list[float] → bytes (required for Redis vector field)
         emb_bytes = np.array(emb_list, dtype=np.float32).tobytes()
@@ -0,0 +1,124 @@
+import time
+from typing import List, Optional, Sequence, Tuple
+
+
+# ---------------------------------------------------
+# Length Estimation
+# ---------------------------------------------------
+
+# ~4 chars per wordpiece token for English prose; only the ordering
+# matters, so the estimate does not need to match the tokenizer exactly.
+CHARS_PER_TOKEN = 4
+
+# [CLS] query [SEP] doc [SEP]
+SPECIAL_TOKENS = 3
+
+
+def estimate_pair_tokens(pair: Tuple[str, str]) -> int:
+
+    query, doc = pair
+    return (len(query) + len(doc)) // CHARS_PER_TOKEN + SPECIAL_TOKENS
+
+
+# ---------------------------------------------------
+# Bucketing
+# ---------------------------------------------------
+
+def length_order(lengths: Sequence[int]) -> List[int]:
+    """Pair indices sorted by length, so each internal batch pads to similar sizes."""
+
+    return sorted(range(len(lengths)), key=lengths.__getitem__)
+
+
+def scatter_scores(sorted_scores: Sequence[float], order: Sequence[int]) -> List[float]:
+    """Undo `length_order`: put scores back in arrival order."""
+
+    scores = [0.0] * len(order)
+
+    for score, idx in zip(sorted_scores, order):
+        scores[idx] = score
+
+    return scores
+
+
+def padding_ratio(lengths: Sequence[int], batch_size: int) -> float:
+    """Fraction of tokens that are padding when `lengths` is cut into batches in order."""
+
+    real = 0
+    padded = 0
+
+    for start in range(0, len(lengths), batch_size):
+        chunk = lengths[start: start + batch_size]
+        real += sum(chunk)
+        padded += max(chunk) * len(chunk)
+
+    return 1 - real / padded if padded else 0.0
+
+
+# ---------------------------------------------------
+# Adaptive Batch Window
+# ---------------------------------------------------
+
+class AdaptiveBatchWindow:
+    """How long a worker should wait for more requests before running a partial batch.
+
+    Waiting only pays off when requests actually overlap, so the window is 0
+    until batches have been finding other requests already queued (an EWMA
+    of the queue depth at batch start). Even then it covers about one
+    expected arrival (EWMA inter-arrival time) and at most a fraction of the
+    recent inference latency, capped by `max_wait`: a request that would
+    otherwise sit out a whole inference for the next batch is worth a short
+    wait, anything longer is added latency. When a backlog is queued right
+    now there is nothing to wait for.
+    """
+
+    def __init__(
+        self,
+        max_wait: float,
+        alpha: float = 0.2,
+        inference_fraction: float = 0.25,
+        min_backlog: float = 0.5,
+    ):
+        self.max_wait = max_wait
+        self.alpha = alpha
+        self.inference_fraction = inference_fraction
+        self.min_backlog = min_backlog
+        self.interarrival: Optional[float] = None
+        self.backlog: Optional[float] = None
+        self.inference: Optional[float] = None
+        self._last_arrival: Optional[float] = None
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+
+        if current is None:
+            return sample
+
+        return current + self.alpha * (sample - current)
+
+    def record_arrival(self):
+
+        now = time.monotonic()
+
+        if self._last_arrival is not None:
+            self.interarrival = self._ewma(self.interarrival, now - self._last_arrival)
+
+        self._last_arrival = now
+
+    def record_batch(self, queue_depth: int, latency: float):
+        """`queue_depth`: requests already waiting when the batch started."""
+
+        self.backlog = self._ewma(self.backlog, queue_depth)
+        self.inference = self._ewma(self.inference, latency)
+
+    def window(self, queue_depth: int, open_slots: int) -> float:
+
+        if queue_depth > 0 or open_slots <= 0:
+            return 0.0
+
+        if self.interarrival is None or self.inference is None:
+            return 0.0
+
+        if self.backlog < self.min_backlog:
+            return 0.0
+
+        return min(self.max_wait, self.interarrival, self.inference_fraction * self.inference)
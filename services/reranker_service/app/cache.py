@@ -0,0 +1,84 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+# ---------------------------------------------------
+# Pair Score Cache
+# ---------------------------------------------------
+
+PairKey = Tuple[str, bytes, bytes]
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class PairScoreCache:
+    """Bounded LRU + TTL cache of cross-encoder scores keyed by (model, query hash, doc hash).
+
+    Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, model_name: str, max_size: int, ttl: float):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[PairKey, Tuple[float, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def key(self, query_hash: bytes, doc: str) -> PairKey:
+        return (self.model_name, query_hash, text_hash(doc))
+
+    def get(self, key: PairKey) -> Optional[float]:
+
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        score, expires_at = entry
+
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return score
+
+    def put(self, key: PairKey, score: float):
+
+        self._entries[key] = (score, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
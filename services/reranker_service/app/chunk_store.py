@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ---------------------------------------------------
+# Chunk Text Store
+# ---------------------------------------------------
+
+class ChunkStore:
+    """Bounded LRU of chunk ID (Qdrant point ID) -> chunk text.
+
+    Populated in bulk at ingest time and written through by requests that
+    carry inline text, so clients can send IDs instead of full chunks.
+    Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, chunk_id: str) -> Optional[str]:
+
+        text = self._texts.get(chunk_id)
+
+        if text is None:
+            self.misses += 1
+            return None
+
+        self._texts.move_to_end(chunk_id)
+        self.hits += 1
+
+        return text
+
+    def put(self, chunk_id: str, text: str):
+
+        self._texts[chunk_id] = text
+        self._texts.move_to_end(chunk_id)
+
+        while len(self._texts) > self.max_size:
+            self._texts.popitem(last=False)
+            self.evictions += 1
+
+    def put_many(self, chunks: Iterable[Tuple[str, str]]) -> int:
+
+        count = 0
+
+        for chunk_id, text in chunks:
+            self.put(chunk_id, text)
+            count += 1
+
+        return count
+
+    def resolve(self, chunk_ids: List[str]) -> Tuple[List[Optional[str]], List[int]]:
+        """Texts in request order, plus the indices of IDs that are not stored."""
+
+        texts = [self.get(chunk_id) for chunk_id in chunk_ids]
+        missing = [i for i, text in enumerate(texts) if text is None]
+
+        return texts, missing
+
+    def stats(self) -> Dict[str, float]:
+
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._texts),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -1,15 +1,51 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 class AppSettings(BaseSettings):
-    
+
+    # Model
+    MODEL_NAME: str = "jinaai/jina-reranker-v1-tiny-en"
+
     # Configurable batching parameters (tune for production)
     QUEUE_SIZE: int = 2048
     MAX_BATCH_REQUESTS: int = 32
     INTERNAL_BATCH_SIZE: int = 64
     MAX_BATCH_PAIRS: int = 512
-    BATCH_TIMEOUT: float = 0.150 # 50-200ms local dev | production GPU 5–20 ms | CPU production 20–50 ms
+    BATCH_TIMEOUT: float = 0.150 # cap on the wait for more requests; the window is 0 unless requests overlap, then ~one arrival / a fraction of inference time
+    MAX_BATCH_ENDPOINT_ITEMS: int = 256 # items per /rerank/batch call
+    LENGTH_BUCKETING: bool = True # sort pairs by estimated length so each INTERNAL_BATCH_SIZE chunk pads less
+
+    # Deadlines: requests carry `timeout` (body) or X-Request-Timeout (header), in seconds
+    DEFAULT_REQUEST_TIMEOUT: float = 60.0 # 0 = no deadline
+    DISCONNECT_POLL_INTERVAL: float = 0.1
+
+    # Pair score cache (0 disables)
+    PAIR_CACHE_SIZE: int = 100_000
+    PAIR_CACHE_TTL: float = 3600.0
+
+    # Chunk ID -> text store for ID-based requests, bulk-loaded via POST /chunks (0 disables)
+    CHUNK_STORE_SIZE: int = 200_000
+
+    # Pre-tokenized documents per inference process (0 = tokenize every pair)
+    TOKEN_CACHE_SIZE: int = 50_000
 
     # 1 worker per GPU | 2–4 workers per CPU
     WORKERS: int = 2
 
-reranker_app_settings = AppSettings()
\ No newline at end of file
+    # Inference executor: "thread" shares one ONNX session (ORT releases the GIL during run),
+    # "process" starts EXECUTOR_WORKERS processes, each with its own session.
+    EXECUTOR_TYPE: Literal["thread", "process"] = "thread"
+    EXECUTOR_WORKERS: int = 0 # 0 = one executor slot per batch worker
+
+    # Process mode only
+    WORKER_PIN_CORES: bool = True # split available cores into disjoint sets, one per process
+    WORKER_SHM_BYTES: int = 16 * 1024 * 1024 # per-process shared memory for pairs in / scores out
+
+    # ONNX Runtime session options (0 = let ORT decide)
+    # With N executor slots on C cores, intra_op ≈ C / N avoids oversubscription.
+    ORT_INTRA_OP_THREADS: int = 0
+    ORT_INTER_OP_THREADS: int = 0
+    ORT_GRAPH_OPTIMIZATION_LEVEL: Literal["disable", "basic", "extended", "all"] = "all"
+
+reranker_app_settings = AppSettings()
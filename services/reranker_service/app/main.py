@@ -2,14 +2,32 @@ import asyncio
 import logging
 import heapq
 import time
-from typing import List, Tuple
-
-import onnxruntime as ort
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from fastembed.rerank.cross_encoder import TextCrossEncoder
-
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel, ValidationError, model_validator
+
+from app.batching import (
+    AdaptiveBatchWindow,
+    estimate_pair_tokens,
+    length_order,
+    padding_ratio,
+    scatter_scores,
+)
+from app.cache import PairScoreCache, text_hash
+from app.chunk_store import ChunkStore
 from app.config import reranker_app_settings
+from app import metrics
+from app.model import InferenceBackend, create_backend
+from app.wire import (
+    BINARY_MEDIA_TYPE,
+    DEFLATE,
+    decode_request,
+    decompress,
+    encode_results,
+)
 
 
 # ---------------------------------------------------
@@ -23,59 +41,87 @@ app = FastAPI()
 
 
 # ---------------------------------------------------
-# Execution Providers
+# Inference Backend
 # ---------------------------------------------------
 
-def get_execution_providers():
+# Inference runs off the event loop so it keeps accepting requests
+# and batch workers actually overlap.
+backend: Optional[InferenceBackend] = None
 
-    available = ort.get_available_providers()
-    preferred = []
 
-    if "MPSExecutionProvider" in available:
-        preferred.append("MPSExecutionProvider")
+# ---------------------------------------------------
+# Queue
+# ---------------------------------------------------
 
-    if "CUDAExecutionProvider" in available:
-        preferred.append("CUDAExecutionProvider")
+class RerankTask:
 
-    preferred.append("CPUExecutionProvider")
+    def __init__(
+        self,
+        query: str,
+        docs: List[str],
+        future: asyncio.Future,
+        deadline: Optional[float] = None,
+    ):
+        self.query = query
+        self.docs = docs
+        self.future = future
+        self.deadline = deadline  # time.monotonic() value, None = no deadline
+        self.enqueued_at = time.monotonic()
 
-    return preferred
+    def is_stale(self, now: float) -> bool:
+        """Cancelled by the handler (client gone / timed out) or past its deadline."""
+        return self.future.done() or (self.deadline is not None and now >= self.deadline)
 
 
-# ---------------------------------------------------
-# Model
-# ---------------------------------------------------
-
-model = TextCrossEncoder(
-    model_name="jinaai/jina-reranker-v1-tiny-en",
-    providers=get_execution_providers(),
+queue: asyncio.Queue[RerankTask] = asyncio.Queue(
+    maxsize=reranker_app_settings.QUEUE_SIZE
 )
 
-# Warmup
-model.rerank(query="warmup", documents=["warmup"])
+metrics.QUEUE_DEPTH.set_function(queue.qsize)
 
 
 # ---------------------------------------------------
-# Queue
+# Pair Score Cache
 # ---------------------------------------------------
 
-class RerankTask:
+pair_cache = PairScoreCache(
+    model_name=reranker_app_settings.MODEL_NAME,
+    max_size=reranker_app_settings.PAIR_CACHE_SIZE,
+    ttl=reranker_app_settings.PAIR_CACHE_TTL,
+)
 
-    def __init__(self, query: str, docs: List[str], future: asyncio.Future):
-        self.query = query
-        self.docs = docs
-        self.future = future
+chunk_store = ChunkStore(max_size=reranker_app_settings.CHUNK_STORE_SIZE)
 
+batch_stats = {
+    "pairs": 0,
+    "deduplicated_pairs": 0,
+    "dropped_tasks": 0,
+}
 
-queue: asyncio.Queue[RerankTask] = asyncio.Queue(
-    maxsize=reranker_app_settings.QUEUE_SIZE
-)
+batch_window = AdaptiveBatchWindow(max_wait=reranker_app_settings.BATCH_TIMEOUT)
+
+collect_lock = asyncio.Lock()
 
 
 # ---------------------------------------------------
 # Batch Worker
 # ---------------------------------------------------
 
+def drop_if_stale(task: RerankTask) -> bool:
+
+    if not task.is_stale(time.monotonic()):
+        return False
+
+    if not task.future.done():
+        task.future.cancel()
+
+    batch_stats["dropped_tasks"] += 1
+    metrics.DROPPED.inc()
+    queue.task_done()
+
+    return True
+
+
 async def batch_worker(worker_id: int):
 
     while True:
@@ -86,65 +132,118 @@ async def batch_worker(worker_id: int):
 
         pair_count = 0
 
-        # ---------------------------------------------------
-        # Get first task (opportunistic batching)
-        # ---------------------------------------------------
+        # One worker collects at a time: an idle worker blocked in queue.get()
+        # would otherwise take the arrivals this one is waiting for
+        async with collect_lock:
 
-        try:
-            try:
-                first = queue.get_nowait()
-            except asyncio.QueueEmpty:
-                first = await asyncio.wait_for(
-                    queue.get(),
-                    timeout=reranker_app_settings.BATCH_TIMEOUT,
-                )
-
-        except asyncio.TimeoutError:
-            continue
+            # ---------------------------------------------------
+            # Get first task
+            # ---------------------------------------------------
 
-        tasks.append(first)
+            first = await queue.get()
 
-        doc_count = len(first.docs)
-        task_doc_counts.append(doc_count)
+            if drop_if_stale(first):
+                continue
 
-        pairs.extend((first.query, doc) for doc in first.docs)
-        pair_count += doc_count
+            backlog = queue.qsize()
+            metrics.BATCH_QUEUE_DEPTH.observe(backlog)
 
-        # ---------------------------------------------------
-        # Fill batch
-        # ---------------------------------------------------
+            tasks.append(first)
 
-        while len(tasks) < reranker_app_settings.MAX_BATCH_REQUESTS:
+            doc_count = len(first.docs)
+            task_doc_counts.append(doc_count)
 
-            try:
-                task = queue.get_nowait()
+            pairs.extend((first.query, doc) for doc in first.docs)
+            pair_count += doc_count
 
-            except asyncio.QueueEmpty:
-                break
+            # ---------------------------------------------------
+            # Fill batch (wait only as long as the arrival rate justifies)
+            # ---------------------------------------------------
 
-            doc_count = len(task.docs)
+            window_end = time.monotonic() + batch_window.window(
+                queue_depth=backlog,
+                open_slots=reranker_app_settings.MAX_BATCH_REQUESTS - len(tasks),
+            )
 
-            # enforce pair limit
-            if pair_count + doc_count > reranker_app_settings.MAX_BATCH_PAIRS:
+            while len(tasks) < reranker_app_settings.MAX_BATCH_REQUESTS:
 
                 try:
-                    queue.put_nowait(task)
-                except asyncio.QueueFull:
-                    logger.warning("Queue full while reinserting task")
+                    task = queue.get_nowait()
 
-                break
+                except asyncio.QueueEmpty:
 
-            tasks.append(task)
-            task_doc_counts.append(doc_count)
+                    remaining = window_end - time.monotonic()
 
-            pairs.extend((task.query, doc) for doc in task.docs)
-            pair_count += doc_count
+                    if remaining <= 0:
+                        break
+
+                    try:
+                        task = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+                if drop_if_stale(task):
+                    continue
+
+                doc_count = len(task.docs)
+
+                # enforce pair limit
+                if pair_count + doc_count > reranker_app_settings.MAX_BATCH_PAIRS:
+
+                    try:
+                        queue.put_nowait(task)
+                    except asyncio.QueueFull:
+                        logger.warning("Queue full while reinserting task")
+
+                    break
+
+                tasks.append(task)
+                task_doc_counts.append(doc_count)
+
+                pairs.extend((task.query, doc) for doc in task.docs)
+                pair_count += doc_count
+
+        now = time.monotonic()
+
+        for task in tasks:
+            metrics.QUEUE_WAIT.observe(now - task.enqueued_at)
+
+        # ---------------------------------------------------
+        # Deduplicate identical pairs across tasks
+        # ---------------------------------------------------
+
+        unique_index: Dict[Tuple[str, str], int] = {}
+        pair_slots = [unique_index.setdefault(pair, len(unique_index)) for pair in pairs]
+        unique_pairs = list(unique_index)
+        unique_count = len(unique_pairs)
+
+        batch_stats["pairs"] += pair_count
+        batch_stats["deduplicated_pairs"] += pair_count - unique_count
+
+        metrics.BATCH_REQUESTS.observe(len(tasks))
+        metrics.BATCH_PAIRS.observe(unique_count)
+
+        # ---------------------------------------------------
+        # Length bucketing
+        # ---------------------------------------------------
+
+        batch_size = reranker_app_settings.INTERNAL_BATCH_SIZE
+        lengths = [estimate_pair_tokens(pair) for pair in unique_pairs]
+
+        if reranker_app_settings.LENGTH_BUCKETING:
+            order = length_order(lengths)
+        else:
+            order = list(range(unique_count))
+
+        padding_before = padding_ratio(lengths, batch_size)
+        padding_after = padding_ratio([lengths[i] for i in order], batch_size)
 
         logger.info(
             f"Worker {worker_id} processing batch "
-            f"{len(tasks)} requests / {pair_count} pairs "
+            f"{len(tasks)} requests / {pair_count} pairs ({unique_count} unique) "
             f"| queue={queue.qsize()} "
-            f"| max_pairs={reranker_app_settings.MAX_BATCH_PAIRS}"
+            f"| max_pairs={reranker_app_settings.MAX_BATCH_PAIRS} "
+            f"| padding={padding_before:.2f}->{padding_after:.2f}"
         )
 
         # ---------------------------------------------------
@@ -155,19 +254,20 @@ async def batch_worker(worker_id: int):
 
         try:
 
-            scores = list(
-                model.rerank_pairs(
-                    pairs,
-                    batch_size=reranker_app_settings.INTERNAL_BATCH_SIZE,
-                )
+            sorted_scores = await backend.score(
+                [unique_pairs[i] for i in order],
+                batch_size,
             )
 
             # Safety check
-            if len(scores) != pair_count:
+            if len(sorted_scores) != unique_count:
                 raise RuntimeError(
-                    f"Score count mismatch: expected {pair_count}, got {len(scores)}"
+                    f"Score count mismatch: expected {unique_count}, got {len(sorted_scores)}"
                 )
 
+            unique_scores = scatter_scores(sorted_scores, order)
+            scores = [unique_scores[slot] for slot in pair_slots]
+
             idx = 0
 
             for task, doc_count in zip(tasks, task_doc_counts):
@@ -192,8 +292,13 @@ async def batch_worker(worker_id: int):
 
         latency = time.perf_counter() - start
 
+        metrics.INFERENCE_LATENCY.observe(latency)
+        batch_window.record_batch(backlog, latency)
+        metrics.WORKER_BUSY.labels(worker=str(worker_id)).inc(latency)
+
         logger.info(
-            f"Worker {worker_id} batch done | latency={latency:.3f}s"
+            f"Worker {worker_id} batch done | latency={latency:.3f}s "
+            f"| pairs/s={unique_count / latency:.1f}"
         )
 
 
@@ -203,41 +308,237 @@ async def batch_worker(worker_id: int):
 
 class RerankRequest(BaseModel):
     query: str
-    documents: List[str]
+    documents: List[str] = []
+    # Chunk IDs resolved from the chunk store; `documents` (same order) is the inline fallback
+    document_ids: Optional[List[str]] = None
     top_n: int = 25
+    timeout: Optional[float] = None  # seconds; overrides X-Request-Timeout
+
+    @model_validator(mode="after")
+    def check_documents(self) -> "RerankRequest":
+        ids = self.document_ids
+
+        if ids is not None and self.documents and len(self.documents) != len(ids):
+            raise ValueError("document_ids and documents must be the same length")
+        return self
+
+
+class Chunk(BaseModel):
+    id: str
+    text: str
+
+
+class LoadChunksRequest(BaseModel):
+    chunks: List[Chunk]
+
+
+def resolve_documents(request: RerankRequest) -> List[str]:
+    """Document texts for the request, looking up chunk IDs in the chunk store.
+
+    Inline text wins and is written through to the store. Unknown IDs with no
+    inline text get a 409 listing them, so the client can resend with text.
+    """
+
+    if request.document_ids is None:
+        return request.documents
+
+    if request.documents:
+        if chunk_store.enabled:
+            chunk_store.put_many(zip(request.document_ids, request.documents))
+        return request.documents
+
+    texts, missing = chunk_store.resolve(request.document_ids)
+
+    if missing:
+        raise HTTPException(
+            status_code=409,
+            detail={"missing_ids": [request.document_ids[i] for i in missing]},
+        )
+
+    return texts
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def resolve_deadline(request: RerankRequest, header_timeout: Optional[float]) -> Optional[float]:
+
+    timeout = request.timeout or header_timeout or reranker_app_settings.DEFAULT_REQUEST_TIMEOUT
+
+    return time.monotonic() + timeout if timeout > 0 else None
+
+
+async def wait_for_scores(
+    raw_request: Request,
+    future: asyncio.Future,
+    deadline: Optional[float],
+) -> List[float]:
+    """Await batch results, giving up on deadline or client disconnect.
+
+    Giving up cancels the future, which makes the batch builder drop the task.
+    """
+
+    try:
+        while True:
+
+            timeout = reranker_app_settings.DISCONNECT_POLL_INTERVAL
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+
+                timeout = min(timeout, remaining)
+
+            done, _ = await asyncio.wait({future}, timeout=timeout)
+
+            if done:
+                # Cancelled by the batch builder: deadline passed while queued
+                if future.cancelled():
+                    raise asyncio.TimeoutError
+
+                return future.result()
+
+            if await raw_request.is_disconnected():
+                raise ClientDisconnected
+
+    finally:
+        if not future.done():
+            future.cancel()
 
 
 class RerankResponse(BaseModel):
     results: List[Tuple[int, float]]
 
 
-@app.post("/rerank", response_model=RerankResponse)
-async def rerank(request: RerankRequest):
+class RerankBatchRequest(BaseModel):
+    items: List[RerankRequest]
 
-    if len(request.documents) == 0:
-        return {"results": []}
 
-    loop = asyncio.get_running_loop()
-    future = loop.create_future()
+class RerankBatchItem(BaseModel):
+    results: List[Tuple[int, float]] = []
+    error: Optional[Dict] = None  # {"status_code", "detail"} when this item failed
+
+
+class RerankBatchResponse(BaseModel):
+    items: List[RerankBatchItem]
 
-    task = RerankTask(
-        query=request.query,
-        docs=request.documents,
-        future=future,
-    )
+
+async def parse_rerank_request(raw_request: Request) -> RerankRequest:
+    """JSON by default; the compact binary format when the client sends it."""
+
+    payload = await raw_request.body()
 
     try:
-        queue.put_nowait(task)
+        if raw_request.headers.get("content-encoding") == DEFLATE:
+            payload = decompress(payload)
+
+        if raw_request.headers.get("content-type", "").startswith(BINARY_MEDIA_TYPE):
+            query, documents, top_n, document_ids = decode_request(payload)
+            return RerankRequest(
+                query=query,
+                documents=documents,
+                document_ids=document_ids,
+                top_n=top_n,
+            )
 
-    except asyncio.QueueFull:
-        raise HTTPException(
-            status_code=503,
-            detail="Reranker overloaded",
-        )
+        return RerankRequest.model_validate_json(payload)
+
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Malformed rerank request: {e}")
+
+
+async def rerank_documents(
+    request: RerankRequest,
+    raw_request: Request,
+    header_timeout: Optional[float],
+) -> List[Tuple[int, float]]:
+
+    start = time.perf_counter()
+
+    try:
+        return await score_documents(request, raw_request, header_timeout)
+    finally:
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - start)
+
+
+async def score_documents(
+    request: RerankRequest,
+    raw_request: Request,
+    header_timeout: Optional[float],
+) -> List[Tuple[int, float]]:
+
+    documents = resolve_documents(request)
+
+    if len(documents) == 0:
+        return []
 
     start = time.perf_counter()
 
-    scores = await future
+    # ---------------------------------------------------
+    # Cache lookup: only misses go to the queue
+    # ---------------------------------------------------
+
+    scores: List[Optional[float]] = [None] * len(documents)
+    keys = []
+
+    if pair_cache.enabled:
+        query_hash = text_hash(request.query)
+        keys = [pair_cache.key(query_hash, doc) for doc in documents]
+        scores = [pair_cache.get(key) for key in keys]
+
+    missing = [i for i, score in enumerate(scores) if score is None]
+
+    if missing:
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        task = RerankTask(
+            query=request.query,
+            docs=[documents[i] for i in missing],
+            future=future,
+            deadline=resolve_deadline(request, header_timeout),
+        )
+
+        try:
+            queue.put_nowait(task)
+
+        except asyncio.QueueFull:
+            metrics.REJECTED.inc()
+            raise HTTPException(
+                status_code=503,
+                detail="Reranker overloaded",
+            )
+
+        batch_window.record_arrival()
+
+        try:
+            missing_scores = await wait_for_scores(raw_request, future, task.deadline)
+
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=504,
+                detail="Rerank deadline exceeded",
+            )
+
+        except ClientDisconnected:
+            logger.info("Client disconnected, task cancelled")
+            raise HTTPException(
+                status_code=499,
+                detail="Client closed request",
+            )
+
+        for i, score in zip(missing, missing_scores):
+            scores[i] = score
+
+            if pair_cache.enabled:
+                pair_cache.put(keys[i], score)
 
     # Efficient top-k selection
     top = heapq.nlargest(
@@ -249,11 +550,94 @@ async def rerank(request: RerankRequest):
     latency = time.perf_counter() - start
 
     logger.info(
-        f"Request done | docs={len(request.documents)} "
+        f"Request done | docs={len(documents)} "
+        f"| cached={len(documents) - len(missing)} "
         f"| latency={latency:.3f}s"
     )
 
-    return {"results": top}
+    return top
+
+
+@app.post(
+    "/rerank",
+    response_model=RerankResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": RerankRequest.model_json_schema()},
+                BINARY_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        },
+    },
+)
+async def rerank(
+    raw_request: Request,
+    x_request_timeout: Optional[float] = Header(None),
+):
+
+    request = await parse_rerank_request(raw_request)
+    results = await rerank_documents(request, raw_request, x_request_timeout)
+
+    if BINARY_MEDIA_TYPE in raw_request.headers.get("accept", ""):
+        return Response(content=encode_results(results), media_type=BINARY_MEDIA_TYPE)
+
+    return {"results": results}
+
+
+@app.post("/rerank/batch", response_model=RerankBatchResponse)
+async def rerank_batch(
+    request: RerankBatchRequest,
+    raw_request: Request,
+    x_request_timeout: Optional[float] = Header(None),
+):
+    """Many (query, documents, top_n) items in one call.
+
+    Every item is queued at once, so the batch builder packs them into
+    shared batches; a failing item does not fail the others.
+    """
+
+    if len(request.items) > reranker_app_settings.MAX_BATCH_ENDPOINT_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {reranker_app_settings.MAX_BATCH_ENDPOINT_ITEMS} items per batch",
+        )
+
+    outcomes = await asyncio.gather(
+        *(
+            rerank_documents(item, raw_request, x_request_timeout)
+            for item in request.items
+        ),
+        return_exceptions=True,
+    )
+
+    items = []
+
+    for outcome in outcomes:
+
+        if isinstance(outcome, HTTPException):
+            items.append({"error": {"status_code": outcome.status_code, "detail": outcome.detail}})
+
+        elif isinstance(outcome, BaseException):
+            logger.error(f"Batch item failed: {outcome!r}")
+            items.append({"error": {"status_code": 500, "detail": str(outcome)}})
+
+        else:
+            items.append({"results": outcome})
+
+    return {"items": items}
+
+
+@app.post("/chunks")
+async def load_chunks(request: LoadChunksRequest):
+    """Bulk-load chunk texts (called at ingest time) so /rerank can take chunk IDs."""
+
+    if not chunk_store.enabled:
+        raise HTTPException(status_code=404, detail="Chunk store disabled")
+
+    stored = chunk_store.put_many((chunk.id, chunk.text) for chunk in request.chunks)
+
+    return {"stored": stored}
 
 
 @app.get("/health")
@@ -261,6 +645,20 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "pair_cache": pair_cache.stats(),
+        "chunk_store": chunk_store.stats(),
+        "batching": batch_stats,
+    }
+
+
 # ---------------------------------------------------
 # Startup
 # ---------------------------------------------------
@@ -268,9 +666,23 @@ async def health():
 @app.on_event("startup")
 async def startup():
 
+    global backend
+
+    backend = create_backend()
+
     workers = reranker_app_settings.WORKERS
 
-    logger.info(f"Starting {workers} reranker workers")
+    logger.info(
+        f"Starting {workers} reranker workers "
+        f"| executor={reranker_app_settings.EXECUTOR_TYPE}"
+    )
 
     for i in range(workers):
-        asyncio.create_task(batch_worker(i))
\ No newline at end of file
+        asyncio.create_task(batch_worker(i))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+
+    if backend is not None:
+        backend.shutdown()
@@ -0,0 +1,71 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# ---------------------------------------------------
+# Prometheus Metrics
+# ---------------------------------------------------
+#
+# Recorded in the API process (batch workers run on its event loop), so
+# the default registry is enough even when inference runs in worker processes.
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25,
+    0.5, 0.75, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+QUEUE_WAIT = Histogram(
+    "reranker_queue_wait_seconds",
+    "Time a request spends queued before a batch worker picks it up",
+    buckets=LATENCY_BUCKETS,
+)
+
+BATCH_REQUESTS = Histogram(
+    "reranker_batch_requests",
+    "Requests per inference batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+BATCH_PAIRS = Histogram(
+    "reranker_batch_pairs",
+    "Unique (query, document) pairs per inference batch",
+    buckets=(1, 8, 16, 32, 64, 128, 256, 512, 1024, 2048),
+)
+
+INFERENCE_LATENCY = Histogram(
+    "reranker_inference_seconds",
+    "Model time per batch",
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUEST_LATENCY = Histogram(
+    "reranker_request_seconds",
+    "End-to-end latency of one rerank (cache lookup, queueing, inference)",
+    buckets=LATENCY_BUCKETS,
+)
+
+BATCH_QUEUE_DEPTH = Histogram(
+    "reranker_batch_queue_depth",
+    "Requests still queued when a worker starts a batch",
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1000),
+)
+
+QUEUE_DEPTH = Gauge(
+    "reranker_queue_depth",
+    "Requests currently queued",
+)
+
+REJECTED = Counter(
+    "reranker_rejected_total",
+    "Requests rejected with 503 because the queue was full",
+)
+
+DROPPED = Counter(
+    "reranker_dropped_tasks_total",
+    "Queued requests dropped before inference (deadline passed or client gone)",
+)
+
+WORKER_BUSY = Counter(
+    "reranker_worker_busy_seconds_total",
+    "Seconds each batch worker spent in inference; rate() = utilisation",
+    ["worker"],
+)
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import onnxruntime as ort
+from fastembed.common.preprocessor_utils import load_tokenizer
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from tokenizers import Encoding, Tokenizer
+
+from app.config import reranker_app_settings
+
+
+logger = logging.getLogger("reranker")
+
+
+# ---------------------------------------------------
+# Execution Providers
+# ---------------------------------------------------
+
+def get_execution_providers():
+
+    available = ort.get_available_providers()
+    preferred = []
+
+    if "MPSExecutionProvider" in available:
+        preferred.append("MPSExecutionProvider")
+
+    if "CUDAExecutionProvider" in available:
+        preferred.append("CUDAExecutionProvider")
+
+    preferred.append("CPUExecutionProvider")
+
+    return preferred
+
+
+# ---------------------------------------------------
+# Session Options
+# ---------------------------------------------------
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def build_session_options() -> ort.SessionOptions:
+
+    so = ort.SessionOptions()
+    so.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+        reranker_app_settings.ORT_GRAPH_OPTIMIZATION_LEVEL
+    ]
+
+    if reranker_app_settings.ORT_INTRA_OP_THREADS > 0:
+        so.intra_op_num_threads = reranker_app_settings.ORT_INTRA_OP_THREADS
+
+    if reranker_app_settings.ORT_INTER_OP_THREADS > 0:
+        so.inter_op_num_threads = reranker_app_settings.ORT_INTER_OP_THREADS
+
+    return so
+
+
+# ---------------------------------------------------
+# Model
+# ---------------------------------------------------
+
+# One model per process: the API process in thread mode,
+# each executor process in process mode.
+_model: Optional[TextCrossEncoder] = None
+
+
+def load_model() -> TextCrossEncoder:
+    """Build the cross-encoder with an ORT session configured from AppSettings."""
+
+    providers = get_execution_providers()
+
+    # fastembed only exposes a single `threads` knob, so skip its session
+    # and build our own from the same model files.
+    encoder = TextCrossEncoder(
+        model_name=reranker_app_settings.MODEL_NAME,
+        providers=providers,
+        lazy_load=True,
+    )
+
+    onnx_model = encoder.model
+    model_dir = onnx_model._model_dir
+
+    onnx_model.model = ort.InferenceSession(
+        str(model_dir / onnx_model.model_description["model_file"]),
+        sess_options=build_session_options(),
+        providers=providers,
+    )
+    onnx_model.tokenizer, _ = load_tokenizer(model_dir=model_dir)
+
+    return encoder
+
+
+def init_model():
+
+    global _model
+
+    if _model is not None:
+        return
+
+    _model = load_model()
+
+    # Warmup
+    _model.rerank(query="warmup", documents=["warmup"])
+
+    logger.info(f"Loaded {reranker_app_settings.MODEL_NAME}")
+
+
+# ---------------------------------------------------
+# Pre-tokenized Documents
+# ---------------------------------------------------
+
+class DocumentTokenCache:
+    """LRU of document text -> Encoding without special tokens.
+
+    Chunks recur across requests, so each is tokenized once per inference
+    process; per request only the query is tokenized. Shared by executor
+    threads, hence the lock.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._encodings: "OrderedDict[str, Encoding]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, tokenizer: Tokenizer, docs: List[str]) -> List[Encoding]:
+
+        with self._lock:
+            found: Dict[str, Encoding] = {}
+
+            for doc in docs:
+                encoding = self._encodings.get(doc)
+
+                if encoding is not None:
+                    self._encodings.move_to_end(doc)
+                    found[doc] = encoding
+
+        # Tokenize misses outside the lock; encode() one at a time so the
+        # tokenizer's batch padding never leaks into cached encodings.
+        for doc in docs:
+            if doc not in found:
+                found[doc] = tokenizer.encode(doc, add_special_tokens=False)
+
+        with self._lock:
+            for doc, encoding in found.items():
+                self._encodings[doc] = encoding
+
+            while len(self._encodings) > self.max_size:
+                self._encodings.popitem(last=False)
+
+        return [found[doc] for doc in docs]
+
+
+_token_cache = DocumentTokenCache(max_size=reranker_app_settings.TOKEN_CACHE_SIZE)
+
+
+def score_pretokenized(pairs: List[Tuple[str, str]], batch_size: int) -> List[float]:
+    """Same inputs as fastembed's rerank_pairs, built from cached document tokens.
+
+    `post_process` applies the tokenizer's own truncation and [CLS]/[SEP]/type
+    ids to the (query, doc) pair, exactly as a full pair encode would.
+    """
+
+    onnx_model = _model.model
+    tokenizer: Tokenizer = onnx_model.tokenizer
+    padding = tokenizer.padding or {}
+
+    queries = {
+        query: tokenizer.encode(query, add_special_tokens=False)
+        for query in {query for query, _ in pairs}
+    }
+    docs = _token_cache.encode(tokenizer, [doc for _, doc in pairs])
+
+    scores: List[float] = []
+
+    for start in range(0, len(pairs), batch_size):
+
+        batch = [
+            tokenizer.post_process(queries[query], doc, add_special_tokens=True)
+            for (query, _), doc in zip(
+                pairs[start: start + batch_size],
+                docs[start: start + batch_size],
+            )
+        ]
+
+        longest = max(len(encoding.ids) for encoding in batch)
+
+        for encoding in batch:
+            encoding.pad(
+                longest,
+                pad_id=padding.get("pad_id", 0),
+                pad_type_id=padding.get("pad_type_id", 0),
+                pad_token=padding.get("pad_token", "[PAD]"),
+            )
+
+        onnx_input = onnx_model._preprocess_onnx_input(onnx_model._build_onnx_input(batch))
+        outputs = onnx_model.model.run(onnx_model.ONNX_OUTPUT_NAMES, onnx_input)
+
+        scores.extend(float(score) for score in outputs[0][:, 0])
+
+    return scores
+
+
+def score_pairs(pairs: List[Tuple[str, str]], batch_size: int) -> List[float]:
+    """Blocking inference entrypoint; always run through the executor."""
+
+    if _model is None:
+        init_model()
+
+    if reranker_app_settings.TOKEN_CACHE_SIZE > 0:
+        return score_pretokenized(pairs, batch_size)
+
+    return list(_model.rerank_pairs(pairs, batch_size=batch_size))
+
+
+# ---------------------------------------------------
+# Inference Backend
+# ---------------------------------------------------
+
+class InferenceBackend:
+    """Runs blocking inference off the event loop.
+
+    thread:  executor threads call the in-process model directly.
+    process: executor threads dispatch to a WorkerPool, one thread per process.
+    """
+
+    def __init__(
+        self,
+        executor: ThreadPoolExecutor,
+        score_fn: Callable[[List[Tuple[str, str]], int], List[float]],
+        on_shutdown: Optional[Callable[[], None]] = None,
+    ):
+        self.executor = executor
+        self.score_fn = score_fn
+        self.on_shutdown = on_shutdown
+
+    async def score(self, pairs: List[Tuple[str, str]], batch_size: int) -> List[float]:
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, self.score_fn, pairs, batch_size)
+
+    def shutdown(self):
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+        if self.on_shutdown is not None:
+            self.on_shutdown()
+
+
+def create_backend() -> InferenceBackend:
+
+    max_workers = (
+        reranker_app_settings.EXECUTOR_WORKERS
+        or reranker_app_settings.WORKERS
+    )
+
+    if reranker_app_settings.EXECUTOR_TYPE == "process":
+
+        from app.worker_pool import WorkerPool
+
+        pool = WorkerPool(processes=max_workers)
+
+        return InferenceBackend(
+            executor=ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="reranker-dispatch",
+            ),
+            score_fn=pool.score_pairs,
+            on_shutdown=pool.close,
+        )
+
+    init_model()
+
+    return InferenceBackend(
+        executor=ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="reranker-inference",
+        ),
+        score_fn=score_pairs,
+    )
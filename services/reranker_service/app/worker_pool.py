@@ -0,0 +1,270 @@
+import logging
+import multiprocessing
+import os
+import queue
+import struct
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import reranker_app_settings
+
+
+logger = logging.getLogger("reranker")
+
+
+# ---------------------------------------------------
+# Wire Format
+# ---------------------------------------------------
+#
+# Pairs travel as one buffer: [n_pairs u32][offsets u32 x (2n + 1)][utf-8 blob]
+# written into the worker's shared memory block; scores come back as float32
+# in the same block. The pipe only carries fixed-size control headers, so
+# nothing large is ever pickled.
+
+REQUEST = struct.Struct("<IIB")  # payload bytes, batch size, payload inline in message
+RESPONSE = struct.Struct("<BI")  # status (0 = ok), score count
+COUNT = struct.Struct("<I")
+
+
+def encode_pairs(pairs: Sequence[Tuple[str, str]]) -> bytes:
+
+    texts = [text.encode("utf-8") for pair in pairs for text in pair]
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.uint32)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+
+    return COUNT.pack(len(pairs)) + offsets.tobytes() + b"".join(texts)
+
+
+def decode_pairs(payload: bytes) -> List[Tuple[str, str]]:
+
+    (n_pairs,) = COUNT.unpack_from(payload)
+
+    offsets = np.frombuffer(
+        payload, dtype=np.uint32, count=2 * n_pairs + 1, offset=COUNT.size
+    ).tolist()
+    blob = memoryview(payload)[COUNT.size + 4 * len(offsets):]
+
+    texts = [
+        str(blob[offsets[i]: offsets[i + 1]], "utf-8")
+        for i in range(2 * n_pairs)
+    ]
+
+    return list(zip(texts[0::2], texts[1::2]))
+
+
+# ---------------------------------------------------
+# Worker Process
+# ---------------------------------------------------
+
+def _worker_main(conn: Connection, shm_name: str, cores: Optional[List[int]]):
+
+    if cores:
+        os.sched_setaffinity(0, cores)
+
+        # Size the session to the cores this process owns
+        if reranker_app_settings.ORT_INTRA_OP_THREADS == 0:
+            reranker_app_settings.ORT_INTRA_OP_THREADS = len(cores)
+
+    from app.model import init_model, score_pairs
+
+    init_model()
+
+    shm = SharedMemory(name=shm_name)
+    conn.send_bytes(b"ready")
+
+    while True:
+
+        try:
+            message = conn.recv_bytes()
+        except EOFError:
+            break
+
+        size, batch_size, inline = REQUEST.unpack_from(message)
+
+        if inline:
+            payload = message[REQUEST.size:]
+        else:
+            payload = bytes(shm.buf[:size])
+
+        try:
+            scores = np.asarray(
+                score_pairs(decode_pairs(payload), batch_size),
+                dtype=np.float32,
+            )
+            shm.buf[: scores.nbytes] = scores.tobytes()
+            conn.send_bytes(RESPONSE.pack(0, len(scores)))
+
+        except Exception as e:
+            conn.send_bytes(RESPONSE.pack(1, 0) + str(e).encode("utf-8"))
+
+    shm.close()
+
+
+# ---------------------------------------------------
+# Pool
+# ---------------------------------------------------
+
+class _WorkerHandle:
+
+    def __init__(self, worker_id: int, cores: Optional[List[int]], shm_bytes: int):
+        self.worker_id = worker_id
+        self.cores = cores
+        self.shm_bytes = shm_bytes
+        self.shm = SharedMemory(create=True, size=shm_bytes)
+        self._start()
+
+    def _start(self):
+
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.shm.name, self.cores),
+            name=f"reranker-worker-{self.worker_id}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self):
+
+        try:
+            self.conn.recv_bytes()
+        except EOFError as e:
+            raise RuntimeError(f"Worker process {self.worker_id} failed to start") from e
+
+    def score(self, pairs: Sequence[Tuple[str, str]], batch_size: int) -> List[float]:
+
+        payload = encode_pairs(pairs)
+
+        try:
+            if len(payload) <= self.shm.size:
+                self.shm.buf[: len(payload)] = payload
+                self.conn.send_bytes(REQUEST.pack(len(payload), batch_size, 0))
+            else:
+                # Oversized batch: ship the payload through the pipe as raw bytes
+                self.conn.send_bytes(REQUEST.pack(len(payload), batch_size, 1) + payload)
+
+            reply = self.conn.recv_bytes()
+
+        except (EOFError, OSError) as e:
+            logger.error(f"Worker process {self.worker_id} died, restarting")
+            self.restart()
+            raise RuntimeError(f"Worker process {self.worker_id} died") from e
+
+        status, count = RESPONSE.unpack_from(reply)
+
+        if status != 0:
+            raise RuntimeError(reply[RESPONSE.size:].decode("utf-8"))
+
+        return np.ndarray((count,), dtype=np.float32, buffer=self.shm.buf).tolist()
+
+    def _stop(self, timeout: float):
+        """Wait for the process to exit after its pipe closed; terminate, then kill, if it hangs."""
+
+        self.process.join(timeout=timeout)
+
+        if self.process.is_alive():
+            logger.warning(f"Worker process {self.worker_id} did not exit, terminating")
+            self.process.terminate()
+            self.process.join(timeout=1)
+
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+    def _release_shm(self):
+
+        self.shm.close()
+        self.shm.unlink()
+
+    def restart(self):
+
+        self.conn.close()
+        self._stop(timeout=1)
+
+        # Fresh segment: the old process may have died mid-write
+        self._release_shm()
+        self.shm = SharedMemory(create=True, size=self.shm_bytes)
+
+        self._start()
+        self.wait_ready()
+
+    def close(self):
+
+        self.conn.close()
+        self._stop(timeout=5)
+        self._release_shm()
+
+
+def split_cores(processes: int) -> List[Optional[List[int]]]:
+    """Contiguous, disjoint core sets, one per process (None = no pinning).
+
+    Cores that don't divide evenly go one each to the first processes.
+    """
+
+    if not reranker_app_settings.WORKER_PIN_CORES or not hasattr(os, "sched_getaffinity"):
+        return [None] * processes
+
+    cores = sorted(os.sched_getaffinity(0))
+
+    if len(cores) < processes:
+        return [None] * processes
+
+    per_process, leftover = divmod(len(cores), processes)
+
+    core_sets = []
+    start = 0
+
+    for i in range(processes):
+        size = per_process + (1 if i < leftover else 0)
+        core_sets.append(cores[start: start + size])
+        start += size
+
+    return core_sets
+
+
+class WorkerPool:
+    """N inference processes, each with its own ONNX session pinned to its own cores.
+
+    `score_pairs` blocks until a process is free, so call it from a thread
+    executor with one slot per process.
+    """
+
+    def __init__(self, processes: int):
+
+        self._handles = [
+            _WorkerHandle(i, cores, reranker_app_settings.WORKER_SHM_BYTES)
+            for i, cores in enumerate(split_cores(processes))
+        ]
+
+        for handle in self._handles:
+            handle.wait_ready()
+            logger.info(
+                f"Worker process {handle.worker_id} ready "
+                f"| pid={handle.process.pid} | cores={handle.cores}"
+            )
+
+        self._idle: "queue.Queue[_WorkerHandle]" = queue.Queue()
+
+        for handle in self._handles:
+            self._idle.put(handle)
+
+    def score_pairs(self, pairs: List[Tuple[str, str]], batch_size: int) -> List[float]:
+
+        handle = self._idle.get()
+
+        try:
+            return handle.score(pairs, batch_size)
+        finally:
+            self._idle.put(handle)
+
+    def close(self):
+
+        for handle in self._handles:
+            handle.close()
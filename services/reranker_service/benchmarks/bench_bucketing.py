@@ -0,0 +1,73 @@
+"""Padding ratio and pairs/sec: arrival order vs. length-bucketed.
+
+Padding is measured with the model's real tokenizer, not the estimate
+used by the batch builder.
+
+    cd services/reranker_service
+    python -m benchmarks.bench_bucketing --pairs 512 --repeats 3
+"""
+import argparse
+import random
+import time
+
+from app.batching import estimate_pair_tokens, length_order, padding_ratio
+from app.config import reranker_app_settings
+from app.model import init_model, load_model, score_pairs
+from benchmarks.bench_workers import WORDS, make_document
+
+
+def make_pairs(count: int, seed: int):
+
+    rng = random.Random(seed)
+    queries = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(16)]
+
+    return [(rng.choice(queries), make_document(rng)) for _ in range(count)]
+
+
+def measure(pairs, batch_size: int, repeats: int) -> float:
+
+    start = time.perf_counter()
+
+    for _ in range(repeats):
+        score_pairs(pairs, batch_size)
+
+    return len(pairs) * repeats / (time.perf_counter() - start)
+
+
+def main(args):
+
+    batch_size = reranker_app_settings.INTERNAL_BATCH_SIZE
+    pairs = make_pairs(args.pairs, args.seed)
+
+    # Separate instance: disabling padding would break batched scoring
+    tokenizer = load_model().model.tokenizer
+    tokenizer.no_padding()
+    true_lengths = [len(enc.ids) for enc in tokenizer.encode_batch(pairs)]
+
+    order = length_order([estimate_pair_tokens(pair) for pair in pairs])
+    bucketed = [pairs[i] for i in order]
+
+    init_model()
+
+    rows = [
+        ("arrival", padding_ratio(true_lengths, batch_size), measure(pairs, batch_size, args.repeats)),
+        ("bucketed", padding_ratio([true_lengths[i] for i in order], batch_size),
+         measure(bucketed, batch_size, args.repeats)),
+    ]
+
+    print()
+    print(f"pairs={args.pairs} | INTERNAL_BATCH_SIZE={batch_size} | repeats={args.repeats}")
+    print(f"{'order':>10} {'padding':>8} {'pairs/s':>10}")
+
+    for name, padding, throughput in rows:
+        print(f"{name:>10} {padding:>8.2%} {throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""Reranker throughput vs. WORKERS.
+
+Drives the real queue + batch workers in-process (no HTTP) so the number
+only reflects batching and inference overlap.
+
+    cd services/reranker_service
+    python -m benchmarks.bench_workers --workers 1 2 4 --requests 200 --docs 50
+
+With --executor process, WORKERS also sets the number of inference
+processes, so the table shows pairs/sec scaling with process count.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app import main
+from app.config import reranker_app_settings
+from app.model import create_backend
+
+
+WORDS = (
+    "revenue income segment cloud advertising operating margin cash equivalents "
+    "liabilities assets shares outstanding fiscal year quarter growth expenses "
+    "research development capital expenditures depreciation tax rate"
+).split()
+
+
+def make_document(rng: random.Random) -> str:
+    # 10-K chunks: mostly prose, some long table rows
+    length = rng.choice([40, 80, 120, 250, 400])
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+async def run(workers: int, requests: int, docs: int, seed: int) -> dict:
+
+    rng = random.Random(seed)
+
+    reranker_app_settings.WORKERS = workers
+    main.backend = create_backend()
+
+    worker_tasks = [
+        asyncio.create_task(main.batch_worker(i)) for i in range(workers)
+    ]
+
+    loop = asyncio.get_running_loop()
+    futures = []
+
+    start = time.perf_counter()
+
+    for _ in range(requests):
+        future = loop.create_future()
+        await main.queue.put(
+            main.RerankTask(
+                query=" ".join(rng.choice(WORDS) for _ in range(8)),
+                docs=[make_document(rng) for _ in range(docs)],
+                future=future,
+            )
+        )
+        futures.append(future)
+
+    await asyncio.gather(*futures)
+
+    elapsed = time.perf_counter() - start
+
+    for task in worker_tasks:
+        task.cancel()
+
+    await asyncio.gather(*worker_tasks, return_exceptions=True)
+    main.backend.shutdown()
+
+    return {
+        "workers": workers,
+        "seconds": elapsed,
+        "pairs_per_sec": requests * docs / elapsed,
+        "requests_per_sec": requests / elapsed,
+    }
+
+
+async def amain(args):
+
+    results = [
+        await run(w, args.requests, args.docs, args.seed) for w in args.workers
+    ]
+
+    print()
+    print(f"executor={reranker_app_settings.EXECUTOR_TYPE} "
+          f"| requests={args.requests} | docs/request={args.docs}")
+    print(f"{'WORKERS':>8} {'seconds':>10} {'pairs/s':>10} {'req/s':>8}")
+
+    for r in results:
+        print(
+            f"{r['workers']:>8} {r['seconds']:>10.2f} "
+            f"{r['pairs_per_sec']:>10.1f} {r['requests_per_sec']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--docs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--executor", choices=["thread", "process"], default=None)
+
+    args = parser.parse_args()
+
+    if args.executor:
+        reranker_app_settings.EXECUTOR_TYPE = args.executor
+
+    asyncio.run(amain(args))
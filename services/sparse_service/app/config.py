@@ -0,0 +1,27 @@
+from pydantic_settings import BaseSettings
+
+class AppSettings(BaseSettings):
+
+    # Model
+    MODEL_NAME: str = "prithivida/Splade_PP_en_v1"
+
+    # Configurable batching parameters (tune for production)
+    QUEUE_SIZE: int = 2048
+    MAX_BATCH_REQUESTS: int = 64
+    INTERNAL_BATCH_SIZE: int = 32
+    MAX_BATCH_TEXTS: int = 256 # texts per inference batch across all requests
+    BATCH_TIMEOUT: float = 0.005 # max wait for more requests once one is queued; queries are short, keep this in the low ms
+    MAX_REQUEST_TEXTS: int = 1024 # texts per /embed call (ingest sends documents in chunks of this size)
+    LENGTH_BUCKETING: bool = True # sort texts by length so each INTERNAL_BATCH_SIZE chunk pads less
+
+    # Deadlines: requests carry `timeout` (body) or X-Request-Timeout (header), in seconds
+    DEFAULT_REQUEST_TIMEOUT: float = 30.0 # 0 = no deadline
+
+    # 1 worker per GPU | 2–4 workers per CPU
+    WORKERS: int = 2
+
+    # ONNX Runtime threads per inference call (0 = let ORT decide)
+    # With WORKERS batches in flight on C cores, threads ≈ C / WORKERS avoids oversubscription.
+    ORT_THREADS: int = 0
+
+sparse_app_settings = AppSettings()
@@ -0,0 +1,407 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Literal, Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from pydantic import BaseModel
+
+from app.config import sparse_app_settings
+from app.model import InferenceBackend, SparseVector, create_backend
+
+
+# ---------------------------------------------------
+# Logging
+# ---------------------------------------------------
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("sparse")
+
+app = FastAPI()
+
+
+# ---------------------------------------------------
+# Inference Backend
+# ---------------------------------------------------
+
+backend: Optional[InferenceBackend] = None
+
+
+# ---------------------------------------------------
+# Queue
+# ---------------------------------------------------
+
+Kind = Literal["query", "document"]
+
+
+class EncodeTask:
+
+    def __init__(
+        self,
+        texts: List[str],
+        future: asyncio.Future,
+        deadline: Optional[float] = None,
+        kind: Kind = "query",
+    ):
+        self.texts = texts
+        self.future = future
+        self.deadline = deadline  # time.monotonic() value, None = no deadline
+        self.kind = kind
+
+    def is_stale(self, now: float) -> bool:
+        """Cancelled by the handler (timed out) or past its deadline."""
+        return self.future.done() or (self.deadline is not None and now >= self.deadline)
+
+
+# Queries and ingest chunks queue separately, so an ingest's backlog never delays a query
+queues: Dict[Kind, asyncio.Queue[EncodeTask]] = {
+    "query": asyncio.Queue(maxsize=sparse_app_settings.QUEUE_SIZE),
+    "document": asyncio.Queue(maxsize=sparse_app_settings.QUEUE_SIZE),
+}
+
+# Set on every enqueue; the collecting worker waits on it when both queues are empty
+arrived = asyncio.Event()
+
+collect_lock = asyncio.Lock()
+
+batch_stats = {
+    "texts": 0,
+    "deduplicated_texts": 0,
+    "dropped_tasks": 0,
+}
+
+
+# ---------------------------------------------------
+# Batch Worker
+# ---------------------------------------------------
+
+def enqueue(task: EncodeTask):
+    """Raises asyncio.QueueFull when the task's queue is full."""
+
+    queues[task.kind].put_nowait(task)
+    arrived.set()
+
+
+def next_task_nowait() -> EncodeTask:
+    """Queries first. Raises asyncio.QueueEmpty when both queues are empty."""
+
+    try:
+        return queues["query"].get_nowait()
+    except asyncio.QueueEmpty:
+        return queues["document"].get_nowait()
+
+
+async def next_task(timeout: Optional[float] = None) -> EncodeTask:
+    """Raises asyncio.TimeoutError if nothing arrives within `timeout`."""
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while True:
+
+        try:
+            return next_task_nowait()
+        except asyncio.QueueEmpty:
+            pass
+
+        # Safe to clear: only the worker holding collect_lock waits here
+        arrived.clear()
+        remaining = None if deadline is None else deadline - time.monotonic()
+
+        if remaining is not None and remaining <= 0:
+            raise asyncio.TimeoutError
+
+        await asyncio.wait_for(arrived.wait(), timeout=remaining)
+
+
+def task_done(task: EncodeTask):
+    queues[task.kind].task_done()
+
+
+def drop_if_stale(task: EncodeTask) -> bool:
+
+    if not task.is_stale(time.monotonic()):
+        return False
+
+    if not task.future.done():
+        task.future.cancel()
+
+    batch_stats["dropped_tasks"] += 1
+    task_done(task)
+
+    return True
+
+
+async def batch_worker(worker_id: int):
+
+    while True:
+
+        tasks: List[EncodeTask] = []
+        text_count = 0
+
+        # One worker collects at a time: an idle worker waiting for a task
+        # would otherwise take the arrivals this one is waiting for
+        async with collect_lock:
+
+            # ---------------------------------------------------
+            # Get first task
+            # ---------------------------------------------------
+
+            first = await next_task()
+
+            if drop_if_stale(first):
+                continue
+
+            tasks.append(first)
+            text_count += len(first.texts)
+
+            # ---------------------------------------------------
+            # Fill batch (short window: concurrent queries arrive within a few ms)
+            # ---------------------------------------------------
+
+            window_end = time.monotonic() + sparse_app_settings.BATCH_TIMEOUT
+
+            while len(tasks) < sparse_app_settings.MAX_BATCH_REQUESTS:
+
+                try:
+                    task = next_task_nowait()
+
+                except asyncio.QueueEmpty:
+
+                    remaining = window_end - time.monotonic()
+
+                    if remaining <= 0:
+                        break
+
+                    try:
+                        task = await next_task(timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+                if drop_if_stale(task):
+                    continue
+
+                # enforce text limit
+                if text_count + len(task.texts) > sparse_app_settings.MAX_BATCH_TEXTS:
+
+                    try:
+                        enqueue(task)
+                    except asyncio.QueueFull:
+                        logger.warning("Queue full while reinserting task")
+
+                    break
+
+                tasks.append(task)
+                text_count += len(task.texts)
+
+        # ---------------------------------------------------
+        # Deduplicate identical texts across tasks
+        # ---------------------------------------------------
+
+        unique_index: Dict[str, int] = {}
+        slots = [
+            [unique_index.setdefault(text, len(unique_index)) for text in task.texts]
+            for task in tasks
+        ]
+        unique_texts = list(unique_index)
+
+        batch_stats["texts"] += text_count
+        batch_stats["deduplicated_texts"] += text_count - len(unique_texts)
+
+        # Similar lengths per internal batch -> less padding
+        if sparse_app_settings.LENGTH_BUCKETING:
+            order = sorted(range(len(unique_texts)), key=lambda i: len(unique_texts[i]))
+        else:
+            order = list(range(len(unique_texts)))
+
+        logger.info(
+            f"Worker {worker_id} processing batch "
+            f"{len(tasks)} requests / {text_count} texts ({len(unique_texts)} unique) "
+            f"| queue={queues['query'].qsize()} queries, {queues['document'].qsize()} documents"
+        )
+
+        # ---------------------------------------------------
+        # Inference
+        # ---------------------------------------------------
+
+        start = time.perf_counter()
+
+        try:
+
+            sorted_vectors = await backend.embed(
+                [unique_texts[i] for i in order],
+                sparse_app_settings.INTERNAL_BATCH_SIZE,
+            )
+
+            # Safety check
+            if len(sorted_vectors) != len(unique_texts):
+                raise RuntimeError(
+                    f"Embedding count mismatch: expected {len(unique_texts)}, "
+                    f"got {len(sorted_vectors)}"
+                )
+
+            vectors: List[Optional[SparseVector]] = [None] * len(unique_texts)
+
+            for vector, idx in zip(sorted_vectors, order):
+                vectors[idx] = vector
+
+            for task, task_slots in zip(tasks, slots):
+
+                if not task.future.done():
+                    task.future.set_result([vectors[slot] for slot in task_slots])
+
+                task_done(task)
+
+        except Exception as e:
+
+            logger.exception("Batch inference failure")
+
+            for task in tasks:
+                if not task.future.done():
+                    task.future.set_exception(e)
+
+                task_done(task)
+
+        latency = time.perf_counter() - start
+
+        logger.info(
+            f"Worker {worker_id} batch done | latency={latency:.3f}s "
+            f"| texts/s={len(unique_texts) / latency:.1f}"
+        )
+
+
+# ---------------------------------------------------
+# API
+# ---------------------------------------------------
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    timeout: Optional[float] = None  # seconds; overrides X-Request-Timeout
+    kind: Optional[Kind] = None  # queries are batched ahead of documents; None = query if one text
+
+
+class SparseEmbedding(BaseModel):
+    indices: List[int]
+    values: List[float]
+
+
+class EmbedResponse(BaseModel):
+    embeddings: List[SparseEmbedding]
+
+
+def resolve_deadline(request: EmbedRequest, header_timeout: Optional[float]) -> Optional[float]:
+
+    timeout = request.timeout or header_timeout or sparse_app_settings.DEFAULT_REQUEST_TIMEOUT
+
+    if not timeout:
+        return None
+
+    return time.monotonic() + timeout
+
+
+@app.post("/embed", response_model=EmbedResponse)
+async def embed(
+    request: EmbedRequest,
+    x_request_timeout: Optional[float] = Header(None),
+):
+    """Sparse vectors for `texts`, in order. Queries and document chunks share this endpoint;
+    queries go ahead of any queued documents."""
+
+    if len(request.texts) == 0:
+        return {"embeddings": []}
+
+    if len(request.texts) > sparse_app_settings.MAX_REQUEST_TEXTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {sparse_app_settings.MAX_REQUEST_TEXTS} texts per request",
+        )
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    task = EncodeTask(
+        texts=request.texts,
+        future=future,
+        deadline=resolve_deadline(request, x_request_timeout),
+        kind=request.kind or ("query" if len(request.texts) == 1 else "document"),
+    )
+
+    try:
+        enqueue(task)
+
+    except asyncio.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Sparse encoder overloaded",
+        )
+
+    start = time.perf_counter()
+
+    try:
+        remaining = None if task.deadline is None else task.deadline - time.monotonic()
+        done, _ = await asyncio.wait({future}, timeout=remaining)
+
+        # Not done by the deadline, or cancelled by the batch worker: deadline passed while queued
+        if not done or future.cancelled():
+            raise HTTPException(
+                status_code=504,
+                detail="Sparse encoding deadline exceeded",
+            )
+
+        vectors = future.result()
+
+    finally:
+        # Deadline, client disconnect or shutdown: the batch worker drops the task
+        if not future.done():
+            future.cancel()
+
+    latency = time.perf_counter() - start
+
+    logger.info(
+        f"Request done | texts={len(request.texts)} "
+        f"| latency={latency:.3f}s"
+    )
+
+    return {
+        "embeddings": [
+            {"indices": indices, "values": values} for indices, values in vectors
+        ]
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "batching": batch_stats,
+        "queue": {kind: q.qsize() for kind, q in queues.items()},
+    }
+
+
+# ---------------------------------------------------
+# Startup
+# ---------------------------------------------------
+
+@app.on_event("startup")
+async def startup():
+
+    global backend
+
+    backend = create_backend()
+
+    workers = sparse_app_settings.WORKERS
+
+    logger.info(f"Starting {workers} sparse encoder workers")
+
+    for i in range(workers):
+        asyncio.create_task(batch_worker(i))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+
+    if backend is not None:
+        backend.shutdown()
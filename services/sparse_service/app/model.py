@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import onnxruntime as ort
+from fastembed import SparseTextEmbedding
+
+from app.config import sparse_app_settings
+
+
+logger = logging.getLogger("sparse")
+
+SparseVector = Tuple[List[int], List[float]]
+
+
+# ---------------------------------------------------
+# Execution Providers
+# ---------------------------------------------------
+
+def get_execution_providers():
+
+    available = ort.get_available_providers()
+    preferred = []
+
+    if "CUDAExecutionProvider" in available:
+        preferred.append("CUDAExecutionProvider")
+
+    preferred.append("CPUExecutionProvider")
+
+    return preferred
+
+
+# ---------------------------------------------------
+# Model
+# ---------------------------------------------------
+
+_model: Optional[SparseTextEmbedding] = None
+
+
+def init_model():
+
+    global _model
+
+    if _model is not None:
+        return
+
+    _model = SparseTextEmbedding(
+        model_name=sparse_app_settings.MODEL_NAME,
+        providers=get_execution_providers(),
+        threads=sparse_app_settings.ORT_THREADS or None,
+    )
+
+    # Warmup
+    list(_model.embed(["warmup"]))
+
+    logger.info(f"Model loaded | model={sparse_app_settings.MODEL_NAME}")
+
+
+def embed_texts(texts: List[str], batch_size: int) -> List[SparseVector]:
+
+    return [
+        (emb.indices.tolist(), emb.values.tolist())
+        for emb in _model.embed(texts, batch_size=batch_size)
+    ]
+
+
+# ---------------------------------------------------
+# Inference Backend
+# ---------------------------------------------------
+
+class InferenceBackend:
+    """Runs blocking inference off the event loop, one executor slot per batch worker."""
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+
+    async def embed(self, texts: List[str], batch_size: int) -> List[SparseVector]:
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, embed_texts, texts, batch_size)
+
+    def shutdown(self):
+
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_backend() -> InferenceBackend:
+
+    init_model()
+
+    return InferenceBackend(
+        executor=ThreadPoolExecutor(
+            max_workers=sparse_app_settings.WORKERS,
+            thread_name_prefix="sparse-inference",
+        ),
+    )
@@ -0,0 +1,53 @@
+import pytest
+
+from app.core.observability.metrics import BUDGET_DEGRADATIONS
+from app.rag import budget as budget_module
+from app.rag.budget import LatencyBudget
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(budget_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def degradation_count(kind: str) -> float:
+    return BUDGET_DEGRADATIONS.labels(kind=kind)._value.get()
+
+
+@pytest.mark.parametrize("seconds", [None, 0, -1])
+def test_unbounded_budget(seconds):
+    budget = LatencyBudget.start(seconds)
+
+    assert not budget.bounded
+    assert budget.remaining(reserve=5) is None
+
+
+def test_remaining_holds_back_reserve(clock):
+    budget = LatencyBudget(2.0, started=clock[0])
+    clock[0] += 0.5
+
+    assert budget.bounded
+    assert budget.remaining() == pytest.approx(1.5)
+    assert budget.remaining(reserve=1.0) == pytest.approx(0.5)
+
+    clock[0] += 2
+    assert budget.remaining() == pytest.approx(-0.5)
+
+
+def test_degrade_records_and_counts_by_kind(clock):
+    before = degradation_count("rerank_skipped"), degradation_count("generation_capped")
+    budget = LatencyBudget(1.0, trace_id="t", started=clock[0])
+
+    budget.degrade("rerank_skipped", rerank_budget_seconds=0.01)
+    budget.degrade("generation_capped", max_tokens=64)
+
+    assert budget.degradations == ["rerank_skipped", "generation_capped"]
+    assert degradation_count("rerank_skipped") == before[0] + 1
+    assert degradation_count("generation_capped") == before[1] + 1
+    assert budget.summary() == {
+        "seconds": 1.0,
+        "remaining_seconds": 1.0,
+        "degradations": ["rerank_skipped", "generation_capped"],
+    }
@@ -0,0 +1,107 @@
+import asyncio
+from typing import List
+
+import pytest
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from app.rag.embedding_providers.dense.batching import (
+    AsyncMicroBatcher,
+    MicroBatchingEmbedding,
+    query_modes_match,
+)
+
+
+class FakeEmbedding(BaseEmbedding):
+    """Records every call; a query vector is tagged 1.0, a text vector 0.0."""
+
+    _calls: list = PrivateAttr(default_factory=list)
+    _same_modes: bool = PrivateAttr(default=True)
+
+    def __init__(self, same_modes: bool = True):
+        super().__init__(model_name="fake", embed_batch_size=8)
+        self._same_modes = same_modes
+
+    @property
+    def query_modes_match(self) -> bool:
+        return self._same_modes
+
+    def _vector(self, text: str, query: bool) -> list[float]:
+        return [float(len(text)), 1.0 if query and not self._same_modes else 0.0]
+
+    def _get_query_embedding(self, query: str):
+        self._calls.append(("query", [query]))
+        return self._vector(query, query=True)
+
+    async def _aget_query_embedding(self, query: str):
+        return self._get_query_embedding(query)
+
+    async def _aget_query_embeddings(self, queries: List[str]):
+        self._calls.append(("queries", queries))
+        return [self._vector(q, query=True) for q in queries]
+
+    def _get_text_embedding(self, text: str):
+        self._calls.append(("text", [text]))
+        return self._vector(text, query=False)
+
+    async def _aget_text_embeddings(self, texts: List[str]):
+        self._calls.append(("texts", texts))
+        return [self._vector(t, query=False) for t in texts]
+
+
+async def test_batcher_flushes_at_max_batch_and_after_window():
+    calls = []
+
+    async def embed_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    batcher = AsyncMicroBatcher(embed_batch, max_batch=2, window=0.01)
+    results = await asyncio.gather(*(batcher.submit(t) for t in ("a", "bb", "ccc")))
+
+    assert results == [[1.0], [2.0], [3.0]]
+    assert calls == [["a", "bb"], ["ccc"]]
+
+
+async def test_batcher_fails_every_caller_in_the_batch():
+
+    async def embed_batch(texts):
+        return []  # count mismatch
+
+    batcher = AsyncMicroBatcher(embed_batch, max_batch=8, window=0.01)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+async def test_queries_share_the_text_batch_when_modes_match():
+    inner = FakeEmbedding(same_modes=True)
+    model = MicroBatchingEmbedding(inner, window=0.01)
+
+    query, text = await asyncio.gather(
+        model.aget_query_embedding("what"), model.aget_text_embedding("what")
+    )
+
+    assert query == text
+    assert inner._calls == [("texts", ["what", "what"])]
+
+
+async def test_queries_get_their_own_batch_when_modes_differ():
+    inner = FakeEmbedding(same_modes=False)
+    model = MicroBatchingEmbedding(inner, window=0.01)
+
+    results = await asyncio.gather(
+        model.aget_query_embedding("q1"),
+        model.aget_query_embedding("q2"),
+        model.aget_text_embedding("t1"),
+    )
+
+    assert [r[1] for r in results] == [1.0, 1.0, 0.0]
+    assert sorted(inner._calls) == [("queries", ["q1", "q2"]), ("texts", ["t1"])]
+
+
+@pytest.mark.parametrize("same_modes", [True, False])
+def test_query_modes_match_reads_the_wrapped_model(same_modes):
+    model = MicroBatchingEmbedding(FakeEmbedding(same_modes=same_modes), window=0.01)
+
+    assert query_modes_match(model) is same_modes
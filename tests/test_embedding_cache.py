@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.rag.embedding_cache import KEY_BYTES, DenseCache, SparseCache
+
+
+def test_dense_put_and_get(tmp_path):
+    cache = DenseCache(tmp_path, dim=2)
+    cache.put(["a", "b", "a"], [[1.0, 2.0], [3.0, 4.0], [9.0, 9.0]])  # first copy of "a" wins
+
+    assert cache.get(["b", "missing", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert len(cache) == 2
+
+
+def test_dense_rejects_another_dim(tmp_path):
+    with pytest.raises(ValueError):
+        DenseCache(tmp_path, dim=2).put(["a"], [[1.0, 2.0, 3.0]])
+
+
+def test_dense_reopen_and_other_writers(tmp_path):
+    writer, reader = DenseCache(tmp_path, dim=2), DenseCache(tmp_path, dim=2)
+    writer.put(["a"], [[1.0, 2.0]])
+
+    assert reader.get(["a"]) == [[1.0, 2.0]]  # picks up keys appended since it opened
+    reader.put(["b"], [[3.0, 4.0]])
+    assert DenseCache(tmp_path, dim=2).get(["a", "b"]) == [[1.0, 2.0], [3.0, 4.0]]
+
+
+def test_dense_crash_before_keys_leaves_no_entry(tmp_path):
+    cache = DenseCache(tmp_path, dim=2)
+    cache.put(["a"], [[1.0, 2.0]])
+    # Crash mid-put: vectors and half a key written, the key never completed
+    with open(tmp_path / "dense.f32", "ab") as f:
+        f.write(np.asarray([[7.0, 7.0]], dtype=np.float32).tobytes())
+    with open(tmp_path / "keys", "ab") as f:
+        f.write(b"\x00" * (KEY_BYTES // 2))
+
+    reopened = DenseCache(tmp_path, dim=2)
+    assert len(reopened) == 1
+    assert reopened.get(["a", "b"]) == [[1.0, 2.0], None]
+
+
+def test_sparse_put_and_get_after_reopen(tmp_path):
+    cache = SparseCache(tmp_path)
+    cache.put(["a", "empty", "b"], [[1, 5], [], [7]], [[0.5, 0.25], [], [1.0]])
+
+    reopened = SparseCache(tmp_path)
+    assert reopened.get(["b", "empty", "a", "missing"]) == [
+        ([7], [1.0]),
+        ([], []),
+        ([1, 5], [0.5, 0.25]),
+        None,
+    ]
+
+
+def test_sparse_crash_before_offsets_is_overwritten(tmp_path):
+    cache = SparseCache(tmp_path)
+    cache.put(["a"], [[1, 2]], [[0.5, 0.5]])
+    # Crash mid-put: term arrays written, offsets and keys not
+    with open(tmp_path / "indices", "ab") as f:
+        f.write(np.asarray([99, 99, 99], dtype=np.uint32).tobytes())
+    with open(tmp_path / "values", "ab") as f:
+        f.write(np.asarray([9.0, 9.0, 9.0], dtype=np.float32).tobytes())
+
+    reopened = SparseCache(tmp_path)
+    assert reopened.get(["b"]) == [None]
+    reopened.put(["b"], [[3]], [[0.75]])
+
+    assert SparseCache(tmp_path).get(["a", "b"]) == [([1, 2], [0.5, 0.5]), ([3], [0.75])]
+
+
+def test_put_after_a_partial_key_stays_aligned(tmp_path):
+    cache = DenseCache(tmp_path, dim=2)
+    cache.put(["a"], [[1.0, 2.0]])
+    with open(tmp_path / "keys", "ab") as f:
+        f.write(b"\x00" * (KEY_BYTES // 2))
+
+    cache.put(["b"], [[3.0, 4.0]])
+
+    assert DenseCache(tmp_path, dim=2).get(["a", "b"]) == [[1.0, 2.0], [3.0, 4.0]]
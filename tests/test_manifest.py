@@ -0,0 +1,79 @@
+import asyncio
+
+from app.rag.manifest import IngestManifest
+
+
+def test_removed_files_are_scoped_to_their_root(tmp_path):
+    manifest = IngestManifest(tmp_path / "c.json")
+    manifest.record("a.pdf", "sha-a", ["p1", "p2"], root="/data/docs")
+    manifest.record("b.pdf", "sha-b", ["p3"], root="/data/docs")
+    manifest.record("upload.pdf", "sha-u", ["p4"], root="/tmp/ingest_x")
+
+    assert manifest.removed("/data/docs", seen={"a.pdf"}) == ["b.pdf"]
+    assert manifest.removed("/data/other", seen=set()) == []
+
+
+def test_claim_moves_unchanged_files_to_the_scanned_root(tmp_path):
+    manifest = IngestManifest(tmp_path / "c.json")
+    manifest.files["old.pdf"] = {"sha256": "s", "chunks": ["p1"], "fingerprint": manifest.fingerprint}
+
+    manifest.claim("/data/docs", {"old.pdf", "never-ingested.pdf"})
+
+    assert manifest.files["old.pdf"]["root"] == "/data/docs"
+    assert "never-ingested.pdf" not in manifest.files
+    assert manifest.removed("/data/docs", seen=set()) == ["old.pdf"]
+
+
+def test_forget_drops_the_entry_on_save(tmp_path):
+    manifest = IngestManifest(tmp_path / "c.json")
+    manifest.record("a.pdf", "sha-a", ["p1"], root="/r")
+    manifest.record("b.pdf", "sha-b", ["p2"], root="/r")
+
+    manifest.forget("b.pdf")
+    manifest.save()
+
+    assert set(IngestManifest.load(tmp_path / "c.json").files) == {"a.pdf"}
+
+
+async def test_commit_merges_what_another_writer_saved(tmp_path):
+    path = tmp_path / "c.json"
+    first, second = IngestManifest.load(path), IngestManifest.load(path)
+
+    async with first.committing() as manifest:
+        manifest.record("a.pdf", "sha-a", ["p1"], root="/r")
+    # `second` loaded before that commit; its own commit must not drop a.pdf
+    async with second.committing() as manifest:
+        manifest.record("b.pdf", "sha-b", ["p2"], root="/r")
+
+    assert set(IngestManifest.load(path).files) == {"a.pdf", "b.pdf"}
+
+
+async def test_commit_holds_the_lock_until_saved(tmp_path):
+    path = tmp_path / "c.json"
+    first, second = IngestManifest.load(path), IngestManifest.load(path)
+    order = []
+
+    async def commit(manifest, key):
+        async with manifest.committing():
+            order.append(f"{key} in")
+            manifest.record(key, "sha", [], root="/r")
+            await asyncio.sleep(0.05)
+            order.append(f"{key} out")
+
+    await asyncio.gather(commit(first, "a.pdf"), commit(second, "b.pdf"))
+
+    assert order in (
+        ["a.pdf in", "a.pdf out", "b.pdf in", "b.pdf out"],
+        ["b.pdf in", "b.pdf out", "a.pdf in", "a.pdf out"],
+    )
+    assert set(IngestManifest.load(path).files) == {"a.pdf", "b.pdf"}
+
+
+def test_other_settings_make_nothing_reusable(tmp_path):
+    manifest = IngestManifest(tmp_path / "c.json")
+    manifest.record("a.pdf", "sha-a", ["p1"], root="/r")
+    manifest.files["a.pdf"]["fingerprint"] = "other-settings"
+
+    assert not manifest.unchanged("a.pdf", "sha-a")
+    assert manifest.indexed_chunks("a.pdf") == set()
+    assert manifest.previous_chunks("a.pdf") == {"p1"}  # still stale-point candidates
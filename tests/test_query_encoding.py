@@ -0,0 +1,104 @@
+import asyncio
+from typing import List
+
+import pytest
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import PrivateAttr
+
+from app.rag.query_encoding import QueryEncoding, cache_key_embedding, dense_query_embedding
+
+
+class CountingEmbedding(BaseEmbedding):
+    """One call per embedding; `delay` keeps calls in flight long enough to overlap."""
+
+    _calls: list = PrivateAttr(default_factory=list)
+    _same_modes: bool = PrivateAttr(default=True)
+    _delay: float = PrivateAttr(default=0.0)
+
+    def __init__(self, same_modes: bool = True, delay: float = 0.0):
+        super().__init__(model_name="counting")
+        self._same_modes = same_modes
+        self._delay = delay
+
+    @property
+    def query_modes_match(self) -> bool:
+        return self._same_modes
+
+    async def _embed(self, mode: str, text: str):
+        self._calls.append((mode, text))
+        await asyncio.sleep(self._delay)
+        return [float(len(text))]
+
+    def _get_query_embedding(self, query: str):
+        raise NotImplementedError
+
+    def _get_text_embedding(self, text: str):
+        raise NotImplementedError
+
+    async def _aget_query_embedding(self, query: str):
+        return await self._embed("query", query)
+
+    async def _aget_text_embedding(self, text: str):
+        return await self._embed("text", text)
+
+    async def _aget_text_embeddings(self, texts: List[str]):
+        return [await self._embed("text", t) for t in texts]
+
+
+@pytest.fixture
+def embed_model(request, monkeypatch):
+    model = CountingEmbedding(**getattr(request, "param", {}))
+    monkeypatch.setattr(Settings, "_embed_model", model)
+    return model
+
+
+async def test_normalized_query_shares_one_vector(embed_model):
+    encoding = QueryEncoding(query="revenue in 2024")
+
+    key, dense = await asyncio.gather(cache_key_embedding(encoding), dense_query_embedding(encoding))
+
+    assert key == dense
+    assert embed_model._calls == [("text", "revenue in 2024")]
+
+
+async def test_query_that_normalizes_differently_embeds_twice(embed_model):
+    encoding = QueryEncoding(query="Revenue in 2024?")
+
+    await cache_key_embedding(encoding)
+    await dense_query_embedding(encoding)
+    await dense_query_embedding(encoding)
+
+    assert embed_model._calls == [("text", "revenue in 2024"), ("text", "Revenue in 2024?")]
+
+
+@pytest.mark.parametrize("embed_model", [{"same_modes": False}], indirect=True)
+async def test_query_mode_kept_apart_when_modes_differ(embed_model):
+    encoding = QueryEncoding(query="revenue in 2024")
+
+    await asyncio.gather(cache_key_embedding(encoding), dense_query_embedding(encoding))
+
+    assert sorted(embed_model._calls) == [("query", "revenue in 2024"), ("text", "revenue in 2024")]
+
+
+@pytest.mark.parametrize("embed_model", [{"delay": 0.05}], indirect=True)
+async def test_cancelled_waiter_leaves_the_shared_call_running(embed_model):
+    encoding = QueryEncoding(query="revenue")
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(cache_key_embedding(encoding), timeout=0.01)
+
+    assert await dense_query_embedding(encoding) == [7.0]
+    assert embed_model._calls == [("text", "revenue")]
+
+
+@pytest.mark.parametrize("embed_model", [{"delay": 10}], indirect=True)
+async def test_cancel_stops_calls_in_flight(embed_model):
+    encoding = QueryEncoding(query="revenue")
+    waiter = asyncio.create_task(dense_query_embedding(encoding))
+    await asyncio.sleep(0)
+
+    encoding.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
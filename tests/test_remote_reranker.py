@@ -0,0 +1,203 @@
+import asyncio
+import struct
+
+import httpx
+import pytest
+from llama_index.core.schema import TextNode
+
+from app.config import app_settings
+from app.rag.reranker_providers import balancer
+from app.rag.reranker_providers.balancer import CircuitBreaker, LatencyTracker
+from app.rag.reranker_providers.remote_reranker import RemoteReranker
+from app.rag.reranker_providers.wire import encode_results
+
+
+# ------------------------
+# Circuit breaker / latency
+# ------------------------
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(balancer.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.available()
+
+
+def test_breaker_half_open_allows_one_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=10)
+    breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # trial already in flight
+
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_breaker_trial_outcome(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=10)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()  # failed trial: open for another cooldown
+    assert breaker.state == "open"
+
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_latency_percentile():
+    tracker = LatencyTracker(window=4)
+    assert tracker.percentile(0.5) is None
+
+    for seconds in (5.0, 1.0, 2.0, 3.0, 4.0):  # 5.0 falls out of the window
+        tracker.record(seconds)
+
+    assert tracker.percentile(0.5) == 3.0
+    assert tracker.percentile(0.99) == 4.0
+
+
+# ------------------------
+# Remote reranker
+# ------------------------
+
+def make_reranker(monkeypatch, handler, urls="http://a,http://b") -> RemoteReranker:
+    monkeypatch.setattr(app_settings, "RERANKER_URLS", urls)
+    monkeypatch.setattr(app_settings, "RERANKER_WIRE_FORMAT", "binary")
+    monkeypatch.setattr(app_settings, "RERANKER_SEND_CHUNK_IDS", False)
+    reranker = RemoteReranker()
+    for replica in reranker.replicas:
+        replica.client = httpx.AsyncClient(
+            base_url=replica.url, transport=httpx.MockTransport(handler)
+        )
+    return reranker
+
+
+def binary_response(results) -> httpx.Response:
+    return httpx.Response(
+        200, content=encode_results(results), headers={"content-type": "application/x-rerank"}
+    )
+
+
+NODES = [TextNode(id_=f"n{i}", text=f"text {i}") for i in range(3)]
+
+
+async def test_rerank_orders_nodes_by_service_results(monkeypatch):
+    reranker = make_reranker(monkeypatch, lambda request: binary_response([(2, 0.9), (0, 0.1)]))
+
+    assert await reranker.rerank("q", NODES, top_n=2) == [NODES[2], NODES[0]]
+
+
+@pytest.mark.parametrize(
+    "handler",
+    [
+        lambda request: httpx.Response(503),
+        lambda request: (_ for _ in ()).throw(httpx.ConnectError("refused", request=request)),
+    ],
+    ids=["5xx", "transport"],
+)
+async def test_rerank_degrades_to_retrieval_order_when_unavailable(monkeypatch, handler):
+    reranker = make_reranker(monkeypatch, handler, urls="http://a")
+
+    assert await reranker.rerank("q", NODES, top_n=2) == NODES[:2]
+
+
+async def test_rerank_degrades_with_every_replica_tripped(monkeypatch):
+    reranker = make_reranker(monkeypatch, lambda request: binary_response([]), urls="http://a")
+    reranker.replicas[0].breaker.opened_at = float("inf")
+
+    assert await reranker.rerank("q", NODES, top_n=1) == NODES[:1]
+
+
+@pytest.mark.parametrize(
+    "handler, error",
+    [
+        (lambda request: httpx.Response(400), httpx.HTTPStatusError),
+        (
+            lambda request: httpx.Response(
+                200, content=b"\x05", headers={"content-type": "application/x-rerank"}
+            ),
+            struct.error,
+        ),
+    ],
+    ids=["4xx", "undecodable"],
+)
+async def test_rerank_raises_errors_that_are_not_unavailability(monkeypatch, handler, error):
+    reranker = make_reranker(monkeypatch, handler, urls="http://a")
+
+    with pytest.raises(error):
+        await reranker.rerank("q", NODES, top_n=2)
+
+
+def slow_then_fast(calls: list, hangs: list):
+
+    async def handler(request):
+        calls.append(request.url.host)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                hangs.append("cancelled")
+                raise
+        return binary_response([(1, 0.5)])
+
+    return handler
+
+
+async def test_hedge_races_a_second_replica(monkeypatch):
+    calls, hangs = [], []
+    reranker = make_reranker(monkeypatch, slow_then_fast(calls, hangs))
+    reranker._hedge_delay = lambda: 0.01
+
+    assert await reranker.rerank("q", NODES, top_n=1) == [NODES[1]]
+    await asyncio.sleep(0)
+
+    assert len(set(calls)) == 2  # one request per replica
+    assert hangs == ["cancelled"]
+    assert all(replica.outstanding == 0 for replica in reranker.replicas)
+
+
+async def test_cancelled_caller_cancels_pending_attempts(monkeypatch):
+    calls, hangs = [], []
+    reranker = make_reranker(monkeypatch, slow_then_fast(calls, hangs), urls="http://a")
+    reranker._hedge_delay = lambda: 5.0
+
+    task = asyncio.create_task(reranker.rerank("q", NODES, top_n=1))
+    while not calls:
+        await asyncio.sleep(0.001)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+
+    assert hangs == ["cancelled"]
+    assert reranker.replicas[0].outstanding == 0
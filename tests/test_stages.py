@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.rag.stages import Stage, run_stages
+
+
+async def test_items_flow_through_every_stage():
+    out = []
+
+    async def split(text):
+        return text.split()
+
+    async def collect(word):
+        out.append(word)
+
+    stats = await run_stages(
+        ["a b", "c", "d e f"],
+        [Stage("split", split, workers=2), Stage("collect", collect)],
+        queue_size=2,
+    )
+
+    assert sorted(out) == list("abcdef")
+    assert stats["split"].items_in == 3
+    assert stats["split"].items_out == 6
+    assert stats["collect"].items_in == 6
+    assert stats["collect"].finished is not None
+
+
+async def test_batched_stage_regroups_its_inputs():
+    batches = []
+
+    async def pages(n):
+        return [list(range(n))]
+
+    async def embed(batch):
+        batches.append(batch)
+
+    await run_stages([3, 4], [Stage("pages", pages), Stage("embed", embed, batch_size=3)], queue_size=1)
+
+    assert batches == [[0, 1, 2], [0, 1, 2], [3]]  # the remainder flushes at the end
+
+
+async def test_first_error_propagates_and_cancels_the_other_workers():
+    cancelled = []
+
+    async def fail(item):
+        if item == 2:
+            raise ValueError("bad item")
+        return [item]
+
+    async def hang(item):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(item)
+            raise
+
+    with pytest.raises(ValueError, match="bad item"):  # the error itself, not an ExceptionGroup
+        await asyncio.wait_for(
+            run_stages(range(5), [Stage("fail", fail), Stage("hang", hang)], queue_size=1),
+            timeout=2,
+        )
+
+    assert cancelled == [0]
+
+
+async def test_bounded_queues_hold_back_the_source():
+    pulled = []
+    release = asyncio.Event()
+
+    def source():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    async def slow(item):
+        await release.wait()
+
+    run = asyncio.create_task(run_stages(source(), [Stage("slow", slow)], queue_size=2))
+    await asyncio.sleep(0.05)
+
+    # One item in the worker, two queued, one waiting in put()
+    assert len(pulled) == 4
+
+    release.set()
+    stats = await run
+    assert len(pulled) == 100
+    assert stats["slow"].items_in == 100
@@ -0,0 +1,59 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app.rag.reranker_providers import wire
+
+
+def _load_service_wire():
+    # The service is its own `app` package, so load its codec by path
+    path = Path(__file__).parents[1] / "services" / "reranker_service" / "app" / "wire.py"
+    spec = importlib.util.spec_from_file_location("reranker_service_wire", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+service_wire = _load_service_wire()
+
+
+@pytest.mark.parametrize(
+    "documents, document_ids",
+    [
+        (["alpha", "beta é"], None),
+        (None, ["c1", "c2"]),
+        (["alpha", "beta"], ["c1", "c2"]),
+        ([], None),
+    ],
+)
+def test_request_round_trip(documents, document_ids):
+    payload = wire.encode_request("what?", documents, 3, document_ids=document_ids)
+
+    assert service_wire.decode_request(payload) == ("what?", documents or [], 3, document_ids)
+
+
+def test_empty_document_ids_are_sent_as_no_ids():
+    payload = wire.encode_request("q", ["alpha", "beta"], 2, document_ids=[])
+
+    assert service_wire.decode_request(payload) == ("q", ["alpha", "beta"], 2, None)
+    decoded = service_wire.decode_request(service_wire.decompress(wire.compress(payload)))
+    assert decoded[1] == ["alpha", "beta"]
+
+
+def test_mismatched_ids_and_documents_are_rejected():
+    with pytest.raises(ValueError):
+        wire.encode_request("q", ["alpha", "beta"], 2, document_ids=["c1"])
+
+
+def test_truncated_request_is_rejected():
+    payload = wire.encode_request("q", ["alpha"], 1)
+
+    with pytest.raises(ValueError):
+        service_wire.decode_request(payload[:-1])
+
+
+def test_results_round_trip():
+    results = [(2, 0.5), (0, -1.25)]
+
+    assert wire.decode_results(service_wire.encode_results(results)) == results